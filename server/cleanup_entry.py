@@ -1,5 +1,4 @@
 
-import pandas as pd
 import os
 import sys
 
@@ -12,28 +11,8 @@ from dotenv import load_dotenv
 root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 load_dotenv(os.path.join(root_dir, ".env"))
 
-
-import pandas as pd
-import os
-import sys
-
-# Ensure we can import SupabaseClient
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from db_handle.supabase_client import SupabaseClient
-from dotenv import load_dotenv
-
-# Load env vars
-root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-load_dotenv(os.path.join(root_dir, ".env"))
-
-CSV_FILE = "news.csv"
-
-def is_non_english(text):
-    """Returns True if text appears to be non-English (high non-ASCII ratio)."""
-    if not text: 
-        return False
-    non_ascii_count = sum(1 for c in text if ord(c) > 127)
-    return (non_ascii_count / len(text)) > 0.2
+from news_archive import ARCHIVE_CONFIG, read_archive, rewrite_files
+from langid import non_english_mask
 
 def cleanup():
     print("--- Bulk Cleaning Non-English Articles ---")
@@ -65,12 +44,9 @@ def cleanup():
             
         print(f"   Total articles scanned: {len(all_articles)}")
         
-        ids_to_delete = []
-        
-        for art in all_articles:
-            if is_non_english(art.get('title', '')):
-                ids_to_delete.append(art['id'])
-                # print(f"   [Candidate] {art.get('title')[:30]}...") 
+        # One pass over all titles (see langid.py)
+        mask = non_english_mask([art.get('title', '') for art in all_articles])
+        ids_to_delete = [art['id'] for art, foreign in zip(all_articles, mask) if foreign]
         
         if ids_to_delete:
             print(f"   Found {len(ids_to_delete)} non-English articles in total.")
@@ -93,35 +69,38 @@ def cleanup():
     except Exception as e:
         print(f"   Error connecting/cleaning Supabase: {e}")
 
-    # 2. Clean CSV
-    print(f"\n2. Scanning {CSV_FILE}...")
-    if os.path.exists(CSV_FILE):
-        try:
-            df = pd.read_csv(CSV_FILE)
-            initial_count = len(df)
-            
-            # Filter rows
-            # We want rows where is_non_english is False
-            df_clean = df[~df['title'].apply(lambda x: is_non_english(str(x)))]
-            
-            removed_count = initial_count - len(df_clean)
-            
-            if removed_count > 0:
-                print(f"   Found {removed_count} non-English rows in CSV.")
-                # We can just check urls_to_delete if we want consistency, but let's trust the heuristic
+    # 2. Clean the archive (English view only; the raw view keeps every article)
+    print(f"\n2. Scanning archive {ARCHIVE_CONFIG['root']}...")
+    
+    def non_english_rows(df):
+        titles = df['title_english'].fillna(df['title']).astype(str)
+        in_english = df['in_english'].fillna(False).astype(bool)
+        return in_english.to_numpy() & non_english_mask(titles)
+    
+    try:
+        # Only the title of the English view is read for the scan
+        titles = read_archive(columns=['title'])
+        found = int(non_english_mask(titles['title']).sum())
+        
+        if found > 0:
+            print(f"   Found {found} non-English rows in the archive.")
+            confirm = input("   Remove them from the English view? (y/n): ")
+            if confirm.lower() == 'y':
+                def drop_non_english(df):
+                    mask = non_english_rows(df)
+                    if not mask.any():
+                        return None
+                    df.loc[mask, 'in_english'] = False
+                    return df
                 
-                confirm = input("   Overwrite CSV with cleaned data? (y/n): ")
-                if confirm.lower() == 'y':
-                    df_clean.to_csv(CSV_FILE, index=False)
-                    print(f"   Success: Cleaned {CSV_FILE}.")
-                else:
-                    print("   Skipped CSV update.")
+                changed = rewrite_files(drop_non_english)
+                print(f"   Success: Cleaned {changed} archive files.")
             else:
-                print("   No non-English entries found in CSV.")
-        except Exception as e:
-            print(f"   Error reading/writing CSV: {e}")
-    else:
-        print(f"   CSV file {CSV_FILE} not found.")
+                print("   Skipped archive update.")
+        else:
+            print("   No non-English entries found in the archive.")
+    except Exception as e:
+        print(f"   Error reading/writing archive: {e}")
 
 if __name__ == "__main__":
     cleanup()
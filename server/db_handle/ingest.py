@@ -14,23 +14,42 @@ try:
     from server.model.embed import embed_text
 except ImportError:
     from model.embed import embed_text
+from news_archive import ARCHIVE_CONFIG, read_archive, read_latest
 
-def ingest_data(csv_path="news.csv", limit=50):
+# Only these columns are read from the archive
+INGEST_COLUMNS = ['date', 'url', 'title', 'themes', 'location_names']
+
+def load_articles(csv_path=None, limit=50):
     """
-    Ingest data from CSV into Supabase.
+    Loads the articles to ingest: the latest `limit` rows of the Parquet archive
+    (only the newest partitions are opened), or of a CSV file if csv_path is given.
     """
+    if csv_path is None:
+        print(f"Reading {ARCHIVE_CONFIG['root']}...")
+        if limit:
+            return read_latest(limit, columns=INGEST_COLUMNS)
+        return read_archive(columns=INGEST_COLUMNS)
+    
     base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     full_path = os.path.join(base_dir, csv_path)
     
     if not os.path.exists(full_path):
         print(f"File not found: {full_path}")
-        return
+        return None
 
     print(f"Reading {full_path}...")
+    return pd.read_csv(full_path)
+
+def ingest_data(csv_path=None, limit=50):
+    """
+    Ingest data from the news archive (or a CSV) into Supabase.
+    """
     try:
-        df = pd.read_csv(full_path)
+        df = load_articles(csv_path, limit)
     except Exception as e:
-        print(f"Error reading CSV: {e}")
+        print(f"Error reading articles: {e}")
+        return
+    if df is None:
         return
         
     print(f"Found {len(df)} rows.")
@@ -80,7 +99,7 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Ingest news into Supabase.")
     parser.add_argument("--limit", type=int, default=50, help="Number of articles to ingest (latest first). 0 for all.")
-    parser.add_argument("--file", type=str, default="news.csv", help="CSV file to ingest")
+    parser.add_argument("--file", type=str, default=None, help="CSV file to ingest (default: the Parquet archive)")
     
     args = parser.parse_args()
     limit = args.limit if args.limit > 0 else None
@@ -30,15 +30,18 @@ load_dotenv(env_path)
 # 4. Import dependencies
 from server.db_handle.supabase_client import SupabaseClient
 try:
-    from server.model.embed import embed_text
+    from server.model.embed import embed_text, model_id
+    from server.model.query_cache import embed_query
 except ImportError:
     # Try alternate structure if needed
     try:
-        from model.embed import embed_text
+        from model.embed import embed_text, model_id
+        from model.query_cache import embed_query
     except ImportError:
         # Fallback to local import if sys.path fails for some reason
         sys.path.append(os.path.dirname(current_dir))
-        from model.embed import embed_text
+        from model.embed import embed_text, model_id
+        from model.query_cache import embed_query
 
 def search_articles(query: str, match_threshold: float, match_count: int):
     """
@@ -53,8 +56,8 @@ def search_articles(query: str, match_threshold: float, match_count: int):
         List[dict]: List of articles with title, url, country, etc.
     """
     try:
-        # 5. Generate Embedding
-        embedding = embed_text(query)
+        # 5. Generate Embedding (repeat queries come from the cache, see model/query_cache.py)
+        embedding = embed_query(query, embed_text, model_id())
     except Exception as e:
         print(f"Error generating embedding: {e}")
         import traceback
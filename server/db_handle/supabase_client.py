@@ -5,15 +5,23 @@ from supabase import create_client, Client
 
 # Ensure we can import the embed model
 try:
-    from server.model.embed import embed_text
+    from server.model.embed import embed_text, model_id
+    from server.model.embed_cache import embed_unique, get_cache
 except ImportError:
     # If running directly or from different context
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     try:
-        from model.embed import embed_text
+        from model.embed import embed_text, model_id
+        from model.embed_cache import embed_unique, get_cache
     except ImportError:
         # Fallback
-        from server.model.embed import embed_text
+        from server.model.embed import embed_text, model_id
+        from server.model.embed_cache import embed_unique, get_cache
+
+try:
+    from server.metrics import METRICS
+except ImportError:
+    from metrics import METRICS
 
 class SupabaseClient:
     def __init__(self):
@@ -39,6 +47,7 @@ class SupabaseClient:
     def add_articles(self, articles):
         """
         Add a list of articles to Supabase, generating embeddings automatically.
+        Same as upsert_articles(embed_articles(articles)).
         
         Args:
             articles: List of dicts, each containing:
@@ -47,9 +56,24 @@ class SupabaseClient:
                 - location_names (string)
                 - url
                 - date
+        
+        Returns:
+            List of URLs that were upserted successfully.
+        """
+        if not articles:
+            return []
+        return self.upsert_articles(self.embed_articles(articles))
+
+    def embed_articles(self, articles):
+        """
+        Builds the table rows for a list of articles (see add_articles), including
+        the title/themes/locations embeddings. Nothing is sent to Supabase.
+        
+        Returns:
+            List of dicts matching the table schema.
         """
         if not articles:
-            return
+            return []
 
         print(f"Processing {len(articles)} articles for Supabase...")
 
@@ -63,15 +87,24 @@ class SupabaseClient:
             themes_list.append(str(row.get('themes', '')))
             locations_list.append(str(row.get('location_names', '')))
             
-        # Generate embeddings in batches
-        print("Generating title embeddings...")
-        title_embeddings = embed_text(titles)
-        
-        print("Generating theme embeddings...")
-        theme_embeddings = embed_text(themes_list)
-        
-        print("Generating location embeddings...")
-        location_embeddings = embed_text(locations_list)
+        # Generate embeddings in one batch: themes and locations repeat a lot across
+        # articles, so each distinct string (across all three fields) is embedded once,
+        # and strings embedded in earlier batches come from the cache (model/embed_cache.py)
+        with METRICS.timer('supabase_seconds', op='embed'):
+            print("Generating title, theme and location embeddings...")
+            embeddings, stats = embed_unique(titles + themes_list + locations_list, embed_text,
+                                             model_id(), get_cache())
+        print(f"  [{stats['texts']} texts: {stats['unique']} distinct, {stats['cache_hits']} from cache, "
+              f"{stats['embedded']} embedded]")
+        if embeddings is None:
+            title_embeddings = theme_embeddings = location_embeddings = None
+        else:
+            count = len(articles)
+            title_embeddings = embeddings[:count]
+            theme_embeddings = embeddings[count:2 * count]
+            location_embeddings = embeddings[2 * count:]
+        METRICS.inc('supabase_articles_total', len(articles), op='embed',
+                    result='ok' if title_embeddings is not None else 'failed')
         
         # Prepare inserts
         batch_data = []
@@ -90,22 +123,33 @@ class SupabaseClient:
                 "locations_embedding": location_embeddings[i].tolist() if location_embeddings is not None else None,
             }
             batch_data.append(article_data)
+        return batch_data
+
+    def upsert_articles(self, batch_data):
+        """
+        Upserts rows built by embed_articles into the 'articles' table.
         
-        # Upsert to Supabase
+        Returns:
+            List of URLs that were upserted successfully.
+        """
         print(f"Upserting {len(batch_data)} articles to Supabase...")
-        count = 0
-        for article in batch_data:
-            # We insert one by one for safety, or we could try batching if Supabase allows large payloads
-            # Basic Supabase upsert allows list of dicts.
-            # Let's try inserting in chunks of 50 to avoid request size limits
-            # But the 'insert_article' method is single.
-            # Let's use self.supabase.table("articles").upsert(batch_data).execute() if possible
-            # but handling errors row by row is safer for now.
-             res = self.insert_article(article)
-             if res:
-                 count += 1
+        upserted_urls = []
+        with METRICS.timer('supabase_seconds', op='upsert'):
+            for article in batch_data:
+                # We insert one by one for safety, or we could try batching if Supabase allows large payloads
+                # Basic Supabase upsert allows list of dicts.
+                # Let's try inserting in chunks of 50 to avoid request size limits
+                # But the 'insert_article' method is single.
+                # Let's use self.supabase.table("articles").upsert(batch_data).execute() if possible
+                # but handling errors row by row is safer for now.
+                res = self.insert_article(article)
+                if res:
+                    upserted_urls.append(article['url'])
+        METRICS.inc('supabase_articles_total', len(upserted_urls), op='upsert', result='ok')
+        METRICS.inc('supabase_articles_total', len(batch_data) - len(upserted_urls), op='upsert', result='failed')
         
-        print(f"Successfully upserted {count}/{len(batch_data)} articles.")
+        print(f"Successfully upserted {len(upserted_urls)}/{len(batch_data)} articles.")
+        return upserted_urls
 
     def search_similar(self, query_embedding, match_threshold=0.5, match_count=5, search_field="title"):
         """
@@ -1,5 +1,4 @@
 
-import chromadb
 import os
 import sys
 
@@ -25,6 +24,8 @@ class VectorDB:
         self.persist_path = os.path.join(base_dir, persist_directory)
         
         print(f"Initializing ChromaDB at: {self.persist_path}")
+        # Imported here so importing this module (e.g. check_db.py) stays fast
+        import chromadb
         self.client = chromadb.PersistentClient(path=self.persist_path)
         
         # Get or create collection
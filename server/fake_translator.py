@@ -0,0 +1,91 @@
+"""
+Local fake translation service for exercising the translation scheduler offline.
+
+Speaks the same JSON as the 'http' backend in translation.py (LibreTranslate
+style): POST /translate {"q": text} -> {"translatedText": ...}. Every line of
+`q` comes back prefixed with "[en] ". Latency, random failures, a
+concurrency cap (answered with 429, like a throttling translator) and merged
+lines (multi-line requests answered on one line) are configurable so the AIMD
+limiter, retries and the per-title fallback can be watched at work.
+
+Usage:
+    python fake_translator.py --port 5005 --latency 0.5 --max-concurrent 6 --error-rate 0.05
+    # then set TRANSLATION_CONFIG['backend'] = 'http' in translation.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeTranslatorHandler(BaseHTTPRequestHandler):
+    # Set from the command line in main()
+    latency = 0.2
+    error_rate = 0.0
+    max_concurrent = 8
+    merge_lines = False
+
+    in_flight = 0
+    lock = threading.Lock()
+    counts = {'ok': 0, 'throttled': 0, 'errors': 0}
+
+    def do_POST(self):
+        cls = FakeTranslatorHandler
+        with cls.lock:
+            cls.in_flight += 1
+            throttled = cls.in_flight > cls.max_concurrent
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if throttled:
+                self._reply(429, {'error': 'Too many requests'}, 'throttled')
+                return
+            # Latency grows with load, like a real service near its limit
+            time.sleep(cls.latency * (1 + cls.in_flight / cls.max_concurrent))
+            if random.random() < cls.error_rate:
+                self._reply(500, {'error': 'Internal error'}, 'errors')
+                return
+            text = body.get('q', '')
+            separator = ' ' if cls.merge_lines else '\n'
+            translated = separator.join(f"[en] {line}" for line in text.split('\n'))
+            self._reply(200, {'translatedText': translated}, 'ok')
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def _reply(self, status, payload, outcome):
+        with FakeTranslatorHandler.lock:
+            FakeTranslatorHandler.counts[outcome] += 1
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake LibreTranslate-style service for local testing.")
+    parser.add_argument("--port", type=int, default=5005)
+    parser.add_argument("--latency", type=float, default=0.2, help="Base seconds per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--max-concurrent", type=int, default=8, help="Requests above this get 429")
+    parser.add_argument("--merge-lines", action="store_true", help="Answer multi-line requests on one line")
+    args = parser.parse_args()
+
+    FakeTranslatorHandler.latency = args.latency
+    FakeTranslatorHandler.error_rate = args.error_rate
+    FakeTranslatorHandler.max_concurrent = args.max_concurrent
+    FakeTranslatorHandler.merge_lines = args.merge_lines
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), FakeTranslatorHandler)
+    print(f"Fake translator listening on http://127.0.0.1:{args.port}/translate")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nRequests: {FakeTranslatorHandler.counts}")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,17 @@
-from spellchecker import SpellChecker
+import threading
+
+# The dictionary is loaded once, on the first query (not when the API imports this module)
+_spell = None
+_spell_lock = threading.Lock()
+
+def get_spell_checker():
+    """Shared SpellChecker, created on first use."""
+    global _spell
+    with _spell_lock:
+        if _spell is None:
+            from spellchecker import SpellChecker
+            _spell = SpellChecker()
+        return _spell
 
 def fuzzy_search(query: str, possibilities: list[str] = None, cutoff: float = 0.6) -> str:
     """
@@ -12,7 +25,7 @@ def fuzzy_search(query: str, possibilities: list[str] = None, cutoff: float = 0.
     Returns:
         str: The corrected query string.
     """
-    spell = SpellChecker()
+    spell = get_spell_checker()
     
     # Split the query into words
     words = query.split()
@@ -0,0 +1,189 @@
+"""
+Polling of the GDELT 2.0 update feeds.
+
+GDELT publishes a tiny lastupdate.txt (three lines: export, mentions, gkg) next to
+the ever-growing masterfilelist.txt. The poller only reads lastupdate, with
+ETag/If-Modified-Since so an unchanged feed costs a 304, and reads the master
+list (just its tail, via a Range request) only to fill a gap between the last
+processed file and the latest one.
+"""
+import re
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# GDELT 2.0 Global Knowledge Graph (GKG)
+MASTER_URL_TRANSLATION = "http://data.gdeltproject.org/gdeltv2/masterfilelist-translation.txt"
+MASTER_URL_ORIGINAL = "http://data.gdeltproject.org/gdeltv2/masterfilelist.txt"
+LASTUPDATE_URL_TRANSLATION = "http://data.gdeltproject.org/gdeltv2/lastupdate-translation.txt"
+LASTUPDATE_URL_ORIGINAL = "http://data.gdeltproject.org/gdeltv2/lastupdate.txt"
+
+# Feed URLs per stream ('translation' = non-English sources, 'original' = English sources)
+STREAMS = {
+    'translation': {'lastupdate': LASTUPDATE_URL_TRANSLATION, 'master': MASTER_URL_TRANSLATION},
+    'original': {'lastupdate': LASTUPDATE_URL_ORIGINAL, 'master': MASTER_URL_ORIGINAL},
+}
+
+# GDELT publishes one GKG file per stream every 15 minutes
+UPDATE_INTERVAL = timedelta(minutes=15)
+
+FEED_CONFIG = {
+    'timeout': 30,                # Seconds to wait on the GDELT server
+    'max_catchup_files': 96,      # Max files replayed to fill one gap (96 = one day)
+    'master_line_bytes': 160,     # Generous size of one master list line (for Range requests)
+}
+
+# One pooled session for every GDELT request (keeps connections alive between polls)
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# A file list entry: "<size> <md5> <url>"
+FeedEntry = namedtuple('FeedEntry', ['size', 'md5', 'url'])
+
+_TIMESTAMP_RE = re.compile(r'/(\d{14})\.')
+
+# Conditional request state per URL: {'etag', 'last_modified', 'text'}
+_validators = {}
+_validators_lock = threading.Lock()
+
+def gkg_timestamp(url):
+    """Returns the batch datetime encoded in a GDELT file URL (e.g. .../20260207081500.gkg.csv.zip)."""
+    match = _TIMESTAMP_RE.search(url or '')
+    if not match:
+        return None
+    return datetime.strptime(match.group(1), '%Y%m%d%H%M%S')
+
+def parse_file_list(text):
+    """Yields FeedEntry for every GKG file in a lastupdate/masterfilelist body."""
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) >= 3 and "gkg.csv.zip" in parts[2]:
+            yield FeedEntry(parts[0], parts[1], parts[2])
+
+def fetch_conditional(url):
+    """
+    GETs a small text resource with If-None-Match / If-Modified-Since.
+    Returns (text, changed); on 304 the previously fetched text is returned.
+    """
+    with _validators_lock:
+        cached = _validators.get(url)
+
+    headers = {}
+    if cached:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+    r = SESSION.get(url, headers=headers, timeout=FEED_CONFIG['timeout'])
+    if r.status_code == 304 and cached:
+        return cached['text'], False
+    r.raise_for_status()
+
+    with _validators_lock:
+        _validators[url] = {
+            'etag': r.headers.get('ETag'),
+            'last_modified': r.headers.get('Last-Modified'),
+            'text': r.text,
+        }
+    return r.text, True
+
+def get_latest_entry(stream):
+    """Returns the FeedEntry of the newest GKG file for a stream, or None on error."""
+    url = STREAMS[stream]['lastupdate']
+    try:
+        text, _ = fetch_conditional(url)
+        entries = list(parse_file_list(text))
+        return entries[-1] if entries else None
+    except Exception as e:
+        print(f"Error fetching update feed {url}: {e}")
+        return None
+
+def get_latest_url(stream):
+    """Fetches the latest GKG file URL for 'translation' or 'original'."""
+    entry = get_latest_entry(stream)
+    return entry.url if entry else None
+
+def _fetch_master_tail(url, num_bytes):
+    """
+    Fetches roughly the last `num_bytes` of a master file list.
+    Returns (text, complete) - complete is True when the whole list was returned.
+    """
+    r = SESSION.get(url, headers={'Range': f'bytes=-{num_bytes}'}, timeout=FEED_CONFIG['timeout'])
+    r.raise_for_status()
+    if r.status_code != 206 or len(r.content) < num_bytes:
+        return r.text, True
+    # Drop the first (partial) line of the range
+    text = r.text
+    return text[text.find('\n') + 1:], False
+
+def list_gkg_entries(stream, after=None, until=None):
+    """
+    Returns the master list entries of a stream with after < timestamp <= until, oldest first.
+    Only the tail of the master list is downloaded, growing it until it covers `after`.
+    """
+    url = STREAMS[stream]['master']
+    if after is None:
+        num_bytes = None
+    else:
+        end = until or datetime.now(timezone.utc).replace(tzinfo=None)
+        intervals = max(1, int((end - after) / UPDATE_INTERVAL) + 2)
+        # Each 15-minute batch has 3 lines (export, mentions, gkg)
+        num_bytes = intervals * 3 * FEED_CONFIG['master_line_bytes']
+
+    while True:
+        if num_bytes is None:
+            r = SESSION.get(url, timeout=FEED_CONFIG['timeout'])
+            r.raise_for_status()
+            text, complete = r.text, True
+        else:
+            text, complete = _fetch_master_tail(url, num_bytes)
+
+        entries = []
+        covered = complete
+        for entry in parse_file_list(text):
+            timestamp = gkg_timestamp(entry.url)
+            if timestamp is None:
+                continue
+            if after is not None and timestamp <= after:
+                covered = True
+                continue
+            if until is not None and timestamp > until:
+                continue
+            entries.append(entry)
+
+        if covered:
+            return entries
+        # The tail didn't reach back far enough: fetch a bigger one
+        num_bytes *= 4
+
+def missing_entries(stream, last_url, latest):
+    """
+    Returns the entries to process, oldest first, to get from `last_url` to `latest`.
+    Consecutive files need no master list; a gap is filled from it, capped at
+    FEED_CONFIG['max_catchup_files'] (the most recent ones are kept).
+    """
+    last_time = gkg_timestamp(last_url)
+    latest_time = gkg_timestamp(latest.url)
+    if last_time is None or latest_time is None or latest_time - last_time <= UPDATE_INTERVAL:
+        return [latest]
+
+    print(f"  [Gap in {stream} stream: {last_time} -> {latest_time}, reading master list...]")
+    try:
+        entries = list_gkg_entries(stream, after=last_time, until=latest_time)
+    except Exception as e:
+        print(f"  [Error reading master list, processing latest file only: {e}]")
+        return [latest]
+
+    if not entries or entries[-1].url != latest.url:
+        entries.append(latest)
+
+    limit = FEED_CONFIG['max_catchup_files']
+    if len(entries) > limit:
+        print(f"  [Gap of {len(entries)} files exceeds max_catchup_files, replaying the last {limit}]")
+        entries = entries[-limit:]
+    return entries
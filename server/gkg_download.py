@@ -0,0 +1,259 @@
+"""
+Download manager for GDELT GKG zips, with a local on-disk cache.
+
+Every file is streamed through the pooled gdelt_feed SESSION into a
+content-addressed cache (objects/<md5[:2]>/<md5>.zip, md5 as published in the
+GDELT file lists) while the bytes are handed on to the parser, so a download
+is never held in memory and a later reprocessing of the same file (e.g. after
+a parser fix) reads it from local disk instead of from GDELT.
+
+A download in progress lives in partial/ and is resumed with an HTTP Range
+request, after a failed attempt within the same call or on the next call. Failed
+attempts are retried with full-jitter backoff. The cache is kept under
+max_cache_bytes by evicting the least recently used files; partial downloads
+nobody resumed within partial_max_age_hours are deleted as well.
+"""
+import hashlib
+import os
+import random
+import threading
+import time
+
+from gdelt_feed import SESSION
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DOWNLOAD_CONFIG = {
+    'cache_dir': os.environ.get("GKG_CACHE_DIR", os.path.join(SERVER_DIR, "gkg_cache")),
+    'cache_enabled': True,                 # False: stream straight from GDELT (still retried/resumed)
+    'max_cache_bytes': 2 << 30,            # Least recently used files are evicted above this
+    'chunk_bytes': 64 * 1024,              # HTTP read size (also the cache read size)
+    'timeout': 60,                         # Seconds to wait on the GDELT server
+    'max_retries': 4,                      # Attempts without progress before giving up
+    'backoff_base': 1.0,                   # Seconds; attempt n sleeps up to base * 2^n
+    'partial_max_age_hours': 24,           # Abandoned partial downloads older than this are deleted
+}
+
+# Cache statistics for this process: {'hits', 'misses', 'resumed', 'retries', 'evicted', 'bytes_downloaded'}
+DOWNLOAD_STATS = dict.fromkeys(('hits', 'misses', 'resumed', 'retries', 'evicted', 'bytes_downloaded'), 0)
+_stats_lock = threading.Lock()
+
+# Only one thread per process downloads a given file at a time
+_key_locks = {}
+_key_locks_lock = threading.Lock()
+
+def _count(key, amount=1):
+    with _stats_lock:
+        DOWNLOAD_STATS[key] += amount
+
+def _key_lock(key):
+    with _key_locks_lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+def url_key(url):
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+def object_path(md5, cache_dir=None):
+    cache_dir = cache_dir or DOWNLOAD_CONFIG['cache_dir']
+    return os.path.join(cache_dir, 'objects', md5[:2], f"{md5}.zip")
+
+def _ref_path(url, cache_dir):
+    """Small file holding the md5 of the cached copy of `url` (for callers without an md5)."""
+    return os.path.join(cache_dir, 'refs', url_key(url))
+
+def _write_atomic(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def cached_path(url, md5=None, cache_dir=None):
+    """Path of the cached copy of a file (by md5, else by URL), or None if it isn't cached."""
+    cache_dir = cache_dir or DOWNLOAD_CONFIG['cache_dir']
+    if md5 is None:
+        try:
+            with open(_ref_path(url, cache_dir)) as f:
+                md5 = f.read().strip()
+        except OSError:
+            return None
+    path = object_path(md5, cache_dir)
+    return path if os.path.exists(path) else None
+
+def _iter_file(path):
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(DOWNLOAD_CONFIG['chunk_bytes'])
+            if not data:
+                return
+            yield data
+
+def iter_download(url, md5=None, size=None, cache_dir=None):
+    """
+    Yields the bytes of the file at `url`, from the cache if it is there, otherwise
+    from GDELT while writing it to the cache. md5/size (from a FeedEntry) are
+    checked before the file is committed to the cache.
+
+    Failed requests are retried with backoff and resume where the last one stopped,
+    so the caller sees one uninterrupted stream.
+    """
+    cache_dir = cache_dir or DOWNLOAD_CONFIG['cache_dir']
+    if not DOWNLOAD_CONFIG['cache_enabled']:
+        yield from _iter_remote(url, skip=0)
+        return
+
+    path = cached_path(url, md5, cache_dir)
+    if path:
+        _count('hits')
+        # Reading counts as use for the LRU eviction
+        os.utime(path)
+        yield from _iter_file(path)
+        return
+
+    _count('misses')
+    key = md5 or url_key(url)
+    with _key_lock(key):
+        part_path = os.path.join(cache_dir, 'partial', f"{key}.part")
+        os.makedirs(os.path.dirname(part_path), exist_ok=True)
+        hasher = hashlib.md5()
+
+        # Hand on (and hash) what an earlier, interrupted download already stored
+        offset = 0
+        if os.path.exists(part_path):
+            _count('resumed')
+            for data in _iter_file(part_path):
+                hasher.update(data)
+                offset += len(data)
+                yield data
+
+        with open(part_path, 'ab') as part:
+            for data in _iter_remote(url, skip=offset):
+                part.write(data)
+                hasher.update(data)
+                offset += len(data)
+                yield data
+
+        digest = hasher.hexdigest()
+        if (md5 and digest != md5.lower()) or (size and offset != int(size)):
+            os.remove(part_path)
+            raise IOError(f"Downloaded {url} does not match the file list "
+                          f"(md5 {digest}, {offset} bytes; expected {md5}, {size} bytes)")
+
+        final_path = object_path(digest, cache_dir)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(part_path, final_path)
+        _write_atomic(_ref_path(url, cache_dir), digest)
+
+    evict(cache_dir, keep=final_path)
+
+def _iter_remote(url, skip):
+    """
+    Yields the bytes of `url` after the first `skip` bytes, retrying failed requests.
+    Retries resume with a Range request; a server that ignores it just has the
+    already-seen bytes dropped.
+    """
+    attempt = 0
+    while True:
+        headers = {'Range': f'bytes={skip}-'} if skip else {}
+        try:
+            with SESSION.get(url, stream=True, headers=headers, timeout=DOWNLOAD_CONFIG['timeout']) as r:
+                if r.status_code == 416:
+                    # Range starts at the end: nothing left to read
+                    return
+                r.raise_for_status()
+                to_drop = skip if r.status_code != 206 else 0
+                for data in r.iter_content(chunk_size=DOWNLOAD_CONFIG['chunk_bytes']):
+                    if to_drop:
+                        dropped = min(to_drop, len(data))
+                        data = data[dropped:]
+                        to_drop -= dropped
+                        if not data:
+                            continue
+                    skip += len(data)
+                    attempt = 0  # Progress resets the retry budget
+                    _count('bytes_downloaded', len(data))
+                    yield data
+            return
+        except Exception as e:
+            if attempt >= DOWNLOAD_CONFIG['max_retries']:
+                raise
+            backoff = random.uniform(0, DOWNLOAD_CONFIG['backoff_base'] * 2 ** attempt)
+            print(f"  [Download of {url.rsplit('/', 1)[-1]} failed at byte {skip} ({e}), "
+                  f"retrying in {backoff:.1f}s]")
+            _count('retries')
+            attempt += 1
+            time.sleep(backoff)
+
+def fetch_to_cache(url, md5=None, size=None, cache_dir=None):
+    """Makes sure a file is in the cache and returns its local path."""
+    for _ in iter_download(url, md5, size, cache_dir):
+        pass
+    return cached_path(url, md5, cache_dir)
+
+def evict_partial(cache_dir=None, max_age_hours=None):
+    """Deletes partial downloads not written to for max_age_hours. Returns files removed."""
+    cache_dir = cache_dir or DOWNLOAD_CONFIG['cache_dir']
+    max_age_hours = DOWNLOAD_CONFIG['partial_max_age_hours'] if max_age_hours is None else max_age_hours
+    partial_dir = os.path.join(cache_dir, 'partial')
+    if not os.path.isdir(partial_dir):
+        return 0
+
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+    for name in os.listdir(partial_dir):
+        path = os.path.join(partial_dir, name)
+        try:
+            # A download in progress keeps its file fresh
+            if os.stat(path).st_mtime < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+def evict(cache_dir=None, keep=None, max_bytes=None):
+    """
+    Deletes least recently used cache files until the cache fits in max_bytes,
+    and stale partial downloads (evict_partial). Returns files removed.
+    """
+    cache_dir = cache_dir or DOWNLOAD_CONFIG['cache_dir']
+    max_bytes = DOWNLOAD_CONFIG['max_cache_bytes'] if max_bytes is None else max_bytes
+    removed = evict_partial(cache_dir)
+    objects_dir = os.path.join(cache_dir, 'objects')
+    if not os.path.isdir(objects_dir):
+        if removed:
+            _count('evicted', removed)
+        return removed
+
+    files = []
+    total = 0
+    for root, _, names in os.walk(objects_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+    for _, file_size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= file_size
+        removed += 1
+    if removed:
+        _count('evicted', removed)
+    return removed
+
+def cache_size(cache_dir=None):
+    """Total bytes of the cached files."""
+    cache_dir = cache_dir or DOWNLOAD_CONFIG['cache_dir']
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(os.path.join(cache_dir, 'objects')) for name in names)
@@ -0,0 +1,192 @@
+"""
+On-demand decoding of the GKG fields the pipeline keeps raw.
+
+V2Persons, V2Organizations, V2Tone and V2Counts are not needed to ingest an
+article, and parsing them for every row was too slow to leave on. The parser
+now copies their text as-is into the chunk ('persons_raw', ...). The columnar
+engine keeps the Arrow string slices it already read. The archive stores these
+columns too. Consumers decode a field only when they ask for it, through the
+parse_v2_* functions below. LazyGkgFields memoizes the result per record.
+"""
+
+GKG_FIELD_CONFIG = {
+    'tone_overall_only': True,   # parse_v2_tone: overall score only (False: all six metrics)
+}
+
+# Decoded field -> chunk/archive column holding the raw GKG text
+RAW_FIELD_COLUMNS = {
+    'persons': 'persons_raw',
+    'organizations': 'organizations_raw',
+    'tone': 'tone_raw',
+    'counts': 'counts_raw',
+}
+
+# ============================================================================
+# PARSING FUNCTIONS
+# ============================================================================
+
+def parse_v2_persons(persons_str):
+    """
+    Parse V2Persons field to extract person names.
+    Input: "Joe Biden,234,9;Kamala Harris,567,13"
+    Output: ["Joe Biden", "Kamala Harris"]
+    """
+    if not persons_str or persons_str.strip() == '':
+        return []
+    
+    persons = []
+    for person_block in persons_str.split(';'):
+        if person_block:
+            # Format: Name,Offset,Length - we only want the name
+            person_name = person_block.split(',')[0]
+            persons.append(person_name)
+    return persons
+
+def parse_v2_organizations(orgs_str):
+    """
+    Parse V2Organizations field to extract organization names.
+    Input: "United Nations,134,14;Apple Inc,789,9"
+    Output: ["United Nations", "Apple Inc"]
+    """
+    if not orgs_str or orgs_str.strip() == '':
+        return []
+    
+    orgs = []
+    for org_block in orgs_str.split(';'):
+        if org_block:
+            # Format: Name,Offset,Length - we only want the name
+            org_name = org_block.split(',')[0]
+            orgs.append(org_name)
+    return orgs
+
+def parse_v2_tone(tone_str, overall_only=True):
+    """
+    Parse V2Tone field to extract sentiment metrics.
+    Input: "-2.5,3.2,5.7,2.5,12.3,4.8"
+    Output: Dict with tone metrics or just overall tone score
+    
+    Six dimensions (comma-separated):
+    1. Tone (overall sentiment: -100 to +100)
+    2. Positive Score (% positive words)
+    3. Negative Score (% negative words)
+    4. Polarity (abs difference)
+    5. Activity Reference Density
+    6. Self/Group Reference Density
+    """
+    if not tone_str or tone_str.strip() == '':
+        return None
+    
+    parts = tone_str.split(',')
+    
+    if overall_only:
+        try:
+            return float(parts[0])
+        except (ValueError, IndexError):
+            return None
+    else:
+        try:
+            return {
+                'tone': float(parts[0]) if len(parts) > 0 else None,
+                'positive': float(parts[1]) if len(parts) > 1 else None,
+                'negative': float(parts[2]) if len(parts) > 2 else None,
+                'polarity': float(parts[3]) if len(parts) > 3 else None,
+                'activity': float(parts[4]) if len(parts) > 4 else None,
+                'self_reference': float(parts[5]) if len(parts) > 5 else None,
+            }
+        except ValueError:
+            return None
+
+def parse_v2_counts(counts_str):
+    """
+    Parse V2Counts field to extract count data.
+    Input: "KILL#50#militants#Baghdad;PROTEST#1000#students#Paris"
+    Output: List of dicts with count info
+    
+    Format: CountType#Number#ObjectType#Location
+    """
+    if not counts_str or counts_str.strip() == '':
+        return []
+    
+    counts = []
+    for count_block in counts_str.split(';'):
+        if count_block:
+            parts = count_block.split('#')
+            if len(parts) >= 2:
+                count = {
+                    'type': parts[0] if len(parts) > 0 else '',
+                    'number': parts[1] if len(parts) > 1 else '',
+                    'object': parts[2] if len(parts) > 2 else '',
+                    'location': parts[3] if len(parts) > 3 else '',
+                }
+                counts.append(count)
+    
+    return counts
+
+def decode_field(field, raw):
+    """Decodes the raw text of one field ('persons', 'organizations', 'tone' or 'counts')."""
+    if field == 'persons':
+        return parse_v2_persons(raw)
+    if field == 'organizations':
+        return parse_v2_organizations(raw)
+    if field == 'tone':
+        return parse_v2_tone(raw, GKG_FIELD_CONFIG['tone_overall_only'])
+    if field == 'counts':
+        return parse_v2_counts(raw)
+    raise KeyError(f"Unknown GKG field: {field}")
+
+# ============================================================================
+# LAZY ACCESS
+# ============================================================================
+
+class LazyGkgFields:
+    """
+    The raw persons/organizations/tone/counts text of one record. Each field
+    is decoded the first time it is read and remembered after that.
+    """
+    __slots__ = ('_raw', '_decoded')
+    
+    def __init__(self, persons=None, organizations=None, tone=None, counts=None):
+        self._raw = {'persons': persons, 'organizations': organizations, 'tone': tone, 'counts': counts}
+        self._decoded = {}
+    
+    def get(self, field):
+        if field not in self._decoded:
+            raw = self._raw[field]
+            self._decoded[field] = decode_field(field, raw if isinstance(raw, str) else '')
+        return self._decoded[field]
+    
+    @property
+    def persons(self):
+        return self.get('persons')
+    
+    @property
+    def organizations(self):
+        return self.get('organizations')
+    
+    @property
+    def tone(self):
+        return self.get('tone')
+    
+    @property
+    def counts(self):
+        return self.get('counts')
+
+def lazy_records(df):
+    """One LazyGkgFields per row of a frame with (some of) the RAW_FIELD_COLUMNS."""
+    columns = {field: df[column].tolist() if column in df else [None] * len(df)
+               for field, column in RAW_FIELD_COLUMNS.items()}
+    return [LazyGkgFields(*values) for values in zip(*(columns[field] for field in RAW_FIELD_COLUMNS))]
+
+def decode_column(df, field):
+    """
+    Decodes one field for every row of a frame and returns the results as a list.
+    Rows with the same raw text share one decode.
+    """
+    memo = {}
+    result = []
+    for raw in df[RAW_FIELD_COLUMNS[field]].tolist():
+        key = raw if isinstance(raw, str) else ''
+        if key not in memo:
+            memo[key] = decode_field(field, key)
+        result.append(memo[key])
+    return result
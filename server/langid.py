@@ -0,0 +1,172 @@
+"""
+Lightweight language identification for article titles.
+
+Shared by the pipeline (which titles need translating) and cleanup_entry.py
+(which titles are not English). Most titles are pure ASCII, so str.isascii()
+answers the script question without looking at single characters. Other
+titles are encoded once and their UTF-8 lead bytes are counted with
+bytes.translate, which runs in C: a lead byte starts exactly one non-ASCII
+character, and its value tells the script block (Latin with accents,
+punctuation, or another script such as CJK, Arabic or Cyrillic).
+
+Script alone can't tell English from Spanish or Indonesian written in plain
+ASCII, so Latin-script titles fall back to a small stopword classifier. It
+only claims English when English stopwords clearly win; English word endings
+('-ing', '-ed', "'s") only break a tie, since Dutch, Scandinavian and
+Indonesian headlines are full of them too. Short or ambiguous titles are
+"undetermined" so callers can stay on the safe side (e.g. translate them anyway).
+"""
+import re
+
+import numpy as np
+
+LANGID_CONFIG = {
+    'non_ascii_ratio': 0.2,    # More non-ASCII characters than this -> not English
+    'non_latin_ratio': 0.2,    # More non-Latin-script characters than this -> not English
+    'min_english_hits': 1,     # English stopwords needed (and more than any other language)
+}
+
+# Language codes returned by detect_language besides the stopword languages
+NON_LATIN = 'non-latin'
+
+# Frequent function words in news headlines. Words shared with English or
+# across language families ('de', 'la', 'in', 'a', 'die', 'for', ...) are left
+# out on purpose. Danish, Norwegian and Swedish share some function words; any
+# of them marks a title as not English, which is what callers need.
+STOPWORDS = {
+    'en': {'the', 'of', 'and', 'to', 'for', 'with', 'from', 'after', 'over', 'says', 'said',
+           'by', 'at', 'as', 'is', 'are', 'was', 'were', 'be', 'been', 'has', 'have', 'will',
+           'its', 'his', 'her', 'their', 'they', 'that', 'this', 'who', 'what', 'how', 'why',
+           'amid', 'against', 'into', 'more', 'than', 'about', 'new', 'up', 'out', 'not',
+           'could', 'would', 'should', 'before', 'year', 'years', 'first', 'back'},
+    'es': {'el', 'los', 'las', 'del', 'y', 'por', 'para', 'con', 'una', 'que', 'se', 'su',
+           'sus', 'al', 'es', 'como', 'pero', 'tras', 'sobre', 'entre', 'hasta', 'más', 'años'},
+    'fr': {'le', 'les', 'des', 'du', 'et', 'pour', 'avec', 'une', 'sur', 'dans', 'est', 'aux',
+           'qui', 'au', 'pas', 'ses', 'leur', 'selon', 'après', 'contre', 'plus', 'ans'},
+    'de': {'der', 'das', 'und', 'ist', 'mit', 'für', 'von', 'den', 'dem', 'ein', 'eine', 'nicht',
+           'auf', 'bei', 'nach', 'wird', 'sich', 'auch', 'zum', 'zur', 'über', 'gegen', 'jahre'},
+    'it': {'il', 'della', 'delle', 'degli', 'che', 'per', 'con', 'una', 'sono', 'alla', 'dei',
+           'nel', 'nella', 'anche', 'più', 'dopo', 'contro', 'anni'},
+    'pt': {'os', 'da', 'do', 'das', 'dos', 'e', 'para', 'com', 'uma', 'em', 'na', 'não',
+           'ao', 'pelo', 'pela', 'após', 'mais', 'anos'},
+    'nl': {'het', 'een', 'van', 'op', 'met', 'voor', 'niet', 'zijn', 'bij', 'ook', 'naar',
+           'uit', 'wordt', 'tegen', 'jaar', 'na', 'nog', 'wil', 'nieuwe'},
+    'da': {'og', 'af', 'ikke', 'efter', 'fra', 'mod', 'bliver', 'hvor', 'nye', 'ved', 'være',
+           'til', 'det', 'som', 'skal', 'i'},
+    'sv': {'och', 'att', 'inte', 'från', 'mot', 'blir', 'enligt', 'ett', 'är', 'till', 'nya',
+           'hur', 'vid', 'om', 'ny', 'på', 'i'},
+    'no': {'og', 'ikke', 'etter', 'fra', 'mot', 'blir', 'hvordan', 'nye', 'ved', 'til', 'av',
+           'være', 'skal', 'på', 'i'},
+    'id': {'yang', 'dan', 'di', 'ke', 'dari', 'untuk', 'dengan', 'ini', 'itu', 'pada', 'akan',
+           'tidak', 'jadi', 'bisa', 'oleh', 'tahun', 'warga', 'baru', 'usai', 'telah', 'sudah',
+           'karena', 'saat', 'kepada', 'bagi', 'soal'},
+}
+
+# English word endings: only break a tie between English and another language
+ENGLISH_SUFFIXES = ("'s", "’s", 'ing', 'ed')
+
+WORD_RE = re.compile(r"[^\W\d_]+(?:['’][a-z]+)?")
+
+# UTF-8 lead bytes by what they start. 0xC2-0xC9: Latin-1 Supplement and Latin
+# Extended-A/B (accented letters); 0xE2: general punctuation, currency and
+# symbols (smart quotes, dashes). Every other lead byte starts a character of
+# another script.
+_LEAD_BYTES = bytes(range(0xC0, 0x100))
+_LATIN_LEAD_BYTES = bytes(range(0xC2, 0xCA))
+_NEUTRAL_LEAD_BYTES = b'\xe2'
+
+def _keep_only(keep):
+    """Deletion table for bytes.translate that drops every byte not in `keep`."""
+    return bytes(b for b in range(256) if b not in keep)
+
+_DROP_ALL_BUT_LEAD = _keep_only(_LEAD_BYTES)
+_DROP_ALL_BUT_NON_LATIN = _keep_only(set(_LEAD_BYTES) - set(_LATIN_LEAD_BYTES) - set(_NEUTRAL_LEAD_BYTES))
+
+def script_counts(text):
+    """
+    Returns (characters, non-ASCII characters, non-Latin-script characters) of text.
+    """
+    if text.isascii():
+        return len(text), 0, 0
+    data = text.encode('utf-8', 'surrogatepass')
+    return (len(text),
+            len(data.translate(None, _DROP_ALL_BUT_LEAD)),
+            len(data.translate(None, _DROP_ALL_BUT_NON_LATIN)))
+
+def non_ascii_ratio(text):
+    """Share of non-ASCII characters in text (0.0 for empty text)."""
+    if not text:
+        return 0.0
+    length, non_ascii, _ = script_counts(text)
+    return non_ascii / length
+
+def is_non_english(text):
+    """Returns True if text appears to be non-English (high non-ASCII ratio)."""
+    return non_ascii_ratio(text) > LANGID_CONFIG['non_ascii_ratio']
+
+def stopword_scores(text):
+    """Number of stopword hits per language for a Latin-script text."""
+    scores = dict.fromkeys(STOPWORDS, 0)
+    for word in WORD_RE.findall(text.lower()):
+        for lang, words in STOPWORDS.items():
+            if word in words:
+                scores[lang] += 1
+    return scores
+
+def english_suffix_hits(text):
+    """Number of words with an English ending ('-ing', '-ed', "'s")."""
+    return sum(len(word) > 4 and word.endswith(ENGLISH_SUFFIXES) for word in WORD_RE.findall(text.lower()))
+
+def detect_language(text):
+    """
+    Best guess of the language of text: 'en', another stopword language code,
+    NON_LATIN for other scripts, or None if undetermined.
+    """
+    if not isinstance(text, str) or not text:
+        return None
+    length, non_ascii, non_latin = script_counts(text)
+    if non_latin / length > LANGID_CONFIG['non_latin_ratio']:
+        return NON_LATIN
+
+    scores = stopword_scores(text)
+    english = scores.pop('en')
+    best_lang, best = max(scores.items(), key=lambda item: item[1])
+    if non_ascii / length > LANGID_CONFIG['non_ascii_ratio']:
+        # Mostly accented letters: never English
+        return best_lang if best else None
+    if english >= LANGID_CONFIG['min_english_hits']:
+        if english > best or (english == best and english_suffix_hits(text)):
+            return 'en'
+    if best > english:
+        return best_lang
+    return None
+
+def is_english(text):
+    """True only if text is confidently English (undetermined counts as not English)."""
+    return detect_language(text) == 'en'
+
+# --- Batch API (lists, numpy arrays or pandas columns) ---
+
+def _as_list(texts):
+    return texts.tolist() if hasattr(texts, 'tolist') else list(texts)
+
+def detect_languages(texts):
+    """detect_language for every text; returns a list."""
+    return [detect_language(text) for text in _as_list(texts)]
+
+def english_mask(texts):
+    """Boolean numpy array: True where the text is confidently English."""
+    texts = _as_list(texts)
+    return np.fromiter((detect_language(text) == 'en' for text in texts), dtype=bool, count=len(texts))
+
+def non_english_mask(texts):
+    """
+    Boolean numpy array: is_non_english for every text. ASCII texts (most of
+    them) are settled by str.isascii() alone; missing values count as English.
+    """
+    texts = _as_list(texts)
+    mask = np.zeros(len(texts), dtype=bool)
+    for i, text in enumerate(texts):
+        if isinstance(text, str) and not text.isascii():
+            mask[i] = is_non_english(text)
+    return mask
@@ -4,8 +4,22 @@ from fastapi.middleware.cors import CORSMiddleware
 
 import pandas as pd
 import os
+import threading
+from contextlib import asynccontextmanager
 
-app = FastAPI()
+from server.model.embed import EMBED_CONFIG, is_model_ready, model_id, warmup
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Loads the embedding model in the background, so the server accepts requests
+    right away and the first search doesn't pay for the model load (see /ready).
+    """
+    if EMBED_CONFIG['warmup_on_start']:
+        threading.Thread(target=warmup, name="embed-warmup", daemon=True).start()
+    yield
+
+app = FastAPI(lifespan=lifespan)
 
 # Allow CORS for frontend requests
 app.add_middleware(
@@ -24,8 +38,38 @@ import json
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CSV_PATH = os.path.join(BASE_DIR, "live_news.csv")
 
+from datetime import datetime, timedelta, timezone
+# news_archive (pyarrow) and gkg_fields are imported in read_root, so they don't
+# add to the start-up time of every worker
+
 @app.get("/")
-def read_root():
+def read_root(hours: float = 24, stream: str = None, fields: str = None):
+    """
+    Recent articles (English view) from the Parquet archive written by news_retrieve.py.
+    Only the partitions of the last `hours` are read. `fields` adds decoded GKG fields
+    (comma-separated: persons, organizations, tone, counts). Falls back to
+    live_news.csv when there is no archive yet.
+    """
+    from server.news_archive import ARCHIVE_COLUMNS, list_partitions, read_archive
+    from server.gkg_fields import RAW_FIELD_COLUMNS, decode_column
+
+    if list_partitions():
+        try:
+            start = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=hours)
+            extra = [f.strip() for f in fields.split(",") if f.strip() in RAW_FIELD_COLUMNS] if fields else []
+            df = read_archive(columns=ARCHIVE_COLUMNS + [RAW_FIELD_COLUMNS[f] for f in extra],
+                              start=start, stream=stream)
+            # Decoded only now, for the rows being returned
+            for field in extra:
+                df[field] = decode_column(df, field)
+                df = df.drop(columns=RAW_FIELD_COLUMNS[field])
+            # Convert NaN to None for valid JSON
+            df = df.astype(object).where(pd.notnull(df), None)
+            data = df.to_dict(orient="records")
+            return Response(content=json.dumps(data, indent=4), media_type="application/json")
+        except Exception as e:
+            return {"error": str(e)}
+    
     if os.path.exists(CSV_PATH):
         try:
             df = pd.read_csv(CSV_PATH)
@@ -40,6 +84,33 @@ def read_root():
 
 from server.db_handle.search_articles import search_articles
 from server.fuzzy_search import fuzzy_search
+from server.metrics import METRICS
+from server.model.query_cache import query_cache_stats
+
+
+@app.get("/ready")
+def ready():
+    """
+    Readiness probe: 200 once the embedding model is loaded, 503 before.
+    """
+    content = {"ready": is_model_ready(), "model": model_id()}
+    return Response(content=json.dumps(content), media_type="application/json",
+                    status_code=200 if content["ready"] else 503)
+
+
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus metrics of this API process (query embedding cache, embedding latency).
+    """
+    return Response(content=METRICS.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats/query-cache")
+def query_cache():
+    """
+    Hit statistics of the query embedding cache (this worker process).
+    """
+    return query_cache_stats()
 
 @app.get("/news")
 def get_news(query: str = None, count: int = 1000, threshold: float = 0.25, enable_fuzzy: bool = True):
@@ -106,7 +177,7 @@ async def chat(query: str):
     return {"response": response}
 
 # --- Metadata Unfurling Service ---
-from newspaper import Article
+# newspaper is imported in unfurl(): it is slow to import and only this endpoint needs it
 
 # Basic in-memory cache for unfurled metadata
 UNFURL_CACHE = {}
@@ -124,6 +195,8 @@ async def unfurl(url: str):
         return UNFURL_CACHE[url]
 
     try:
+        from newspaper import Article
+        
         # newspaper4k is great for finding the 'top_image' correctly
         article = Article(url)
         article.download()
@@ -0,0 +1,274 @@
+"""
+Pipeline metrics: counters, gauges and histograms in one process-wide registry.
+
+Instrumented code (news_retrieve.process_file, SupabaseClient.embed_articles /
+upsert_articles, embed_text) records into METRICS. The registry is exported in
+the Prometheus text format, as a textfile (atomically replaced, for the
+node_exporter textfile collector) and optionally over HTTP at /metrics. One
+JSON line per processed file is appended to a rolling history file, so
+throughput can be followed over days without a metrics server:
+
+    python metrics.py history --last 20
+
+No third-party packages are needed.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+METRICS_DIR = os.path.join(SERVER_DIR, "metrics")
+
+METRICS_CONFIG = {
+    'textfile': os.environ.get("METRICS_TEXTFILE", os.path.join(METRICS_DIR, "pipeline.prom")),
+    'history_file': os.environ.get("METRICS_HISTORY", os.path.join(METRICS_DIR, "history.jsonl")),
+    'history_max_lines': 20000,        # Oldest lines are dropped past this (about 70 days of both streams)
+    'http_port': int(os.environ["METRICS_PORT"]) if os.environ.get("METRICS_PORT") else None,
+}
+
+# Histogram buckets in seconds (per chunk stage up to whole-file times)
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# Histograms that don't measure seconds at DEFAULT_BUCKETS' scale
+METRIC_BUCKETS = {
+    'embed_batch_size': (1, 2, 4, 8, 16, 32, 64, 128),
+    'embed_queue_wait_seconds': (0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+}
+
+# name -> (type, help). Metrics not listed here are exported without HELP/TYPE.
+METRIC_DEFINITIONS = {
+    'pipeline_files_total': ('counter', "GKG files processed, by stream and result"),
+    'pipeline_file_seconds': ('histogram', "Wall time to process one GKG file"),
+    'pipeline_rows_total': ('counter', "Rows by stream and kind (parsed, duplicate, archived)"),
+    'pipeline_stage_busy_seconds_total': ('counter', "Time spent inside each pipeline stage"),
+    'pipeline_stage_items_total': ('counter', "Chunks handled by each pipeline stage"),
+    'pipeline_stage_errors_total': ('counter', "Chunks that failed in each pipeline stage"),
+    'pipeline_queue_depth_peak': ('gauge', "Highest input queue depth of each stage during the last file"),
+    'pipeline_fallbacks_total': ('counter', "Fallback paths taken (schema scan, untranslated titles, translation skipped)"),
+    'pipeline_translation_total': ('counter', "Translation work by kind (cache_hit, translated, failed, request, retry, split_batch)"),
+    'pipeline_freshness_lag_seconds': ('gauge', "Publish -> ingested lag of the newest processed file"),
+    'pipeline_last_success_timestamp_seconds': ('gauge', "Unix time of the last successfully processed file"),
+    'supabase_seconds': ('histogram', "Time of SupabaseClient calls by operation"),
+    'supabase_articles_total': ('counter', "Articles by operation and result"),
+    'embed_seconds': ('histogram', "Time of one embed_text call"),
+    'embed_texts_total': ('counter', "Texts passed to embed_text"),
+    'embed_errors_total': ('counter', "embed_text calls that failed"),
+    'embed_model_load_seconds': ('gauge', "Time it took to load the embedding model"),
+    'embed_batch_size': ('histogram', "Texts per model call of the micro-batching scheduler"),
+    'embed_queue_wait_seconds': ('histogram', "Time a single-text embed_text call waited to be batched"),
+    'query_cache_total': ('counter', "Search query embeddings by result (hit, shared_hit, miss)"),
+    'embed_dedup_total': ('counter', "Article field texts by kind (duplicate in batch, cache_hit, embedded)"),
+}
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}    # name -> {label key: value}
+        self._gauges = {}
+        self._histograms = {}  # name -> {label key: [bucket counts..., count, sum]}
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def buckets_for(self, name):
+        return METRIC_BUCKETS.get(name, self.buckets)
+
+    def observe(self, name, value, **labels):
+        buckets = self.buckets_for(name)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = _label_key(labels)
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [0] * (len(buckets) + 2)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += 1
+            state[-1] += value
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observes the duration of the block into histogram `name` (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def get(self, name, **labels):
+        """Current value of a counter or gauge (0 if never set)."""
+        key = _label_key(labels)
+        with self._lock:
+            for store in (self._counters, self._gauges):
+                if name in store:
+                    return store[name].get(key, 0)
+        return 0
+
+    def render(self):
+        """The registry in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            names = sorted(set(self._counters) | set(self._gauges) | set(self._histograms))
+            for name in names:
+                if name in METRIC_DEFINITIONS:
+                    kind, help_text = METRIC_DEFINITIONS[name]
+                    lines.append(f"# HELP {name} {help_text}")
+                    lines.append(f"# TYPE {name} {kind}")
+                for store in (self._counters, self._gauges):
+                    for key, value in sorted(store.get(name, {}).items()):
+                        lines.append(f"{name}{_format_labels(key)} {value}")
+                for key, state in sorted(self._histograms.get(name, {}).items()):
+                    for bound, count in zip(self.buckets_for(name), state):
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', bound)])} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {state[-2]}")
+                    lines.append(f"{name}_count{_format_labels(key)} {state[-2]}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {state[-1]}")
+        return '\n'.join(lines) + '\n'
+
+# The process-wide registry. This file is imported as `metrics` by the scripts in
+# server/ and as `server.metrics` by the API; both names share one registry.
+_other_module = sys.modules.get('server.metrics' if __name__ == 'metrics' else 'metrics')
+METRICS = getattr(_other_module, 'METRICS', None) or MetricsRegistry()
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+def write_textfile(path=None, registry=METRICS):
+    """Writes the registry to a .prom file (temp file + rename, so scrapers never see half a file)."""
+    path = path or METRICS_CONFIG['textfile']
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(registry.render())
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"  [Warning: could not write metrics textfile {path}: {e}]")
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = METRICS
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        data = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_http_server(port=None, host='0.0.0.0'):
+    """Serves /metrics from a daemon thread. Returns the server (None if no port is configured)."""
+    port = port if port is not None else METRICS_CONFIG['http_port']
+    if port is None:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    print(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+# ============================================================================
+# ROLLING HISTORY
+# ============================================================================
+
+_history_lock = threading.Lock()
+_history_lines = {}  # path -> lines in the file (counted on first append)
+
+def append_history(record, path=None):
+    """
+    Appends one JSON record to the history file, dropping the oldest lines once
+    it grows past history_max_lines (trimmed in one go at 10% over, not every append).
+    """
+    path = path or METRICS_CONFIG['history_file']
+    max_lines = METRICS_CONFIG['history_max_lines']
+    try:
+        with _history_lock:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            if path not in _history_lines:
+                _history_lines[path] = 0
+                if os.path.exists(path):
+                    with open(path) as f:
+                        _history_lines[path] = sum(1 for _ in f)
+            with open(path, 'a') as f:
+                f.write(json.dumps(record, default=str) + '\n')
+            _history_lines[path] += 1
+
+            if _history_lines[path] > max_lines * 1.1:
+                with open(path) as f:
+                    lines = f.readlines()[-max_lines:]
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w') as f:
+                    f.writelines(lines)
+                os.replace(tmp_path, path)
+                _history_lines[path] = len(lines)
+    except OSError as e:
+        print(f"  [Warning: could not write metrics history {path}: {e}]")
+
+def read_history(path=None, last=None):
+    """Records of the history file, oldest first (the `last` N only, if given)."""
+    path = path or METRICS_CONFIG['history_file']
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        lines = f.readlines()
+    if last:
+        lines = lines[-last:]
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect pipeline metrics.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    history_parser = subparsers.add_parser("history", help="Throughput of the last processed files")
+    history_parser.add_argument("--last", type=int, default=20)
+    history_parser.add_argument("--stream", choices=["translation", "original"], default=None)
+    subparsers.add_parser("show", help="Print the last metrics textfile")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        with open(METRICS_CONFIG['textfile']) as f:
+            print(f.read(), end='')
+    else:
+        records = [r for r in read_history() if not args.stream or r.get('stream') == args.stream][-args.last:]
+        for r in records:
+            busy = ' '.join(f"{name} {seconds:.1f}s" for name, seconds in r.get('stage_busy_seconds', {}).items())
+            print(f"{r['time']}  {r['stream']:<11} {r['rows_parsed']:>6} rows  {r['wall_seconds']:6.1f}s  "
+                  f"{r['rows_per_sec']:7.0f} rows/s  {'ok' if r['ok'] else 'FAILED'}  | {busy}")
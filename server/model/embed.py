@@ -1,20 +1,133 @@
 import os
+import sys
+import threading
+import time
 
 # Disable TQDM progress bars to prevent [Errno 22] Invalid argument in server context
 os.environ["TQDM_DISABLE"] = "1"
 
-from sentence_transformers import SentenceTransformer
 import numpy as np
 
-# Load the model once when this module is imported
+try:
+    from server.metrics import METRICS
+except ImportError:
+    # Running from server/ or server/model/
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from metrics import METRICS
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
 # 'all-MiniLM-L6-v2' is a fast, lightweight choice for general use
-print("Loading Hugging Face model locally...")
-model = SentenceTransformer('all-MiniLM-L6-v2')
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+EMBED_CONFIG = {
+    # 'torch': SentenceTransformer (PyTorch, fp32)
+    # 'onnx': int8-quantized ONNX Runtime export of the same model (see onnx_embed.py),
+    #         exported on first use; check it with `python onnx_embed.py parity`
+    'backend': os.environ.get("EMBED_BACKEND", "torch"),
+    'onnx_dir': os.environ.get("EMBED_ONNX_DIR", os.path.join(MODEL_DIR, "onnx", MODEL_NAME)),
+    # Load the model in the background when the API starts (main.py), instead of on the first search
+    'warmup_on_start': os.environ.get("EMBED_WARMUP", "1") != "0",
+    # Single-text calls (search queries) from concurrent requests are batched into one
+    # model call (see embed_batcher.py): wait up to batch_window_ms after the first one
+    'micro_batching': os.environ.get("EMBED_MICROBATCH", "1") != "0",
+    'batch_window_ms': float(os.environ.get("EMBED_BATCH_WINDOW_MS", "3")),
+    'max_batch_size': int(os.environ.get("EMBED_MAX_BATCH", "32")),
+}
+
+def load_model(backend=None):
+    """
+    Loads the embedding model for `backend` (default EMBED_CONFIG['backend']).
+    Returns (model with SentenceTransformer's encode(), model id). The id names
+    the model and backend, so caches keep int8 vectors apart from fp32 ones.
+    Falls back to PyTorch if the ONNX backend can't be loaded.
+    """
+    backend = backend or EMBED_CONFIG['backend']
+    if backend == 'onnx':
+        try:
+            try:
+                from server.model.onnx_embed import load_onnx_embedder
+            except ImportError:
+                from model.onnx_embed import load_onnx_embedder
+            print("Loading int8 ONNX embedding model...")
+            return load_onnx_embedder(MODEL_NAME, EMBED_CONFIG['onnx_dir']), f"{MODEL_NAME}/onnx-int8"
+        except Exception as e:
+            print(f"  [Warning: ONNX backend unavailable, using PyTorch: {e}]")
+    elif backend != 'torch':
+        print(f"  [Warning: unknown embedding backend {backend!r}, using PyTorch]")
+
+    from sentence_transformers import SentenceTransformer
+    print("Loading Hugging Face model locally...")
+    return SentenceTransformer(MODEL_NAME), MODEL_NAME
+
+# The model is loaded on first use, not on import: importing this module (the API,
+# check_db.py, cleanup_entry.py, ...) must not pay for torch and the model weights
+_model = None
+_model_id = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """The embedding model, loaded once (thread-safe) on the first call."""
+    global _model, _model_id
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                started = time.perf_counter()
+                loaded, loaded_id = load_model()
+                _model_id = loaded_id
+                _model = loaded
+                METRICS.set('embed_model_load_seconds', time.perf_counter() - started)
+                print(f"  [Embedding model {loaded_id} loaded in {time.perf_counter() - started:.1f}s]")
+    return _model
+
+def model_id():
+    """
+    Name of the model and backend that actually loaded, used as the cache namespace
+    (embed_cache.py, query_cache.py) so int8 vectors are never mixed with fp32 ones.
+    A backend other than 'torch' can fall back to PyTorch when it loads, so for
+    those the model is loaded first; PyTorch is known without loading it.
+    """
+    if _model_id is None and EMBED_CONFIG['backend'] != 'torch':
+        get_model()
+    return _model_id or MODEL_NAME
+
+def is_model_ready():
+    """True once the model is loaded."""
+    return _model is not None
+
+def warmup():
+    """
+    Loads the model and runs one encode, so the first real request doesn't pay
+    for either. Returns the seconds it took (None if loading failed).
+    """
+    started = time.perf_counter()
+    try:
+        get_model().encode(["warmup"], convert_to_numpy=True)
+    except Exception as e:
+        print(f"  [Warning: embedding warmup failed: {e}]")
+        return None
+    return time.perf_counter() - started
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+def get_batcher():
+    """The micro-batching scheduler for single-text calls, created on first use."""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            try:
+                from server.model.embed_batcher import EmbeddingBatcher
+            except ImportError:
+                from model.embed_batcher import EmbeddingBatcher
+            _batcher = EmbeddingBatcher(lambda texts: get_model().encode(texts, convert_to_numpy=True),
+                                        EMBED_CONFIG['batch_window_ms'], EMBED_CONFIG['max_batch_size'])
+        return _batcher
 
 def embed_text(text):
     """
     Generate embeddings for text (single string or list of strings).
-    Uses local Hugging Face model 'all-MiniLM-L6-v2'.
+    Uses local Hugging Face model 'all-MiniLM-L6-v2' (PyTorch or int8 ONNX, see EMBED_CONFIG).
     
     Args:
         text: String or List[String]
@@ -22,13 +135,20 @@ def embed_text(text):
     Returns:
         numpy.ndarray: Embedding vector(s)
     """
+    METRICS.inc('embed_texts_total', 1 if isinstance(text, str) else len(text))
     try:
         # Generate the embeddings
         # convert_to_numpy=True returns a numpy array directly
-        embeddings = model.encode(text, convert_to_numpy=True)
+        with METRICS.timer('embed_seconds'):
+            if isinstance(text, str) and EMBED_CONFIG['micro_batching']:
+                # Batched with other requests' queries; lists are already batches
+                embeddings = get_batcher().embed(text)
+            else:
+                embeddings = get_model().encode(text, convert_to_numpy=True)
         return embeddings
     except Exception as e:
         print(f"Error embedding text: {e}")
+        METRICS.inc('embed_errors_total')
         return None
 
 def find_most_similar(query_embedding, candidate_embeddings, top_k=5):
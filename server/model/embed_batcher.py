@@ -0,0 +1,112 @@
+"""
+Micro-batching scheduler for single-text embeddings.
+
+Under concurrent load every /news request embeds its own query, and CPU
+inference at batch size 1 leaves most of the matrix kernels' throughput
+unused. EmbeddingBatcher queues single-text requests; one worker thread
+takes the first waiting request, collects whatever else arrives within
+window_ms of it (up to max_batch texts), runs one batched encode and hands
+every caller its own vector. Requests that queued up while the model was
+busy go out in the next batch right away. Identical texts within a batch are
+encoded once. If a batched encode fails, its texts are encoded one at a time,
+so an error reaches only the callers of the text that caused it.
+
+The batch size distribution and the time callers spend waiting in the queue
+are recorded in METRICS (embed_batch_size, embed_queue_wait_seconds).
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+try:
+    from server.metrics import METRICS
+except ImportError:
+    from metrics import METRICS
+
+class _Request:
+    __slots__ = ('text', 'future', 'enqueued')
+
+    def __init__(self, text):
+        self.text = text
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+class EmbeddingBatcher:
+    """
+    Collects concurrent embed(text) calls into batched encode_fn(list of texts)
+    calls (encode_fn returns one row per text). Safe to call from any thread.
+    """
+    def __init__(self, encode_fn, window_ms, max_batch):
+        self.encode_fn = encode_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_worker(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, text):
+        """Queues one text; returns a Future of its vector."""
+        if self._thread is None:
+            self._ensure_worker()
+        request = _Request(text)
+        self._queue.put(request)
+        return request.future
+
+    def embed(self, text, timeout=None):
+        """Vector of one text (raises what encode_fn raised)."""
+        return self.submit(text).result(timeout)
+
+    def _collect(self, first):
+        """The first request plus what arrives within the window of it, up to max_batch."""
+        batch = [first]
+        deadline = first.enqueued + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # Window over: take only what is already waiting
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect(self._queue.get())
+            started = time.perf_counter()
+            for request in batch:
+                METRICS.observe('embed_queue_wait_seconds', started - request.enqueued)
+            METRICS.observe('embed_batch_size', len(batch))
+
+            # Concurrent searches for the same topic are encoded once
+            index = {}
+            positions = [index.setdefault(request.text, len(index)) for request in batch]
+            try:
+                results = list(self.encode_fn(list(index)))
+            except Exception:
+                results = self._encode_each(list(index))
+            for request, position in zip(batch, positions):
+                result = results[position]
+                if isinstance(result, Exception):
+                    request.future.set_exception(result)
+                else:
+                    request.future.set_result(result)
+
+    def _encode_each(self, texts):
+        """Vector (or the exception raised) of every text, encoded on its own."""
+        results = []
+        for text in texts:
+            try:
+                results.append(self.encode_fn([text])[0])
+            except Exception as e:
+                results.append(e)
+        return results
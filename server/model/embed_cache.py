@@ -0,0 +1,167 @@
+"""
+Deduplicated, cached embedding of article fields.
+
+The themes and location_names of a batch are very repetitive (thousands of
+articles share "Fiji" or "Elections;President"), and titles of syndicated
+stories repeat too. embed_unique embeds every distinct string once, scatters
+the vectors back to the rows, and keeps the vectors in a persistent SQLite
+cache keyed by a content hash of (model, text), so strings seen in earlier
+batches are not embedded again. Least recently used entries are evicted past
+max_entries.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+try:
+    from server.metrics import METRICS
+except ImportError:
+    from metrics import METRICS
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+EMBED_CACHE_CONFIG = {
+    'cache_file': os.environ.get("EMBED_CACHE_FILE", os.path.join(MODEL_DIR, "embedding_cache.db")),
+    'cache_enabled': True,     # False: still deduplicate within a batch, but keep nothing between batches
+    'max_entries': 100000,     # Least recently used vectors are evicted beyond this (~1.5 KB each at 384 dims)
+}
+
+def content_key(text, namespace):
+    """Cache key of a text: sha1 of the model namespace and the text."""
+    return hashlib.sha1(f"{namespace}\n{text}".encode('utf-8', 'surrogatepass')).digest()
+
+class EmbeddingCache:
+    """
+    Persistent content hash -> float32 vector cache in SQLite.
+    Safe to share between threads; every access goes through one connection and lock.
+    """
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key BLOB PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+
+    def get_many(self, keys):
+        """Returns {key: vector} for the keys that are cached, and marks them as used."""
+        found = {}
+        now = time.time()
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update((key, np.frombuffer(vector, dtype=np.float32)) for key, vector in rows)
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, pairs):
+        """Stores (key, vector) pairs, then evicts the oldest entries above max_entries."""
+        if not pairs:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in pairs]
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if count > self.max_entries:
+                # Evict down to 90% so we don't pay for an eviction on every batch
+                excess = count - int(self.max_entries * 0.9)
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (excess,)
+                )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """Opens the shared embedding cache on first use (None if it is disabled or can't be opened)."""
+    global _cache
+    if not EMBED_CACHE_CONFIG['cache_enabled']:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = EmbeddingCache(EMBED_CACHE_CONFIG['cache_file'], EMBED_CACHE_CONFIG['max_entries'])
+            except sqlite3.Error as e:
+                print(f"  [Warning: embedding cache unavailable, embedding everything: {e}]")
+                return None
+        return _cache
+
+def embed_unique(texts, embed_fn, namespace, cache=None):
+    """
+    Embeds `texts` with embed_fn (list of strings -> 2-D array, or None on failure),
+    calling it only for distinct strings that are not in the cache.
+
+    Returns:
+        (array with one row per text, or None if embed_fn failed;
+         stats dict {'texts', 'unique', 'cache_hits', 'embedded'})
+    """
+    texts = [str(text) for text in texts]
+    # Position of every text in the list of distinct strings
+    index = {}
+    positions = [index.setdefault(text, len(index)) for text in texts]
+    unique = list(index)
+    stats = {'texts': len(texts), 'unique': len(unique), 'cache_hits': 0, 'embedded': 0}
+    if not unique:
+        return np.zeros((0, 0), dtype=np.float32), stats
+
+    keys = [content_key(text, namespace) for text in unique]
+    cached = {}
+    if cache is not None:
+        try:
+            cached = cache.get_many(keys)
+        except sqlite3.Error as e:
+            print(f"  [Warning: embedding cache read failed: {e}]")
+    missing = [i for i, key in enumerate(keys) if key not in cached]
+    stats['cache_hits'] = len(unique) - len(missing)
+
+    vectors = [cached.get(key) for key in keys]
+    if missing:
+        embedded = embed_fn([unique[i] for i in missing])
+        if embedded is None:
+            return None, stats
+        embedded = np.asarray(embedded, dtype=np.float32)
+        for i, vector in zip(missing, embedded):
+            vectors[i] = vector
+        stats['embedded'] = len(missing)
+        if cache is not None:
+            try:
+                cache.put_many([(keys[i], vector) for i, vector in zip(missing, embedded)])
+            except sqlite3.Error as e:
+                print(f"  [Warning: embedding cache write failed: {e}]")
+
+    METRICS.inc('embed_dedup_total', len(texts) - len(unique), kind='duplicate')
+    METRICS.inc('embed_dedup_total', stats['cache_hits'], kind='cache_hit')
+    METRICS.inc('embed_dedup_total', stats['embedded'], kind='embedded')
+    # Scatter the distinct vectors back to every row
+    return np.stack(vectors)[positions], stats
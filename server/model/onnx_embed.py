@@ -0,0 +1,260 @@
+"""
+ONNX Runtime CPU backend for the all-MiniLM-L6-v2 embedder.
+
+The SentenceTransformer model is exported once to ONNX (the BERT encoder
+only; mean pooling and L2 normalization are done here in numpy) and its
+weights are quantized to int8 with dynamic quantization. OnnxEmbedder
+has the same encode() as SentenceTransformer, so embed.py can swap it in
+(EMBED_BACKEND=onnx). Texts are sorted by length before batching, so a batch
+is padded only to its own longest text.
+
+The tokenizer is loaded with the `tokenizers` package, and inference needs
+only onnxruntime: the embedder doesn't import torch or transformers. Export,
+parity check and benchmark need sentence_transformers as well:
+
+    python onnx_embed.py export                      # -> onnx/all-MiniLM-L6-v2/
+    python onnx_embed.py parity                      # exit 1 if cosine to PyTorch < min_cosine
+    python onnx_embed.py bench --batch-sizes 1,8,32,128
+"""
+import json
+import os
+import time
+
+import numpy as np
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ONNX_CONFIG = {
+    'opset': 14,
+    'min_cosine': 0.99,        # Parity: every sample must stay this close to the PyTorch vector
+    'intra_op_threads': int(os.environ["EMBED_ONNX_THREADS"]) if os.environ.get("EMBED_ONNX_THREADS") else None,
+}
+
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+META_FILE = "embedder.json"
+
+# Headlines of the kind the pipeline embeds, for the parity check and benchmark
+SAMPLE_TEXTS = [
+    "Fiji prime minister calls snap election amid budget row",
+    "Elections;President;Government",
+    "Paris, Ile-de-France, France;Lyon, Rhone-Alpes, France",
+    "Central bank holds interest rates as inflation cools",
+    "Floods displace thousands in northern Bangladesh",
+    "Climate Change;Natural Disaster;Flood",
+    "Tech giants face new antitrust probe in Europe",
+    "Wildfire smoke blankets western Canada for a third day",
+    "Oil prices rise after supply cuts extended",
+    "Protesters rally outside parliament over pension reform",
+    "Scientists map the genome of an ancient wheat variety",
+    "Armed Conflict;Military;Peacekeeping",
+    "Election results delayed as vote count continues in Nairobi",
+    "a",
+    "",
+    "Stock markets tumble as investors weigh recession risk " * 20,
+]
+
+def export_onnx(model_name, out_dir, quantize=True):
+    """
+    Exports `model_name` (SentenceTransformer) to out_dir: the fp32 ONNX encoder,
+    its int8 dynamically quantized copy, tokenizer.json and embedder.json
+    (max_seq_length, normalize). Returns out_dir.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(out_dir, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device='cpu')
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+    tokenizer.save_pretrained(out_dir)
+
+    sample = tokenizer(["export sample", "a slightly longer export sample"], padding=True, return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+    fp32_path = os.path.join(out_dir, FP32_FILE)
+    print(f"Exporting {model_name} to {fp32_path}...")
+    with torch.no_grad():
+        torch.onnx.export(transformer, tuple(sample[name] for name in input_names), fp32_path,
+                          input_names=input_names, output_names=['last_hidden_state'],
+                          dynamic_axes=dynamic_axes, opset_version=ONNX_CONFIG['opset'])
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        int8_path = os.path.join(out_dir, INT8_FILE)
+        print(f"Quantizing to {int8_path} (dynamic int8)...")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+    meta = {
+        'model_name': model_name,
+        'max_seq_length': st_model.max_seq_length,
+        'normalize': any(type(module).__name__ == 'Normalize' for module in st_model),
+        'dimension': st_model.get_sentence_embedding_dimension(),
+    }
+    with open(os.path.join(out_dir, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return out_dir
+
+class OnnxEmbedder:
+    """
+    Sentence embeddings (mean pooling, optional L2 normalization) from an
+    exported encoder, with SentenceTransformer's encode() signature.
+    """
+    def __init__(self, model_dir, quantized=True, intra_op_threads=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=self.meta['max_seq_length'])
+        pad_id = self.tokenizer.token_to_id('[PAD]') or 0
+        self.tokenizer.enable_padding(pad_id=pad_id, pad_token='[PAD]')
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.path = os.path.join(model_dir, INT8_FILE if quantized else FP32_FILE)
+        self.session = ort.InferenceSession(self.path, options, providers=['CPUExecutionProvider'])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self):
+        return self.meta['dimension']
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, **kwargs):
+        """Embeds a string (-> 1-D array) or a list of strings (-> 2-D array)."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else [str(text) for text in sentences]
+        embeddings = np.zeros((len(texts), self.meta['dimension']), dtype=np.float32)
+        # Longest first, so every batch is padded only to its own longest text
+        order = sorted(range(len(texts)), key=lambda i: -len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            embeddings[batch] = self._encode_batch([texts[i] for i in batch])
+        return embeddings[0] if single else embeddings
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self.input_names:
+            feeds['token_type_ids'] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        hidden = self.session.run(['last_hidden_state'], feeds)[0]
+
+        # Mean over the real (non-padding) tokens
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.meta['normalize']:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+def load_onnx_embedder(model_name, model_dir, quantized=True):
+    """OnnxEmbedder for model_dir, exporting the model there first if needed."""
+    if not os.path.exists(os.path.join(model_dir, INT8_FILE if quantized else FP32_FILE)):
+        export_onnx(model_name, model_dir, quantize=quantized)
+    return OnnxEmbedder(model_dir, quantized, ONNX_CONFIG['intra_op_threads'])
+
+def cosine_rows(a, b):
+    """Cosine similarity of matching rows of a and b."""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    norms = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    return (a * b).sum(axis=1) / np.clip(norms, 1e-12, None)
+
+def parity_check(reference, candidate, texts, min_cosine):
+    """
+    Embeds texts with both models and compares them row by row.
+    Returns (passed, min cosine, mean cosine, worst text).
+    """
+    cosines = cosine_rows(reference.encode(texts, convert_to_numpy=True),
+                          candidate.encode(texts, convert_to_numpy=True))
+    worst = int(np.argmin(cosines))
+    return bool(cosines.min() >= min_cosine), float(cosines.min()), float(cosines.mean()), texts[worst]
+
+def benchmark(models, texts, batch_sizes, repeats=3):
+    """
+    Texts/sec of every model at every batch size (best of `repeats` runs).
+    Returns {name: {batch_size: texts per second}}.
+    """
+    results = {}
+    for name, model in models.items():
+        model.encode(texts[:8], convert_to_numpy=True)  # Warm up
+        results[name] = {}
+        for batch_size in batch_sizes:
+            best = None
+            for _ in range(repeats):
+                start = time.perf_counter()
+                model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results[name][batch_size] = len(texts) / best
+            print(f"  {name:<10} batch {batch_size:>4}: {results[name][batch_size]:8.1f} texts/sec")
+    return results
+
+def load_texts(path, count):
+    """`count` texts from a file (one per line), or the samples repeated."""
+    if path:
+        with open(path, encoding='utf-8') as f:
+            texts = [line.rstrip('\n') for line in f if line.strip()]
+    else:
+        texts = SAMPLE_TEXTS
+    return [texts[i % len(texts)] for i in range(count)] if count else list(texts)
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    from sentence_transformers import SentenceTransformer
+
+    parser = argparse.ArgumentParser(description="Export, check and benchmark the ONNX embedding backend.")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--dir", default=None, help="Export directory (default: onnx/<model>)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Export and quantize the model")
+    export_parser.add_argument("--no-quantize", action="store_true")
+    parity_parser = subparsers.add_parser("parity", help="Compare the int8 ONNX model with PyTorch")
+    parity_parser.add_argument("--min-cosine", type=float, default=ONNX_CONFIG['min_cosine'])
+    parity_parser.add_argument("--texts", default=None, help="File with one text per line (default: built-in samples)")
+    bench_parser = subparsers.add_parser("bench", help="Texts/sec of PyTorch, ONNX fp32 and ONNX int8")
+    bench_parser.add_argument("--batch-sizes", default="1,8,32,128")
+    bench_parser.add_argument("--count", type=int, default=512, help="Texts per run")
+    bench_parser.add_argument("--texts", default=None)
+    bench_parser.add_argument("--json", default=None, help="Write the results to this file")
+    args = parser.parse_args()
+
+    model_dir = args.dir or os.path.join(MODEL_DIR, "onnx", args.model)
+    if args.command == "export":
+        export_onnx(args.model, model_dir, quantize=not args.no_quantize)
+        print(f"Exported to {model_dir}")
+        sys.exit(0)
+
+    reference = SentenceTransformer(args.model, device='cpu')
+    if args.command == "parity":
+        texts = load_texts(args.texts, 0)
+        candidate = load_onnx_embedder(args.model, model_dir, quantized=True)
+        passed, min_cos, mean_cos, worst = parity_check(reference, candidate, texts, args.min_cosine)
+        print(f"int8 ONNX vs PyTorch on {len(texts)} texts: min cosine {min_cos:.5f}, mean {mean_cos:.5f} "
+              f"(worst: {worst[:60]!r})")
+        print("PASS" if passed else f"FAIL: below {args.min_cosine}")
+        sys.exit(0 if passed else 1)
+
+    texts = load_texts(args.texts, args.count)
+    load_onnx_embedder(args.model, model_dir, quantized=True)
+    models = {
+        'torch': reference,
+        'onnx-fp32': OnnxEmbedder(model_dir, quantized=False, intra_op_threads=ONNX_CONFIG['intra_op_threads']),
+        'onnx-int8': OnnxEmbedder(model_dir, quantized=True, intra_op_threads=ONNX_CONFIG['intra_op_threads']),
+    }
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',')]
+    print(f"Embedding {len(texts)} texts per run:")
+    results = benchmark(models, texts, batch_sizes)
+    for batch_size in batch_sizes:
+        speedup = results['onnx-int8'][batch_size] / results['torch'][batch_size]
+        print(f"  batch {batch_size:>4}: int8 ONNX is {speedup:.1f}x PyTorch")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({name: {str(size): rate for size, rate in rates.items()} for name, rates in results.items()},
+                      f, indent=2)
@@ -0,0 +1,149 @@
+"""
+Query embedding cache for the search path.
+
+/news and /chat embed the search query on every request, while the globe UI
+keeps sending the same handful of topic strings. embed_query normalizes the
+query (Unicode NFKC, lower case, collapsed whitespace: all-MiniLM-L6-v2 is
+uncased, so this doesn't change the vector) and keeps normalized text ->
+float32 vector in a bounded, thread-safe LRU, so repeat searches skip the
+model entirely.
+
+With QUERY_CACHE_CONFIG['shared_file'] set (env QUERY_CACHE_FILE), misses
+also go through a SQLite store (the EmbeddingCache of embed_cache.py), which
+all uvicorn worker processes on the host share.
+"""
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    from server.metrics import METRICS
+    from server.model.embed_cache import EmbeddingCache, content_key
+except ImportError:
+    from metrics import METRICS
+    from model.embed_cache import EmbeddingCache, content_key
+
+QUERY_CACHE_CONFIG = {
+    'max_entries': 2048,                                   # Queries kept in memory per process (LRU)
+    'shared_file': os.environ.get("QUERY_CACHE_FILE"),     # SQLite store shared between processes (None: off)
+    'shared_max_entries': 50000,                           # Least recently used entries are evicted beyond this
+}
+
+def normalize_query(text):
+    """Cache form of a query: NFKC, lower case, single spaces, no outer whitespace."""
+    return ' '.join(unicodedata.normalize('NFKC', str(text)).lower().split())
+
+class QueryEmbeddingCache:
+    """
+    In-memory LRU of normalized query -> float32 vector, with hit statistics.
+    Safe to share between threads.
+    """
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.stats = {'hits': 0, 'shared_hits': 0, 'misses': 0, 'evicted': 0}
+
+    def get(self, key):
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+            return vector
+
+    def put(self, key, vector):
+        # Read-only, so a cached vector can be handed to every caller
+        vector = np.array(vector, dtype=np.float32).reshape(-1)
+        vector.setflags(write=False)
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evicted'] += 1
+        return vector
+
+    def count(self, kind):
+        with self._lock:
+            self.stats[kind] += 1
+
+    def summary(self):
+        """Copy of the stats plus entries and hit_rate."""
+        with self._lock:
+            summary = dict(self.stats)
+            summary['entries'] = len(self._entries)
+        lookups = summary['hits'] + summary['shared_hits'] + summary['misses']
+        summary['hit_rate'] = round((summary['hits'] + summary['shared_hits']) / lookups, 4) if lookups else 0.0
+        return summary
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+_cache = QueryEmbeddingCache(QUERY_CACHE_CONFIG['max_entries'])
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_shared_store():
+    """Opens the cross-process store on first use (None if not configured or unavailable)."""
+    global _shared
+    path = QUERY_CACHE_CONFIG['shared_file']
+    if not path:
+        return None
+    with _shared_lock:
+        if _shared is None:
+            try:
+                _shared = EmbeddingCache(path, QUERY_CACHE_CONFIG['shared_max_entries'])
+            except Exception as e:
+                print(f"  [Warning: shared query cache unavailable: {e}]")
+                QUERY_CACHE_CONFIG['shared_file'] = None
+                return None
+        return _shared
+
+def embed_query(query, embed_fn, namespace):
+    """
+    Embedding of one search query (1-D float32, read-only) through the caches;
+    embed_fn (str -> vector, or None on failure) runs only on a miss.
+    `namespace` (embed.model_id()) keeps vectors of different models apart.
+    Returns None if embedding failed.
+    """
+    text = normalize_query(query)
+    key = (namespace, text)
+    vector = _cache.get(key)
+    if vector is not None:
+        _cache.count('hits')
+        METRICS.inc('query_cache_total', result='hit')
+        return vector
+
+    shared = get_shared_store()
+    store_key = content_key(text, namespace)
+    if shared is not None:
+        try:
+            found = shared.get_many([store_key])
+        except Exception as e:
+            print(f"  [Warning: shared query cache read failed: {e}]")
+            found = {}
+        if store_key in found:
+            _cache.count('shared_hits')
+            METRICS.inc('query_cache_total', result='shared_hit')
+            return _cache.put(key, found[store_key])
+
+    _cache.count('misses')
+    METRICS.inc('query_cache_total', result='miss')
+    embedding = embed_fn(text)
+    if embedding is None:
+        return None
+    vector = _cache.put(key, embedding)
+    if shared is not None:
+        try:
+            shared.put_many([(store_key, vector)])
+        except Exception as e:
+            print(f"  [Warning: shared query cache write failed: {e}]")
+    return vector
+
+def query_cache_stats():
+    """Hit statistics of this process: hits, shared_hits, misses, evicted, entries, hit_rate."""
+    return _cache.summary()
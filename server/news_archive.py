@@ -0,0 +1,395 @@
+"""
+Parquet archive of parsed GKG articles.
+
+Replaces the two ever-growing CSVs (news.csv / news_raw.csv). Every batch is
+written as compressed Parquet under
+
+    <root>/stream=<stream>/date=<YYYYMMDD>/hour=<HH>/part-<write time ns>-<id>.parquet
+
+with one row per article holding both the raw and the cleaned/English fields
+(see CHUNK_COLUMNS in news_retrieve.py). The English view is the cleaned fields
+plus the translated title, restricted to rows with in_english = True; the raw
+view is the original title and the uncleaned themes/locations.
+
+Files are written under a hidden temp name and renamed into place once the
+whole batch is on disk, so readers never see a half-written file. A batch that
+spans several partitions is committed one rename per partition: that is not
+atomic, a reader can briefly see some of its partitions and a crash can leave
+the rest unwritten. Retrying is safe, because rows whose URL is already in the
+partition are skipped; the same goes for a GKG file that failed part way and
+is processed again from the start. The archived URLs of recently written
+partitions are kept in memory (loaded once per partition), and writers of one
+partition are serialized. Writers in other processes are not seen; compaction
+drops any duplicates they leave. Readers
+only open the partitions that overlap the requested time range and only the
+columns they ask for.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ARCHIVE_CONFIG = {
+    'root': os.environ.get("NEWS_ARCHIVE_DIR", os.path.join(SERVER_DIR, "news_archive")),
+    'compression': 'zstd',
+    'dedupe_urls': True,       # Skip rows whose URL is already archived in the partition (retried files)
+    'url_cache_partitions': 48,  # Partitions whose URL sets are kept in memory for dedupe_urls
+}
+
+# Columns of both views (same names and order as the old CSVs)
+ARCHIVE_COLUMNS = ['date', 'source_name', 'url', 'title', 'themes',
+                   'location_names', 'location_countries',
+                   'first_location_lat', 'first_location_lon']
+
+# Undecoded GKG fields (see gkg_fields.py). Both views can read them, but
+# they are not part of the default columns (or of a CSV export).
+GKG_RAW_COLUMNS = ['persons_raw', 'organizations_raw', 'tone_raw', 'counts_raw']
+
+# View column -> stored column
+VIEW_SOURCES = {
+    'english': {col: col for col in ARCHIVE_COLUMNS + GKG_RAW_COLUMNS},
+    'raw': {**{col: col for col in ARCHIVE_COLUMNS + GKG_RAW_COLUMNS},
+            'themes': 'themes_raw', 'location_names': 'location_names_raw'},
+}
+
+# Stored columns (one fixed schema, so files written from any batch line up)
+ARCHIVE_SCHEMA = pa.schema([
+    ('date', pa.string()),
+    ('source_name', pa.string()),
+    ('url', pa.string()),
+    ('title', pa.string()),               # Original title
+    ('title_english', pa.string()),       # Translated title (translation stream), else null
+    ('themes', pa.string()),
+    ('themes_raw', pa.string()),
+    ('location_names', pa.string()),
+    ('location_names_raw', pa.string()),
+    ('location_countries', pa.string()),
+    ('first_location_lat', pa.float64()),
+    ('first_location_lon', pa.float64()),
+    ('in_english', pa.bool_()),           # Row belongs to the English view
+    ('persons_raw', pa.string()),         # V2Persons as published (null in files written before)
+    ('organizations_raw', pa.string()),   # V2Organizations
+    ('tone_raw', pa.string()),            # V2Tone
+    ('counts_raw', pa.string()),          # V2Counts
+])
+
+DATE_FORMAT = '%Y%m%d%H%M%S'
+
+# ============================================================================
+# WRITING
+# ============================================================================
+
+def _partition_key(date_value, default):
+    """(YYYYMMDD, HH) for a GKG date string; rows without a valid date use `default`."""
+    if isinstance(date_value, str) and len(date_value) >= 10 and date_value[:10].isdigit():
+        return date_value[:8], date_value[8:10]
+    return default
+
+def new_batch_id():
+    """File name stem that sorts in write order (partition_files relies on it)."""
+    return f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+
+def write_batch(df, stream, in_english=None, root=None):
+    """
+    Archives one batch (a chunk frame with CHUNK_COLUMNS, optionally 'title_english').
+    in_english: boolean mask of rows for the English view (None = all rows).
+    With ARCHIVE_CONFIG['dedupe_urls'], rows whose URL the partition already holds are dropped.
+    Returns the paths of the files written.
+    """
+    root = root or ARCHIVE_CONFIG['root']
+    if df.empty:
+        return []
+
+    table_df = df.reindex(columns=ARCHIVE_SCHEMA.names)
+    table_df['in_english'] = True if in_english is None else in_english
+
+    now = datetime.now(timezone.utc)
+    default_key = (now.strftime('%Y%m%d'), now.strftime('%H'))
+    keys = [_partition_key(value, default_key) for value in table_df['date'].tolist()]
+    table_df['_partition'] = [f"date={day}/hour={hour}" for day, hour in keys]
+
+    batch_id = new_batch_id()
+    parts = [(os.path.join(root, f"stream={stream}", partition), part)
+             for partition, part in table_df.groupby('_partition', sort=True)]
+    # One writer per partition from check to commit (locks taken in sorted order)
+    locks = [partition_lock(directory) for directory, _ in parts]
+    for lock in locks:
+        lock.acquire()
+    try:
+        return _write_parts(parts, batch_id)
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+
+def _write_parts(parts, batch_id):
+    """write_batch with the partition locks held."""
+    staged = []
+    try:
+        for directory, part in parts:
+            if ARCHIVE_CONFIG['dedupe_urls']:
+                urls = partition_urls(directory)
+                part = part[~part['url'].isin(urls)]
+                if part.empty:
+                    continue
+            os.makedirs(directory, exist_ok=True)
+            table = pa.Table.from_pandas(part.drop(columns='_partition'), schema=ARCHIVE_SCHEMA,
+                                         preserve_index=False)
+            final_path = os.path.join(directory, f"part-{batch_id}.parquet")
+            tmp_path = os.path.join(directory, f".tmp-{batch_id}.parquet")
+            pq.write_table(table, tmp_path, compression=ARCHIVE_CONFIG['compression'])
+            staged.append((tmp_path, final_path, directory, part['url']))
+    except Exception:
+        for tmp_path, *_ in staged:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        raise
+
+    # Commit: every file of the batch is complete, now make them visible (one partition at a time)
+    for tmp_path, final_path, directory, urls in staged:
+        os.replace(tmp_path, final_path)
+        if ARCHIVE_CONFIG['dedupe_urls']:
+            partition_urls(directory).update(urls.dropna())
+    return [final_path for _, final_path, *_ in staged]
+
+# Partition directory -> set of its archived URLs (most recently used last)
+_partition_urls = OrderedDict()
+_partition_locks = {}
+_partition_state_lock = threading.Lock()
+
+def partition_lock(directory):
+    """Lock serializing writers (and compaction) of one partition in this process."""
+    with _partition_state_lock:
+        return _partition_locks.setdefault(os.path.abspath(directory), threading.Lock())
+
+def partition_urls(directory):
+    """
+    Archived URLs of a partition, read from disk the first time the partition is
+    written in this process and kept up to date by write_batch afterwards.
+    Call with the partition lock held.
+    """
+    key = os.path.abspath(directory)
+    with _partition_state_lock:
+        urls = _partition_urls.get(key)
+        if urls is not None:
+            _partition_urls.move_to_end(key)
+            return urls
+    urls = archived_urls(directory) if os.path.isdir(directory) else set()
+    with _partition_state_lock:
+        _partition_urls[key] = urls
+        while len(_partition_urls) > ARCHIVE_CONFIG['url_cache_partitions']:
+            _partition_urls.popitem(last=False)
+    return urls
+
+# ============================================================================
+# READING
+# ============================================================================
+
+def list_partitions(stream=None, start=None, end=None, root=None):
+    """
+    Returns [(hour datetime, stream, directory)] oldest first, for the partitions
+    of `stream` (None = all) whose hour overlaps [start, end].
+    """
+    root = root or ARCHIVE_CONFIG['root']
+    if not os.path.isdir(root):
+        return []
+
+    partitions = []
+    streams = [stream] if stream else [name.split('=', 1)[1] for name in os.listdir(root)
+                                       if name.startswith('stream=')]
+    for stream_name in streams:
+        stream_dir = os.path.join(root, f"stream={stream_name}")
+        if not os.path.isdir(stream_dir):
+            continue
+        for date_name in os.listdir(stream_dir):
+            if not date_name.startswith('date='):
+                continue
+            day = date_name.split('=', 1)[1]
+            for hour_name in os.listdir(os.path.join(stream_dir, date_name)):
+                if not hour_name.startswith('hour='):
+                    continue
+                try:
+                    hour = datetime.strptime(day + hour_name.split('=', 1)[1], '%Y%m%d%H')
+                except ValueError:
+                    continue
+                # Prune whole hours outside the range
+                if start is not None and hour + timedelta(hours=1) <= start:
+                    continue
+                if end is not None and hour > end:
+                    continue
+                partitions.append((hour, stream_name, os.path.join(stream_dir, date_name, hour_name)))
+    partitions.sort()
+    return partitions
+
+def partition_files(directory):
+    """Committed Parquet files of a partition, oldest batch first."""
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.startswith('part-') and name.endswith('.parquet'))
+
+def archived_urls(directory):
+    """Set of the URLs already stored in a partition (reads only the url column)."""
+    paths = partition_files(directory)
+    if not paths:
+        return set()
+    return set(_read_files(paths, ['url'])['url'].dropna())
+
+def _stored_columns(columns, variant):
+    sources = VIEW_SOURCES[variant]
+    needed = {sources[col] for col in columns}
+    if variant == 'english':
+        needed.add('in_english')
+        if 'title' in columns:
+            needed.add('title_english')
+    if 'date' not in columns:
+        needed.add('date')
+    return [name for name in ARCHIVE_SCHEMA.names if name in needed]
+
+def _to_view(df, columns, variant, start, end):
+    """Turns stored columns into the requested view columns (filters rows as needed)."""
+    if variant == 'english':
+        df = df[df['in_english'].fillna(False).astype(bool)]
+    if start is not None:
+        df = df[df['date'] >= start.strftime(DATE_FORMAT)]
+    if end is not None:
+        df = df[df['date'] <= end.strftime(DATE_FORMAT)]
+
+    view = pd.DataFrame(index=df.index)
+    for col in columns:
+        if variant == 'english' and col == 'title':
+            view[col] = df['title_english'].fillna(df['title'])
+        else:
+            view[col] = df[VIEW_SOURCES[variant][col]]
+    return view.reset_index(drop=True)
+
+def _read_files(paths, stored):
+    tables = [pq.read_table(path, columns=stored, schema=ARCHIVE_SCHEMA) for path in paths]
+    if not tables:
+        return pd.DataFrame(columns=stored)
+    return pa.concat_tables(tables).to_pandas()
+
+def read_archive(columns=None, start=None, end=None, stream=None, variant='english', root=None):
+    """
+    Reads articles from the archive as a DataFrame with ARCHIVE_COLUMNS names.
+
+    Args:
+        columns: Subset of ARCHIVE_COLUMNS (None = all) and GKG_RAW_COLUMNS to read;
+            only these are decoded.
+        start, end: Naive UTC datetimes bounding the article date (inclusive); partitions
+            outside the range are never opened.
+        stream: 'translation', 'original' or None for both.
+        variant: 'english' (cleaned, translated) or 'raw' (original titles, raw codes).
+    """
+    columns = list(columns or ARCHIVE_COLUMNS)
+    stored = _stored_columns(columns, variant)
+    paths = [path for _, _, directory in list_partitions(stream, start, end, root)
+             for path in partition_files(directory)]
+    return _to_view(_read_files(paths, stored), columns, variant, start, end)
+
+def read_latest(limit, columns=None, stream=None, variant='english', root=None):
+    """
+    Reads the most recent `limit` articles (oldest of them first), opening
+    partitions newest first and stopping once enough rows are found.
+    """
+    columns = list(columns or ARCHIVE_COLUMNS)
+    # 'date' is needed to order the result
+    view_columns = columns if 'date' in columns else columns + ['date']
+    stored = _stored_columns(view_columns, variant)
+
+    frames = []
+    found = 0
+    for _, _, directory in reversed(list_partitions(stream, root=root)):
+        df = _to_view(_read_files(partition_files(directory), stored), view_columns, variant, None, None)
+        frames.append(df)
+        found += len(df)
+        if found >= limit:
+            break
+    if not frames:
+        return pd.DataFrame(columns=columns)
+
+    # Partitions of both streams can cover the same hour: order by article date
+    df = pd.concat(reversed(frames), ignore_index=True)
+    df = df.sort_values('date', kind='stable').tail(limit)
+    return df[columns].reset_index(drop=True)
+
+# ============================================================================
+# MAINTENANCE
+# ============================================================================
+
+def rewrite_files(func, stream=None, start=None, end=None, root=None):
+    """
+    Applies func(stored DataFrame) -> DataFrame or None (unchanged) to every archive
+    file in range, replacing changed files atomically. Returns the number of files changed.
+    """
+    changed = 0
+    for _, _, directory in list_partitions(stream, start, end, root):
+        for path in partition_files(directory):
+            df = pq.read_table(path, schema=ARCHIVE_SCHEMA).to_pandas()
+            new_df = func(df)
+            if new_df is None:
+                continue
+            tmp_path = os.path.join(directory, f".tmp-{os.path.basename(path)}")
+            table = pa.Table.from_pandas(new_df, schema=ARCHIVE_SCHEMA, preserve_index=False)
+            pq.write_table(table, tmp_path, compression=ARCHIVE_CONFIG['compression'])
+            os.replace(tmp_path, path)
+            changed += 1
+    return changed
+
+def compact_partition(directory):
+    """
+    Merges the many per-batch files of a finished partition into one file,
+    keeping the first (oldest) row of every URL.
+    """
+    with partition_lock(directory):
+        return _compact_partition(directory)
+
+def _compact_partition(directory):
+    paths = partition_files(directory)
+    if len(paths) < 2:
+        return False
+    table = pa.concat_tables([pq.read_table(path, schema=ARCHIVE_SCHEMA) for path in paths])
+    urls = table.column('url').to_pandas()
+    table = table.filter(pa.array((~urls.duplicated() | urls.isna()).to_numpy()))
+    batch_id = new_batch_id()
+    tmp_path = os.path.join(directory, f".tmp-{batch_id}.parquet")
+    pq.write_table(table, tmp_path, compression=ARCHIVE_CONFIG['compression'])
+    # The merged file sorts after the ones it replaces, so a reader that lists the
+    # directory in between sees either the old files or (briefly) duplicates, never a gap
+    os.replace(tmp_path, os.path.join(directory, f"part-{batch_id}.parquet"))
+    for path in paths:
+        os.remove(path)
+    return True
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect and maintain the Parquet news archive.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Write (part of) the archive to CSV")
+    export_parser.add_argument("--out", required=True, help="CSV file to write")
+    export_parser.add_argument("--variant", choices=["english", "raw"], default="english")
+    export_parser.add_argument("--stream", choices=["translation", "original"], default=None)
+    export_parser.add_argument("--hours", type=float, default=None, help="Only the last N hours")
+    compact_parser = subparsers.add_parser("compact", help="Merge batch files of finished hours")
+    compact_parser.add_argument("--stream", choices=["translation", "original"], default=None)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        start = None
+        if args.hours:
+            start = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=args.hours)
+        df = read_archive(start=start, stream=args.stream, variant=args.variant)
+        df.to_csv(args.out, index=False)
+        print(f"Wrote {len(df)} rows to {args.out}")
+    else:
+        # Leave the current hour alone, it is still being written
+        current_hour = datetime.now(timezone.utc).replace(tzinfo=None, minute=0, second=0, microsecond=0)
+        merged = sum(compact_partition(directory) for hour, _, directory in list_partitions(args.stream)
+                     if hour < current_hour)
+        print(f"Compacted {merged} partitions")
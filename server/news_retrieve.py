@@ -1,25 +1,141 @@
 
-import requests
 import pandas as pd
+import numpy as np
 import io
+import os
+import sys
 import time
+import struct
+import threading
 import zipfile
-from datetime import datetime
-from deep_translator import GoogleTranslator
+import zlib
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
 import html
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import re
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import compress, islice
+from collections import deque
+from contextlib import contextmanager
 
-# GDELT 2.0 Global Knowledge Graph (GKG)
-MASTER_URL_TRANSLATION = "http://data.gdeltproject.org/gdeltv2/masterfilelist-translation.txt"
-MASTER_URL_ORIGINAL = "http://data.gdeltproject.org/gdeltv2/masterfilelist.txt"
+# Sibling modules are imported flat (like db_handle below), so make sure server/ is importable
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+if SERVER_DIR not in sys.path:
+    sys.path.append(SERVER_DIR)
 
-ARCHIVE_FILE = "news.csv"  # Cleaned, English titles
-ARCHIVE_FILE_RAW = "news_raw.csv"  # Raw, original titles, uncleaned themes/locations
+from theme_names import lookup_theme, theme_lookup_stats
+from gdelt_feed import (SESSION, UPDATE_INTERVAL, get_latest_entry, gkg_timestamp,
+                        list_gkg_entries, missing_entries)
+from pipeline_checkpoint import PipelineCheckpoint
+from translation import TRANSLATION_CONFIG, translate_texts
+from langid import english_mask, non_english_mask
+from gkg_fields import RAW_FIELD_COLUMNS
+from url_index import URL_INDEX_CONFIG, SeenUrlIndex, refresh_from_db
+from staged_pipeline import Stage, run_stages, format_stage_stats
+from news_archive import ARCHIVE_COLUMNS, ARCHIVE_CONFIG, write_batch
+from gkg_download import DOWNLOAD_STATS, iter_download
+from metrics import METRICS, METRICS_CONFIG, append_history, start_http_server, write_textfile
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv as pa_csv
+except ImportError:
+    # Only needed for the 'columnar' parser engine
+    pa = None
+
+# Articles are archived as Parquet, partitioned by stream/date/hour (see news_archive.py).
+# ARCHIVE_COLUMNS (from news_archive) are the columns of its English and raw views.
+
+# Columns of a parsed chunk. Raw and English views share every column except the
+# cleaned/raw themes and location names (and the translated title, added as
+# 'title_english' by translation), so a chunk is one frame, archived once.
+# The *_raw GKG fields at the end are kept undecoded (see gkg_fields.py).
+CHUNK_COLUMNS = ['date', 'source_name', 'url', 'title',
+                 'themes', 'themes_raw', 'location_names', 'location_names_raw',
+                 'location_countries', 'first_location_lat', 'first_location_lon',
+                 'persons_raw', 'organizations_raw', 'tone_raw', 'counts_raw']
+
+# Chunk column for each ARCHIVE_COLUMNS field of the English view
+ENGLISH_ARCHIVE_SOURCES = ARCHIVE_COLUMNS
+
+# --- CONFIGURATION: PIPELINE LOOP ---
+PIPELINE_CONFIG = {
+    'checkpoint_file': "pipeline_checkpoint.json",  # Processed GKG URLs per stream (survives restarts)
+    'catchup_workers': 4,        # Files processed concurrently when replaying a gap
+    'max_file_attempts': 5,      # Failed attempts (one per poll) before a file is given up and recorded as failed
+}
+
+# --- CONFIGURATION: POLL SCHEDULE (per stream) ---
+# Files are stamped :00/:15/:30/:45 and show up in lastupdate.txt a few minutes later.
+SCHEDULE_CONFIG = {
+    'initial_publish_delay': 300,   # Seconds from file timestamp to availability (learned as we go)
+    'early_seconds': 30,            # Start fast polling this long before the expected time
+    'fast_poll_seconds': 10,        # Poll interval around the expected time
+    'fast_window_seconds': 300,     # Keep fast polling this long past the expected time
+    'slow_poll_seconds': 60,        # Poll interval when a file is late or the feed is down
+}
+
+# --- CONFIGURATION: STAGED INGESTION (process_file) ---
+# Worker threads per stage; each queue holds `queue_size` chunks per worker of the
+# stage it feeds, so a slow stage holds back the ones before it (backpressure).
+PIPELINE_STAGES = {
+    'queue_size': 2,
+    'parse_workers': 1,          # CPU-bound; pyarrow (columnar engine) runs outside the GIL
+    'translate_workers': 1,      # Each call already sends requests in parallel (translation.py)
+    'embed_workers': 1,          # One model; a single caller keeps its batches large
+    'upsert_workers': 2,         # Network-bound
+}
+
+# --- CONFIGURATION: STREAMING ---
+# GKG files are streamed: the download (or the local cached copy, see DOWNLOAD_CONFIG
+# in gkg_download.py) feeds the zip decoder directly and rows are handled in bounded
+# chunks, so memory stays flat regardless of file size.
+STREAM_CONFIG = {
+    'chunk_rows': 5000,                   # Rows parsed/translated/written/ingested at a time
+    'engine': 'python',                   # 'python' (row by row) or 'columnar' (vectorized pyarrow)
+    'columnar_block_bytes': 16 << 20,     # Decompressed bytes per pyarrow CSV block (columnar engine)
+    'parse_processes': 1,                 # >1: decompress to a temp file and parse byte ranges in a process pool (see below)
+    'range_bytes': 8 << 20,               # Decompressed bytes per parallel parse range (cut at line ends)
+}
 
 # --- CONFIGURATION: SELECT FIELDS TO EXTRACT ---
 # NOTE: GDELT GKG uses tab-separated format with 27 columns (0-indexed)
-# See GDELT_GKG_FIELDS.txt for complete field reference
+# See GDELT_GKG_FIELDS.md for complete field reference
+
+# Fixed GKG 2.1 column layout (one name per position, from the GKG 2.1 codebook)
+GKG_COLUMNS = (
+    'gkg_record_id',         # 0
+    'date',                  # 1
+    'source_collection_id',  # 2
+    'source_name',           # 3
+    'url',                   # 4
+    'v1_counts',             # 5
+    'v2_counts',             # 6
+    'v1_themes',             # 7
+    'v2_themes',             # 8
+    'v1_locations',          # 9
+    'v2_locations',          # 10
+    'v1_persons',            # 11
+    'v2_persons',            # 12
+    'v1_organizations',      # 13
+    'v2_organizations',      # 14
+    'v2_tone',               # 15
+    'v21_dates',             # 16
+    'v21_gcam',              # 17
+    'v21_share_image',       # 18
+    'v21_related_images',    # 19
+    'v21_social_image_embeds', # 20
+    'v21_social_video_embeds', # 21
+    'v21_quotations',        # 22
+    'v21_all_names',         # 23
+    'v21_amounts',           # 24
+    'v21_translation_info',  # 25
+    'v2_extras',             # 26
+)
+GKG_NUM_COLUMNS = len(GKG_COLUMNS)
+GKG_COL = {name: idx for idx, name in enumerate(GKG_COLUMNS)}
 
 # Simple fields (direct extraction - no parsing needed)
 SIMPLE_FIELDS = {
@@ -33,8 +149,11 @@ SIMPLE_FIELDS = {
 COMPLEX_FIELDS = {
     6:  'v2_counts',         # Death counts, protests, arrests (needs parsing)
     8:  'v2_themes',         # Article themes/topics (needs parsing)
-    # Note: V2Persons, V2Organizations, V2Locations, V2Tone are in the last few columns
-    # Their exact indices can vary. We'll detect them dynamically or use -1, -2, -3, -4
+    10: 'v2_locations',      # Geocoded locations with coordinates
+    12: 'v2_persons',        # People mentioned
+    14: 'v2_organizations',  # Organizations mentioned
+    15: 'v2_tone',           # Sentiment scores
+    26: 'v2_extras',         # XML block holding <PAGE_TITLE>
 }
 
 # Configuration: Which parsed sub-fields to extract
@@ -43,20 +162,31 @@ EXTRACT_CONFIG = {
     'locations': True,        # Extract location data
     'page_title': True,       # Extract article title from V2Extras field
     
-    # Disable other complex fields per user request
-    'persons': False,
-    'organizations': False,
-    'tone': False,
-    'counts': False,
+    # Kept as the raw GKG text and only decoded when read (see gkg_fields.py),
+    # so these cost a string copy per row at ingest time
+    'persons': True,
+    'organizations': True,
+    'tone': True,
+    'counts': True,
     
     # Sub-options for locations
     'location_limit': 3,      # Max number of locations to extract per article (0 = all)
     'extract_coordinates': True,  # Include lat/long in output
-    
-    # Sub-options for tone
-    'tone_overall_only': True,
 }
 
+# GKG column of each field kept raw (EXTRACT_CONFIG key -> column index)
+RAW_FIELD_INDEXES = {
+    'persons': GKG_COL['v2_persons'],
+    'organizations': GKG_COL['v2_organizations'],
+    'tone': GKG_COL['v2_tone'],
+    'counts': GKG_COL['v2_counts'],
+}
+
+def raw_fields():
+    """(chunk column, GKG column index) of every raw field enabled in EXTRACT_CONFIG."""
+    return [(RAW_FIELD_COLUMNS[field], idx) for field, idx in RAW_FIELD_INDEXES.items()
+            if EXTRACT_CONFIG[field]]
+
 # ============================================================================
 # PARSING FUNCTIONS FOR COMPLEX GDELT FIELDS
 # ============================================================================
@@ -112,40 +242,6 @@ def parse_v2_themes(themes_str):
     
     return result
 
-def parse_v2_persons(persons_str):
-    """
-    Parse V2Persons field to extract person names.
-    Input: "Joe Biden,234,9;Kamala Harris,567,13"
-    Output: ["Joe Biden", "Kamala Harris"]
-    """
-    if not persons_str or persons_str.strip() == '':
-        return []
-    
-    persons = []
-    for person_block in persons_str.split(';'):
-        if person_block:
-            # Format: Name,Offset,Length - we only want the name
-            person_name = person_block.split(',')[0]
-            persons.append(person_name)
-    return persons
-
-def parse_v2_organizations(orgs_str):
-    """
-    Parse V2Organizations field to extract organization names.
-    Input: "United Nations,134,14;Apple Inc,789,9"
-    Output: ["United Nations", "Apple Inc"]
-    """
-    if not orgs_str or orgs_str.strip() == '':
-        return []
-    
-    orgs = []
-    for org_block in orgs_str.split(';'):
-        if org_block:
-            # Format: Name,Offset,Length - we only want the name
-            org_name = org_block.split(',')[0]
-            orgs.append(org_name)
-    return orgs
-
 def parse_v2_locations(locations_str, extract_coords=True, limit=0):
     """
     Parse V2Locations field to extract location data with frequency counts.
@@ -207,103 +303,23 @@ def parse_v2_locations(locations_str, extract_coords=True, limit=0):
     
     return deduplicated
 
-def parse_v2_tone(tone_str, overall_only=True):
-    """
-    Parse V2Tone field to extract sentiment metrics.
-    Input: "-2.5,3.2,5.7,2.5,12.3,4.8"
-    Output: Dict with tone metrics or just overall tone score
-    
-    Six dimensions (comma-separated):
-    1. Tone (overall sentiment: -100 to +100)
-    2. Positive Score (% positive words)
-    3. Negative Score (% negative words)
-    4. Polarity (abs difference)
-    5. Activity Reference Density
-    6. Self/Group Reference Density
-    """
-    if not tone_str or tone_str.strip() == '':
-        return None
-    
-    parts = tone_str.split(',')
-    
-    if overall_only:
-        try:
-            return float(parts[0])
-        except (ValueError, IndexError):
-            return None
-    else:
-        try:
-            return {
-                'tone': float(parts[0]) if len(parts) > 0 else None,
-                'positive': float(parts[1]) if len(parts) > 1 else None,
-                'negative': float(parts[2]) if len(parts) > 2 else None,
-                'polarity': float(parts[3]) if len(parts) > 3 else None,
-                'activity': float(parts[4]) if len(parts) > 4 else None,
-                'self_reference': float(parts[5]) if len(parts) > 5 else None,
-            }
-        except ValueError:
-            return None
-
-def parse_v2_counts(counts_str):
-    """
-    Parse V2Counts field to extract count data.
-    Input: "KILL#50#militants#Baghdad;PROTEST#1000#students#Paris"
-    Output: List of dicts with count info
-    
-    Format: CountType#Number#ObjectType#Location
-    """
-    if not counts_str or counts_str.strip() == '':
-        return []
-    
-    counts = []
-    for count_block in counts_str.split(';'):
-        if count_block:
-            parts = count_block.split('#')
-            if len(parts) >= 2:
-                count = {
-                    'type': parts[0] if len(parts) > 0 else '',
-                    'number': parts[1] if len(parts) > 1 else '',
-                    'object': parts[2] if len(parts) > 2 else '',
-                    'location': parts[3] if len(parts) > 3 else '',
-                }
-                counts.append(count)
-    
-    return counts
-
 def clean_theme_name(theme_code):
     """
     Cleans a GDELT theme code into a human-readable string.
     Example: "TAX_FNCACT_PRESIDENT" -> "President"
     Example: "WB_696_PUBLIC_SECTOR_MANAGEMENT" -> "Public Sector Management"
+    
+    Known codes come from the precomputed taxonomy table in theme_names.py;
+    anything else is cleaned once and memoized there.
     """
     if not theme_code:
         return ""
     
     # Remove count if present (e.g., "THEME:5")
     if ':' in theme_code:
-        theme_names = theme_code.split(':')
-        theme_code = theme_names[0]
-        # Keep count if needed, but for embedding name is key
-    
-    cleaned = theme_code
-    
-    # Remove common prefixes
-    prefixes = [
-        r"TAX_FNCACT_", r"TAX_ETHNICITY_", r"TAX_WORLDLANGUAGES_", r"TAX_WORLDMAMMALS_", 
-        r"TAX_POLITICAL_PARTY_", r"TAX_",
-        r"WB_\d+_", r"WB_",
-        r"CRISISLEX_C\d+_", r"CRISISLEX_T\d+_", r"CRISISLEX_O\d+_", r"CRISISLEX_",
-        r"UNGP_", r"SOC_", r"ECON_", r"ENV_", r"EPU_POLICY_", r"EPU_", r"GEN_",
-        r"USPEC_", r"LEADER", r"GENERAL_", r"GOV_"
-    ]
-    
-    for prefix in prefixes:
-        cleaned = re.sub(f"^{prefix}", "", cleaned)
-        
-    # Replace underscores with spaces and Title Case
-    cleaned = cleaned.replace('_', ' ').title().strip()
+        theme_code = theme_code.split(':', 1)[0]
     
-    return cleaned
+    return lookup_theme(theme_code)
 
 def clean_location_name(location_name):
     """
@@ -324,335 +340,1334 @@ def clean_location_name(location_name):
 # GDELT DATA FETCHING AND PROCESSING
 # ============================================================================
 
-def get_latest_url(master_url):
-    """Fetches the latest GKG file URL from the given master list."""
+class ZipStreamReader(io.RawIOBase):
+    """
+    Decompresses the first member of a zip archive while it is still downloading.
+    
+    zipfile.ZipFile needs the central directory at the *end* of the archive, which
+    forces us to buffer the whole download. GDELT zips hold a single file, so we
+    read its local header at the start of the stream and feed the body straight
+    into zlib instead. Memory use is bounded by the HTTP chunk size.
+    """
+    
+    _LOCAL_HEADER = struct.Struct('<4s5H3I2H')
+    _OUT_CHUNK = 256 * 1024  # Max decompressed bytes produced per zlib call
+    
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = b''      # Compressed bytes read but not yet fed to zlib
+        self._out = b''          # Decompressed bytes not yet handed out
+        self._out_pos = 0
+        self._decomp = None
+        self._stored_left = None
+        self._crc = 0
+        self._expected_crc = None
+        self._eof = False
+        self._read_local_header()
+    
+    def readable(self):
+        return True
+    
+    def _next_chunk(self):
+        if self._pending:
+            data, self._pending = self._pending, b''
+            return data
+        for chunk in self._chunks:
+            if chunk:
+                return chunk
+        raise zipfile.BadZipFile("Zip stream ended before the end of the compressed data")
+    
+    def _fill(self, n):
+        """Ensure at least n header bytes are buffered in self._pending."""
+        parts = [self._pending]
+        size = len(self._pending)
+        while size < n:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                raise zipfile.BadZipFile("Zip stream too short for a local file header")
+            parts.append(chunk)
+            size += len(chunk)
+        self._pending = b''.join(parts)
+    
+    def _read_local_header(self):
+        size = self._LOCAL_HEADER.size
+        self._fill(size)
+        (signature, _version, flags, method, _mtime, _mdate,
+         crc, compressed_size, _size, name_len, extra_len) = self._LOCAL_HEADER.unpack_from(self._pending)
+        if signature != b'PK\x03\x04':
+            raise zipfile.BadZipFile("Not a zip stream (bad local header signature)")
+        
+        self._fill(size + name_len + extra_len)
+        self._pending = self._pending[size + name_len + extra_len:]
+        
+        # Bit 3: sizes/CRC live in a data descriptor after the data, not in the header
+        has_descriptor = bool(flags & 0x08)
+        if not has_descriptor:
+            self._expected_crc = crc
+        
+        if method == zipfile.ZIP_DEFLATED:
+            self._decomp = zlib.decompressobj(-zlib.MAX_WBITS)
+        elif method == zipfile.ZIP_STORED and not has_descriptor:
+            self._stored_left = compressed_size
+            self._eof = compressed_size == 0
+        else:
+            raise zipfile.BadZipFile(f"Unsupported zip compression method for streaming: {method}")
+    
+    def _pump(self):
+        """Decompress the next piece of the stream into self._out."""
+        if self._decomp is not None:
+            data = self._decomp.unconsumed_tail or self._next_chunk()
+            self._out = self._decomp.decompress(data, self._OUT_CHUNK)
+            self._eof = self._decomp.eof
+        else:
+            data = self._next_chunk()
+            self._out = data[:self._stored_left]
+            self._stored_left -= len(self._out)
+            self._eof = self._stored_left == 0
+        self._out_pos = 0
+        self._crc = zlib.crc32(self._out, self._crc)
+        
+        if self._eof and self._expected_crc is not None and self._crc != self._expected_crc:
+            raise zipfile.BadZipFile("Bad CRC-32 for streamed zip member")
+    
+    def readinto(self, b):
+        while self._out_pos >= len(self._out):
+            if self._eof:
+                return 0
+            self._pump()
+        
+        n = min(len(b), len(self._out) - self._out_pos)
+        b[:n] = self._out[self._out_pos:self._out_pos + n]
+        self._out_pos += n
+        return n
+
+@contextmanager
+def open_gkg_stream(url, md5=None, size=None):
+    """
+    Opens the GDELT GKG zip at `url` as a streaming, decompressed binary file object.
+    The bytes (from the local cache, or from GDELT while being cached) go straight into
+    the zip decoder, so the file is never held in memory. md5 and size are the checksum
+    and byte count from the file list, if known (a truncated download fails the check).
+    """
+    chunks = iter_download(url, md5, size)
+    try:
+        with io.BufferedReader(ZipStreamReader(chunks)) as f:
+            yield f
+        # The zip's central directory follows the data: read it as well, so the
+        # download completes and is committed to the cache
+        for _ in chunks:
+            pass
+    finally:
+        # Stops a download the parser didn't read to the end (it can be resumed later)
+        chunks.close()
+
+def decode_gkg_line(raw_line):
+    """Decodes one raw GKG line (GDELT is usually ISO-8859-1 / Latin-1)."""
+    try:
+        return raw_line.decode('latin-1').rstrip('\n')
+    except:
+        return raw_line.decode('utf-8', errors='ignore').rstrip('\n')
+
+def iter_gkg_lines(url, md5=None, size=None):
+    """Streams the GKG file at `url` and yields its decoded lines one at a time."""
+    with open_gkg_stream(url, md5, size) as f:
+        for raw_line in f:
+            yield decode_gkg_line(raw_line)
+
+# Rows read by fixed index vs. rows that needed the heuristic column scan
+# (process totals; files are parsed concurrently, so updates go through count_schema)
+SCHEMA_STATS = {'fixed': 0, 'fallback': 0}
+_schema_lock = threading.Lock()
+# Counters of the file whose chunk the current thread is parsing (see file_schema_stats)
+_schema_file = threading.local()
+
+def count_schema(key, count=1):
+    """Adds to SCHEMA_STATS and to the counters of the file being parsed on this thread."""
+    if not count:
+        return
+    file_stats = getattr(_schema_file, 'stats', None)
+    # Several parse threads can share one file's counters too
+    with _schema_lock:
+        SCHEMA_STATS[key] += count
+        if file_stats is not None:
+            file_stats[key] += count
+
+@contextmanager
+def file_schema_stats(file_stats):
+    """Attributes count_schema calls on this thread to `file_stats` while the block runs."""
+    previous = getattr(_schema_file, 'stats', None)
+    _schema_file.stats = file_stats
     try:
-        r = requests.get(master_url)
-        r.raise_for_status()
+        yield file_stats
+    finally:
+        _schema_file.stats = previous
+
+def _scan_gkg_columns(cols):
+    """
+    Heuristic column detection for rows that don't match the GKG 2.1 layout.
+    Scans backwards for the <PAGE_TITLE> block and for a '#'-delimited column
+    with numeric parts (coordinates). Returns (themes, locations, extras).
+    """
+    themes_str = cols[8] if 8 < len(cols) else ''
+    extras_str = ''
+    locations_str = ''
+    
+    # Start from the end as V2Extras is typically the last column
+    for idx in range(len(cols)-1, 5, -1):
+        if '<PAGE_TITLE>' in cols[idx]:
+            extras_str = cols[idx]
+            break
+    
+    # Search wide range (down to column 6) to ensure we catch V2Locations
+    for idx in range(len(cols)-1, 5, -1):
+        if cols[idx] and '#' in cols[idx]:
+            # Check if it looks like location data (has coordinates)
+            if any(part.replace('.', '').replace('-', '').isdigit() 
+                   for part in cols[idx].split('#')[:7]):
+                locations_str = cols[idx]
+                break
+    
+    return themes_str, locations_str, extras_str
+
+def decode_gkg_columns(cols):
+    """
+    Returns (themes, locations, extras) strings for a split GKG line.
+    Well-formed GKG 2.1 rows are read straight from their fixed positions;
+    anything else goes through the heuristic scan so it still yields what it can.
+    """
+    if len(cols) == GKG_NUM_COLUMNS:
+        locations_str = cols[10]
+        extras_str = cols[26]
+        # Cheap sanity checks: V2Locations blocks start with a type digit and '#',
+        # V2Extras is an XML fragment
+        if ((not locations_str or (locations_str[0].isdigit() and locations_str[1:2] == '#'))
+                and (not extras_str or extras_str[0] == '<')):
+            count_schema('fixed')
+            return cols[8], locations_str, extras_str
+    
+    count_schema('fallback')
+    return _scan_gkg_columns(cols)
+
+def parse_gkg_record(line):
+    """Parses one tab-separated GKG line into a tuple of CHUNK_COLUMNS values."""
+    cols = line.split('\t')
+    num_cols = len(cols)
+    
+    # Simple fields (date, source_name, url)
+    date, source_name, url = (cols[idx] if idx < num_cols else None for idx in SIMPLE_FIELDS)
+    title = themes = themes_raw = location_names = location_names_raw = None
+    location_countries = first_location_lat = first_location_lon = None
+    
+    themes_str, locations_str, extras_str = decode_gkg_columns(cols)
+    
+    # Extract Page Title (from V2Extras)
+    if EXTRACT_CONFIG['page_title']:
+        title = parse_v2_extras_title(extras_str) or None
+    
+    if EXTRACT_CONFIG['themes']:
+        theme_codes = parse_v2_themes(themes_str)
+        if theme_codes:
+            # Raw: just join the original themes
+            themes_raw = ';'.join(theme_codes)
+            
+            # Clean: apply cleaning
+            cleaned_themes = []
+            for t in theme_codes[:5]: # Process top 5 themes for clean version
+                clean = clean_theme_name(t)
+                if clean and clean not in cleaned_themes:
+                    cleaned_themes.append(clean)
+            themes = ';'.join(cleaned_themes) if cleaned_themes else None
+    
+    if EXTRACT_CONFIG['locations'] and locations_str:
+        locations = parse_v2_locations(
+            locations_str,
+            EXTRACT_CONFIG['extract_coordinates'],
+            EXTRACT_CONFIG['location_limit']
+        )
+        if locations:
+            # Raw: original names
+            location_names_raw = ';'.join([loc['name'] for loc in locations])
+            
+            # Clean: apply cleaning
+            cleaned_loc_names = []
+            for loc in locations:
+                clean = clean_location_name(loc['name'])
+                if clean and clean not in cleaned_loc_names:
+                    cleaned_loc_names.append(clean)
+            
+            location_names = ';'.join(cleaned_loc_names)
+            location_countries = ';'.join([loc['country_code'] for loc in locations])
+            if EXTRACT_CONFIG['extract_coordinates'] and locations[0].get('lat'):
+                first_location_lat = locations[0]['lat']
+                first_location_lon = locations[0]['lon']
+    
+    # V2Persons, Organizations, Tone, Counts: raw text only, decoded on demand.
+    # Only trusted at their fixed positions; rows with a different layout get None.
+    persons_raw = organizations_raw = tone_raw = counts_raw = None
+    if num_cols == GKG_NUM_COLUMNS:
+        if EXTRACT_CONFIG['persons']:
+            persons_raw = cols[12] or None
+        if EXTRACT_CONFIG['organizations']:
+            organizations_raw = cols[14] or None
+        if EXTRACT_CONFIG['tone']:
+            tone_raw = cols[15] or None
+        if EXTRACT_CONFIG['counts']:
+            counts_raw = cols[6] or None
+    
+    return (date, source_name, url, title, themes, themes_raw, location_names, location_names_raw,
+            location_countries, first_location_lat, first_location_lon,
+            persons_raw, organizations_raw, tone_raw, counts_raw)
+
+def parse_gkg_line(line):
+    """Parses one tab-separated GKG line into a row dict keyed by CHUNK_COLUMNS."""
+    return dict(zip(CHUNK_COLUMNS, parse_gkg_record(line)))
+
+def iter_gkg_records(url, md5=None, size=None):
+    """Generator of parsed record tuples for every line of the GKG file at `url`."""
+    for line in iter_gkg_lines(url, md5, size):
+        yield parse_gkg_record(line)
+
+def iter_chunks(iterable, size):
+    """Groups an iterable into lists of at most `size` items."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+# ============================================================================
+# COLUMNAR (VECTORIZED) PARSER ENGINE
+# ============================================================================
+# Same output as parse_gkg_record + chunk_from_records, but each chunk is parsed with
+# pyarrow compute kernels (split/flatten/regex) and numpy grouping instead of a
+# Python loop per row. Python code only runs once per *distinct* theme/location
+# name (for the cleaning functions), never once per row.
+
+# Only the columns the archive needs are materialized by the CSV reader
+COLUMNAR_USECOLS = [1, 3, 4, 8, 10, 26]
+
+def columnar_usecols():
+    """COLUMNAR_USECOLS plus the raw fields enabled in EXTRACT_CONFIG."""
+    return sorted(COLUMNAR_USECOLS + [idx for _, idx in raw_fields()])
+
+def read_gkg_batches(f, chunk_rows, bad_lines):
+    """
+    Reads a decompressed GKG file object into pyarrow RecordBatches of the needed columns.
+    Lines without exactly 27 columns are not parsed here; (line number, text) is
+    appended to `bad_lines` so the caller can run them through the row parser and
+    put them back in file order. Empty lines (there are none in GKG files) are skipped.
+    """
+    def invalid_row(row):
+        # The streaming reader is serial, so line numbers (1-based, not counting
+        # empty lines) are known
+        number = row.number if row.number is not None and row.number > 0 else float('inf')
+        bad_lines.append((number, row.text))
+        return 'skip'
+    
+    usecols = columnar_usecols()
+    reader = pa_csv.open_csv(
+        f,
+        read_options=pa_csv.ReadOptions(
+            column_names=[str(idx) for idx in range(GKG_NUM_COLUMNS)],
+            encoding='latin-1',
+            block_size=STREAM_CONFIG['columnar_block_bytes'],
+        ),
+        parse_options=pa_csv.ParseOptions(
+            delimiter='\t',
+            quote_char=False,
+            invalid_row_handler=invalid_row,
+        ),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=[str(idx) for idx in usecols],
+            column_types={str(idx): pa.string() for idx in usecols},
+            strings_can_be_null=False,
+        ),
+    )
+    for batch in reader:
+        for start in range(0, batch.num_rows, chunk_rows):
+            yield batch.slice(start, chunk_rows)
+
+def _explode(values, pattern):
+    """Splits each string on `pattern`; returns (row index per piece, non-empty pieces)."""
+    lists = pc.split_pattern(values, pattern)
+    rows = pc.list_parent_indices(lists).to_numpy()
+    pieces = pc.list_flatten(lists)
+    keep = pc.not_equal(pieces, '')
+    return rows[keep.to_numpy(zero_copy_only=False)], pieces.filter(keep)
+
+def _first_per_key(rows, codes):
+    """
+    Groups (row, code) pairs. Returns (positions of each group's first occurrence,
+    group sizes), with groups in order of first appearance.
+    """
+    key = rows.astype(np.int64) * (int(codes.max()) + 1 if len(codes) else 1) + codes
+    _, first, counts = np.unique(key, return_index=True, return_counts=True)
+    order = np.argsort(first, kind='stable')
+    return first[order], counts[order]
+
+def _rank_in_row(rows):
+    """0-based position of each item within its row (rows must be non-decreasing)."""
+    positions = np.arange(len(rows))
+    starts = np.r_[0, np.flatnonzero(rows[1:] != rows[:-1]) + 1]
+    run_lengths = np.diff(np.r_[starts, len(rows)])
+    return positions - np.repeat(starts, run_lengths)
+
+def _with_counts(names, counts):
+    """Appends ':<count>' to names that occurred more than once."""
+    labelled = pc.binary_join_element_wise(names, pa.array(counts.astype(str)), ':')
+    return pc.if_else(pa.array(counts > 1), labelled, names)
+
+def _join_by_row(rows, values, num_rows):
+    """Joins strings into one ';'-separated string per row; rows with no values are null."""
+    per_row = np.bincount(rows, minlength=num_rows)
+    offsets = pa.array(np.r_[0, np.cumsum(per_row)].astype(np.int32))
+    joined = pc.binary_join(pa.ListArray.from_arrays(offsets, values), ';')
+    return pc.if_else(pa.array(per_row > 0), joined, pa.nulls(num_rows, pa.string()))
+
+def _clean_codes(dictionary, func):
+    """Runs a cleaning function once per distinct name; returns (cleaned, cleaned code per name)."""
+    cleaned = [func(name) for name in dictionary.to_pylist()]
+    codes, _ = pd.factorize(pd.Series(cleaned, dtype=object))
+    return np.array(cleaned, dtype=object), codes
+
+def _dedupe_cleaned(rows, name_codes, cleaned, cleaned_codes):
+    """Keeps the first non-empty occurrence of each cleaned name per row."""
+    item_codes = cleaned_codes[name_codes]
+    non_empty = cleaned[name_codes] != ''
+    rows, item_codes, name_codes = rows[non_empty], item_codes[non_empty], name_codes[non_empty]
+    first, _ = _first_per_key(rows, item_codes)
+    return rows[first], pa.array(cleaned[name_codes[first]], type=pa.string())
+
+def _columnar_themes(themes, num_rows):
+    """Vectorized parse_v2_themes + clean_theme_name. Returns (themes, themes_raw) arrays."""
+    rows, blocks = _explode(themes, ';')
+    # Theme name is everything before the first comma (the rest are offsets)
+    names = pc.dictionary_encode(pc.replace_substring_regex(blocks, ',.*', ''))
+    codes = names.indices.to_numpy()
+    
+    # Count each theme per row, keeping order of first appearance
+    first, counts = _first_per_key(rows, codes)
+    rows, codes = rows[first], codes[first]
+    labels = _with_counts(pc.take(names.dictionary, pa.array(codes)), counts)
+    themes_raw = _join_by_row(rows, labels, num_rows)
+    
+    # Clean: top 5 themes per row, drop empties and duplicates
+    top = _rank_in_row(rows) < 5
+    cleaned, cleaned_codes = _clean_codes(names.dictionary, clean_theme_name)
+    clean_rows, clean_values = _dedupe_cleaned(rows[top], codes[top], cleaned, cleaned_codes)
+    return _join_by_row(clean_rows, clean_values, num_rows), themes_raw
+
+def _to_float(values):
+    """Casts numeric strings to float64; anything float() would reject becomes null."""
+    numeric = pc.match_substring_regex(values, r'^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$')
+    return pc.cast(pc.if_else(numeric, values, pa.nulls(len(values), pa.string())), pa.float64())
+
+def _columnar_locations(locations, num_rows):
+    """Vectorized parse_v2_locations + clean_location_name. Returns a dict of location arrays."""
+    rows, blocks = _explode(locations, ';')
+    parts = pc.split_pattern(blocks, '#')
+    enough = pc.greater_equal(pc.list_value_length(parts), 7)
+    rows, parts = rows[enough.to_numpy(zero_copy_only=False)], parts.filter(enough)
+    
+    names = pc.dictionary_encode(pc.list_element(parts, 1))
+    codes = names.indices.to_numpy()
+    
+    # Deduplicate by name within a row (first occurrence wins), add counts, apply limit
+    first, counts = _first_per_key(rows, codes)
+    limit = EXTRACT_CONFIG['location_limit']
+    if limit > 0:
+        within = _rank_in_row(rows[first]) < limit
+        first, counts = first[within], counts[within]
+    rows, codes = rows[first], codes[first]
+    take = pa.array(first)
+    labels = _with_counts(pc.take(names.dictionary, pa.array(codes)), counts)
+    
+    cleaned, cleaned_codes = _clean_codes(names.dictionary, clean_location_name)
+    clean_rows, clean_values = _dedupe_cleaned(rows, codes, cleaned, cleaned_codes)
+    location_names = _join_by_row(clean_rows, clean_values, num_rows)
+    # Rows whose locations all clean to '' still get an empty string, like the row parser
+    has_locations = pa.array(np.bincount(rows, minlength=num_rows) > 0)
+    location_names = pc.if_else(pc.and_(has_locations, pc.is_null(location_names)), '', location_names)
+    
+    result = {
+        'location_names': location_names,
+        'location_names_raw': _join_by_row(rows, labels, num_rows),
+        'location_countries': _join_by_row(rows, pc.take(pc.list_element(parts, 2), take), num_rows),
+    }
+    
+    if EXTRACT_CONFIG['extract_coordinates']:
+        lat = _to_float(pc.take(pc.list_element(parts, 5), take)).to_numpy(zero_copy_only=False).copy()
+        lon = _to_float(pc.take(pc.list_element(parts, 6), take)).to_numpy(zero_copy_only=False)
+        # parse_v2_locations drops both coordinates if either fails to parse
+        lat[np.isnan(lon)] = np.nan
         
-        lines = r.text.strip().split('\n')
-        for line in reversed(lines):
-            parts = line.split()
-            if len(parts) >= 3 and "gkg.csv.zip" in parts[2]:
-                return parts[2]
-        return None
+        # Only set when the row's first location has a truthy latitude (None and 0.0 are skipped)
+        first_in_row = _rank_in_row(rows) == 0
+        first_rows = rows[first_in_row]
+        usable = ~np.isnan(lat[first_in_row]) & (lat[first_in_row] != 0)
+        result['first_location_lat'] = np.full(num_rows, np.nan)
+        result['first_location_lon'] = np.full(num_rows, np.nan)
+        result['first_location_lat'][first_rows[usable]] = lat[first_in_row][usable]
+        result['first_location_lon'][first_rows[usable]] = lon[first_in_row][usable]
+    
+    return result
+
+def parse_batch_columnar(batch):
+    """
+    Parses one RecordBatch from read_gkg_batches into a chunk frame,
+    matching chunk_from_records exactly.
+    """
+    num_rows = batch.num_rows
+    locations = batch.column('10')
+    extras = batch.column('26')
+    
+    # Same shape checks as decode_gkg_columns; failing rows go through the row parser
+    valid = pc.and_(pc.match_substring_regex(locations, r'^(\d#|$)'),
+                    pc.or_(pc.equal(extras, ''), pc.starts_with(extras, '<')))
+    num_valid = pc.sum(valid).as_py() or 0
+    count_schema('fixed', num_valid)
+    
+    chunk = {
+        'date': batch.column('1'),
+        'source_name': batch.column('3'),
+        'url': batch.column('4'),
+    }
+    
+    if EXTRACT_CONFIG['page_title']:
+        titles = pc.struct_field(pc.extract_regex(extras, r'<PAGE_TITLE>(?P<title>.*?)</PAGE_TITLE>'), [0])
+        chunk['title'] = pc.if_else(pc.equal(titles, ''), pa.nulls(num_rows, pa.string()), titles)
+    
+    if EXTRACT_CONFIG['themes']:
+        chunk['themes'], chunk['themes_raw'] = _columnar_themes(batch.column('8'), num_rows)
+    
+    if EXTRACT_CONFIG['locations']:
+        chunk.update(_columnar_locations(pc.if_else(valid, locations, ''), num_rows))
+    
+    # Raw fields: the string slices pyarrow already holds, nothing is parsed
+    for column, idx in raw_fields():
+        values = batch.column(str(idx))
+        chunk[column] = pc.if_else(pc.equal(values, ''), pa.nulls(num_rows, pa.string()), values)
+    
+    df = pd.DataFrame({name: _to_series(values) for name, values in chunk.items()}).reindex(columns=CHUNK_COLUMNS)
+    
+    if num_valid < num_rows:
+        # Rebuild the line from the columns we read and let the row parser handle it
+        bad = np.flatnonzero(~valid.to_numpy(zero_copy_only=False))
+        usecols = columnar_usecols()
+        columns = [batch.column(str(idx)).to_pylist() for idx in usecols]
+        rows = []
+        for i in bad:
+            cols = [''] * GKG_NUM_COLUMNS
+            for idx, values in zip(usecols, columns):
+                cols[idx] = values[i]
+            rows.append(parse_gkg_record('\t'.join(cols)))
+        # Column by column, already in the frame's dtypes (e.g. None coordinates -> NaN)
+        fallback = records_like(rows, df)
+        for position, column in enumerate(df.columns):
+            df.iloc[bad, position] = fallback[column].to_numpy()
+    
+    return df
+
+def records_like(records, df):
+    """chunk_from_records(records) cast to the column dtypes of the chunk frame df."""
+    return chunk_from_records(records).astype(df.dtypes.to_dict())
+
+def merge_bad_lines(df, bad_lines, last_line):
+    """
+    Puts the lines read_gkg_batches set aside back among the rows of df, in file
+    order. df holds the next valid lines after line number `last_line`; bad lines
+    that come before or among them are parsed with the row parser and removed
+    from bad_lines. Returns (frame, number of the last line it covers).
+    """
+    num_rows = len(df)
+    inserts = []  # (valid rows before the bad line, record)
+    placed = 0
+    while bad_lines:
+        number, text = bad_lines[0]
+        # Valid rows between the last line placed and this bad line
+        between = number - last_line - 1
+        if placed + between > num_rows:
+            break
+        bad_lines.pop(0)
+        placed += between
+        last_line = number
+        inserts.append((placed, parse_gkg_record(text)))
+    last_line += num_rows - placed
+    if not inserts:
+        return df, last_line
+    
+    order = []
+    next_row = 0
+    for i, (position, _) in enumerate(inserts):
+        order.extend(range(next_row, position))
+        order.append(num_rows + i)
+        next_row = position
+    order.extend(range(next_row, num_rows))
+    fallback = records_like([record for _, record in inserts], df)
+    merged = pd.concat([df, fallback], ignore_index=True)
+    return merged.iloc[order].reset_index(drop=True), last_line
+
+def _to_series(values):
+    """Converts a pyarrow array (or numpy array) to a pandas Series."""
+    if isinstance(values, np.ndarray):
+        return pd.Series(values)
+    return values.to_pandas()
+
+def iter_frames_columnar(f, chunk_rows):
+    """Yields chunk frames for a decompressed GKG file object using the columnar engine."""
+    if pa is None:
+        raise ImportError("The columnar parser engine requires pyarrow (pip install pyarrow)")
+    
+    bad_lines = []
+    last_line = 0
+    for batch in read_gkg_batches(f, chunk_rows, bad_lines):
+        # Lines with the wrong number of columns are parsed row by row and merged back in file order
+        df, last_line = merge_bad_lines(parse_batch_columnar(batch), bad_lines, last_line)
+        yield df
+    if bad_lines:
+        yield chunk_from_records([parse_gkg_record(text) for _, text in bad_lines])
+
+def translate_titles(titles, is_translation_stream):
+    """
+    Translates a list of titles to English (parallel translation for speed).
+    Returns (new list, positions of titles that couldn't be translated); missing
+    titles (None/NaN) are passed through untouched, and so are titles of the
+    translation stream that langid.py finds to be English already.
+    """
+    titles = list(titles)
+    untranslated = []
+    stream = 'translation' if is_translation_stream else 'original'
+    
+    # Decode HTML entities
+    positions = [idx for idx, title in enumerate(titles) if isinstance(title, str) and title]
+    decoded = [html.unescape(titles[idx]) for idx in positions]
+    
+    if is_translation_stream:
+        # The translation stream also carries English titles: don't send those out
+        should_translate = ~english_mask(decoded)
+        skipped = 0
+        for idx, title, translate in zip(positions, decoded, should_translate):
+            if not translate:
+                titles[idx] = title
+                skipped += 1
+        if skipped:
+            print(f"  [Skipping translation of {skipped} titles already in English]")
+            METRICS.inc('pipeline_fallbacks_total', skipped, stream=stream, kind='translation_skipped')
+    else:
+        # Heuristic: mostly non-ASCII titles in the "Original" stream are foreign (e.g. Chinese, Arabic)
+        should_translate = non_english_mask(decoded)
+        for title in compress(decoded, should_translate):
+            print(f"  [Detected non-English title in English stream: {title[:40]}...]")
+    
+    titles_to_translate = list(compress(decoded, should_translate))
+    title_indices = list(compress(positions, should_translate))
+    
+    if titles_to_translate:
+        try:
+            # Deduplicated, cached, batched and rate-adaptive (see translation.py)
+            translated, stats = translate_texts(titles_to_translate)
+            
+            # Assign translated titles back to their positions (failures keep the original)
+            for title, title_idx in zip(titles_to_translate, title_indices):
+                if title in translated:
+                    titles[title_idx] = translated[title]
+                else:
+                    untranslated.append(title_idx)
+            
+            for key, kind in (('cache_hits', 'cache_hit'), ('translated', 'translated'), ('failed', 'failed'),
+                              ('requests', 'request'), ('retries', 'retry'), ('split_batches', 'split_batch')):
+                METRICS.inc('pipeline_translation_total', stats[key], kind=kind)
+            if untranslated:
+                METRICS.inc('pipeline_fallbacks_total', len(untranslated), stream=stream, kind='untranslated')
+            
+            print(f"  [Translated {len(titles_to_translate)} titles: {stats['unique']} unique, "
+                  f"{stats['cache_hits']} from cache, {stats['translated']} translated in {stats['requests']} requests "
+                  f"({stats['retries']} retries, concurrency {stats.get('concurrency', '-')}), "
+                  f"{stats['failed']} fell back]")
+        except Exception as e:
+            print(f"  [Translation failed, keeping original titles: {e}]")
+            untranslated = list(title_indices)
+            METRICS.inc('pipeline_fallbacks_total', len(untranslated), stream=stream, kind='untranslated')
+    
+    return titles, untranslated
+
+def connect_supabase():
+    """Creates a SupabaseClient for ingestion, or returns None if it is unavailable."""
+    try:
+        # We need to import here to avoid circular dependencies if any, 
+        # or just to keep it isolated.
+        # Adjust path to ensure we can import supabase_client
+        # current_dir is server/
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        if current_dir not in sys.path:
+            sys.path.append(current_dir)
+            
+        from db_handle.supabase_client import SupabaseClient
+        
+        # Initialize Supabase (needs .env loaded, which usually main.py does, 
+        # but if running news_retrieve separately, might need load_dotenv)
+        # Let's try to load .env if not set
+        if not os.getenv("SUPABASE_URL"):
+            from dotenv import load_dotenv
+            root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            load_dotenv(os.path.join(root_dir, ".env"))
+        
+        return SupabaseClient()
     except Exception as e:
-        print(f"Error fetching master list from {master_url}: {e}")
+        print(f"  [Warning: Supabase Ingestion Failed: {e}]")
         return None
 
-def process_file(url, is_translation_stream=False):
-    """Downloads and extracts relevant news metadata to both archive files.
+def articles_from_chunk(chunk):
+    """Converts a chunk's English rows to the article dicts SupabaseClient expects."""
+    df = english_rows(chunk)
+    columns = [df[col].tolist() for col in english_sources(df)]
+    return [{
+        'title': title,
+        'url': url,
+        'date': str(date),
+        'themes': themes,
+        'location_names': location_names,
+        'location_countries': location_countries,
+        'first_location_lat': lat,
+        'first_location_lon': lon,
+    } for date, _, url, title, themes, location_names, location_countries, lat, lon in zip(*columns)]
+
+_seen_index = None
+_seen_index_lock = threading.Lock()
+
+def get_seen_index(db=None):
+    """
+    Opens the seen-URL index on first use and rebuilds it from Supabase when due.
+    Only URLs that made it into Supabase are marked, so without a DB nothing is skipped.
+    """
+    global _seen_index
+    with _seen_index_lock:
+        if _seen_index is None:
+            _seen_index = SeenUrlIndex(URL_INDEX_CONFIG['index_file'], URL_INDEX_CONFIG['rebuild_hours'])
+        refresh_from_db(_seen_index, db)
+        return _seen_index
+
+def drop_seen_urls(df, seen_index):
+    """
+    Removes rows whose URL is already ingested, or repeated earlier in the chunk,
+    before any translation or embedding work is spent on them.
+    Returns the filtered chunk frame.
+    """
+    if df.empty:
+        return df
+    urls = df['url'].fillna('').astype(str)
+    keep = ~(seen_index.seen_mask(urls.tolist()) | urls.duplicated().to_numpy())
+    if keep.all():
+        return df
+    print(f"  [Skipping {int((~keep).sum())} already-ingested or repeated URLs]")
+    return df[keep]
+
+def chunk_from_records(records):
+    """Builds the chunk frame (CHUNK_COLUMNS) from parse_gkg_record tuples; titles are not translated yet."""
+    return pd.DataFrame.from_records(records, columns=CHUNK_COLUMNS, nrows=len(records))
+
+# ============================================================================
+# CHUNK STAGES
+# ============================================================================
+# A parsed chunk moves through translate -> embed -> upsert -> archive as a dict:
+#   {'frame': chunk frame (CHUNK_COLUMNS), 'stream': 'translation' or 'original',
+#    'keep_english': None or boolean mask of rows for the English view,
+#    'parsed': rows parsed, 'records': embedded rows}
+# process_frames runs the stages back to back; process_file runs them as a
+# staged pipeline (see staged_pipeline.py) so different chunks overlap.
+
+def new_chunk(df, stream, parsed_rows=None):
+    return {'frame': df, 'stream': stream, 'keep_english': None,
+            'parsed': len(df) if parsed_rows is None else parsed_rows, 'records': None}
+
+def english_sources(df):
+    """Chunk columns for the English outputs: the translated title if there is one."""
+    if 'title_english' in df.columns:
+        return [('title_english' if col == 'title' else col) for col in ENGLISH_ARCHIVE_SOURCES]
+    return ENGLISH_ARCHIVE_SOURCES
+
+def english_rows(chunk):
+    """The chunk frame restricted to rows that go to the English outputs."""
+    if chunk['keep_english'] is None:
+        return chunk['frame']
+    return chunk['frame'][chunk['keep_english']]
+
+def translate_chunk(chunk, is_translation_stream):
+    """Translates titles of the translation stream (failures are kept out of the English outputs unless configured)."""
+    df = chunk['frame']
+    if not is_translation_stream or df.empty:
+        return chunk
+    
+    # Only for the English outputs; news_raw.csv keeps the original title
+    titles, untranslated = translate_titles(df['title'].tolist(), is_translation_stream)
+    df['title_english'] = titles
+    if untranslated and not TRANSLATION_CONFIG['keep_untranslated']:
+        # Don't let foreign-language titles leak into the English archive
+        print(f"  [Leaving {len(untranslated)} untranslated titles out of the English view]")
+        keep = np.ones(len(df), dtype=bool)
+        keep[untranslated] = False
+        chunk['keep_english'] = keep
+    return chunk
+
+def embed_chunk(chunk, db):
+    """Generates the Supabase rows (with embeddings) for the chunk's English rows."""
+    if db is None or not english_row_count(chunk):
+        return chunk
+    try:
+        chunk['records'] = db.embed_articles(articles_from_chunk(chunk))
+    except Exception as e:
+        print(f"  [Warning: embedding failed, chunk not ingested: {e}]")
+        # Don't fail the whole pipeline just because DB ingest failed
+    return chunk
+
+def english_row_count(chunk):
+    if chunk['keep_english'] is None:
+        return len(chunk['frame'])
+    return int(chunk['keep_english'].sum())
+
+def upsert_chunk(chunk, db):
+    """Upserts the embedded rows and marks their URLs as seen."""
+    if db is None or not chunk['records']:
+        return chunk
+    try:
+        upserted_urls = db.upsert_articles(chunk['records'])
+        print(f"  [Successfully ingested {len(upserted_urls)} articles into Supabase]")
+        # Only now are these URLs safe to skip in later files
+        get_seen_index().mark_seen(upserted_urls)
+    except Exception as e:
+        print(f"  [Warning: Supabase Ingestion Failed: {e}]")
+    # The vectors are no longer needed
+    chunk['records'] = None
+    return chunk
+
+def archive_chunk(chunk):
+    """
+    Writes the chunk to the Parquet archive as one atomic batch (raw and English
+    fields side by side). Returns the number of rows in the English view.
+    """
+    write_batch(chunk['frame'], chunk['stream'], chunk['keep_english'])
+    return english_row_count(chunk)
+
+def process_frames(df, is_translation_stream, db=None):
+    """
+    Translates, ingests and archives one parsed chunk frame, one stage after the other.
+    Returns the number of rows in the English view.
+    """
+    chunk = new_chunk(df, 'translation' if is_translation_stream else 'original')
+    translate_chunk(chunk, is_translation_stream)
+    embed_chunk(chunk, db)
+    upsert_chunk(chunk, db)
+    return archive_chunk(chunk)
+
+# ============================================================================
+# PARALLEL PARSING OF ONE FILE
+# ============================================================================
+# With STREAM_CONFIG['parse_processes'] > 1 the decompressed file is written to a
+# temp file and cut into line-aligned byte ranges. Each range is parsed in a worker
+# process, which sends back plain column arrays (see frame_to_columns) rather than
+# DataFrames or row dicts; the staged pipeline puts the chunks back in file order.
+#
+# The whole file has to be downloaded and decompressed before the first range is
+# parsed, so fetch no longer overlaps parse and the temp file holds the full file.
+# For normal 15-minute files that costs more than the extra processes gain, so the
+# default (1) streams; raise it only for unusually large files on many-core hosts.
+# (Historical backfill has its own per-file process pool.)
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+def _init_worker_process():
+    # Connections inherited from the parent process must not be shared
+    SESSION.close()
+
+def get_parse_pool():
+    """Process pool for range parsing, started on first use and kept for later files."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(max_workers=STREAM_CONFIG['parse_processes'],
+                                              initializer=_init_worker_process)
+        return _parse_pool
+
+def shutdown_parse_pool():
+    """Stops the range-parsing worker processes (started again on next use)."""
+    global _parse_pool
+    with _parse_pool_lock:
+        pool, _parse_pool = _parse_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+def download_gkg_to_file(url, path, md5=None, size=None):
+    """Streams the GKG zip at `url` and writes the decompressed CSV to `path`."""
+    with open_gkg_stream(url, md5, size) as f, open(path, 'wb') as out:
+        shutil.copyfileobj(f, out, 1 << 20)
+
+def line_aligned_ranges(path, range_bytes):
+    """Yields (start, end) byte ranges of about range_bytes that start and end on line boundaries."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        start = 0
+        while start < size:
+            end = start + range_bytes
+            if end < size:
+                # Extend to the end of the line the cut falls in
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            end = min(end, size)
+            yield start, end
+            start = end
+
+def frame_to_columns(df):
+    """Compact, picklable form of a chunk frame: one numpy array per column."""
+    return {col: df[col].to_numpy() for col in df.columns}
+
+def columns_to_frame(columns):
+    """Rebuilds the chunk frame from frame_to_columns output."""
+    return pd.DataFrame(columns)
+
+def parse_gkg_bytes(data, engine='python'):
+    """Parses a block of complete GKG lines (bytes) into a chunk frame."""
+    lines = data.split(b'\n')
+    if lines and not lines[-1]:
+        lines.pop()
+    if engine == 'python':
+        return chunk_from_records([parse_gkg_record(decode_gkg_line(line)) for line in lines])
+    return parse_line_chunk([line + b'\n' for line in lines], engine)
+
+def _parse_byte_range(path, start, end, engine):
+    """Process-pool worker: parses one byte range of a decompressed GKG file."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    # Schema counters live in the worker; send back what this range added
+    with file_schema_stats(dict.fromkeys(SCHEMA_STATS, 0)) as schema_stats:
+        df = parse_gkg_bytes(data, engine)
+    return frame_to_columns(df), schema_stats
+
+def iter_gkg_line_chunks(url, chunk_rows, md5=None, size=None):
+    """Streams the GKG file at `url` and yields lists of up to chunk_rows raw (bytes) lines."""
+    with open_gkg_stream(url, md5, size) as f:
+        yield from iter_chunks(f, chunk_rows)
+
+def parse_line_chunk(raw_lines, engine='python'):
+    """Parses a list of raw GKG lines into a chunk frame."""
+    if engine == 'python':
+        return chunk_from_records([parse_gkg_record(decode_gkg_line(line)) for line in raw_lines])
+    if engine == 'columnar':
+        frames = list(iter_frames_columnar(io.BytesIO(b''.join(raw_lines)), len(raw_lines)))
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, ignore_index=True)
+    raise ValueError(f"Unknown parser engine: {engine}")
+
+def iter_gkg_frames(url, engine='python', chunk_rows=5000, md5=None, size=None):
+    """
+    Streams the GKG file at `url` and yields chunk frames (CHUNK_COLUMNS).
+    
+    engine='python' parses row by row (parse_gkg_record); engine='columnar' reads the
+    needed columns with pyarrow and parses them with vectorized string kernels.
+    Both produce identical frames.
+    """
+    if engine == 'columnar':
+        with open_gkg_stream(url, md5, size) as f:
+            yield from iter_frames_columnar(f, chunk_rows)
+    elif engine == 'python':
+        for records in iter_chunks(iter_gkg_records(url, md5, size), chunk_rows):
+            yield chunk_from_records(records)
+    else:
+        raise ValueError(f"Unknown parser engine: {engine}")
+
+def process_file(url, is_translation_stream=False, engine=None, md5=None, size=None):
+    """Streams a GKG file and extracts relevant news metadata to the Parquet archive.
+    
+    The file goes through a staged pipeline (PIPELINE_STAGES): fetch -> parse ->
+    translate -> embed -> upsert -> archive (Parquet), connected by bounded queues. Chunks of
+    STREAM_CONFIG['chunk_rows'] rows flow through it, so later chunks are downloaded
+    and parsed while earlier ones are being embedded and upserted, and peak memory
+    does not depend on the size of the file. Chunks reach the archive in file order.
     
     Args:
         url: URL of the GDELT GKG file to download
         is_translation_stream: If True, this is from the translation stream (non-English)
+        engine: 'python' or 'columnar' parser (defaults to STREAM_CONFIG['engine'])
+        md5: Checksum from the GDELT file list (verifies the download, keys the local cache)
+        size: Byte count from the GDELT file list (catches truncated downloads)
     """
     print(f"Downloading update from: {url}")
     if is_translation_stream:
         print(f"  [Translation stream - will translate titles to English]")
+    engine = engine or STREAM_CONFIG['engine']
+    stream = 'translation' if is_translation_stream else 'original'
+    started = time.time()
+    # This file's share of SCHEMA_STATS (other files may be parsing at the same time)
+    file_schema = dict.fromkeys(SCHEMA_STATS, 0)
     try:
-        r = requests.get(url)
-        r.raise_for_status()
+        db = connect_supabase()
+        seen_index = get_seen_index(db)
         
-        rows = []
+        processes = STREAM_CONFIG['parse_processes']
+        parallel = processes > 1
+        temp_path = None
         
-        with zipfile.ZipFile(io.BytesIO(r.content)) as z:
-            # GDELT zips usually contain one file
-            filename = z.namelist()[0]
-            with z.open(filename) as f:
-                for raw_line in f:
-                    # Decode (GDELT is usually ISO-8859-1 / Latin-1)
-                    try:
-                        line = raw_line.decode('latin-1').rstrip('\n')
-                    except:
-                        line = raw_line.decode('utf-8', errors='ignore').rstrip('\n')
-                        
-                    cols = line.split('\t')
-                    
-                    # Initialize row data with simple fields
-                    row_data = {}
-                    
-                    # Extract simple fields
-                    for idx, name in SIMPLE_FIELDS.items():
-                        if idx < len(cols):
-                            row_data[name] = cols[idx]
-                        else:
-                            row_data[name] = None
-                    
-                    # Extract Page Title (from V2Extras - usually last column)
-                    if EXTRACT_CONFIG['page_title']:
-                         # Look for <PAGE_TITLE> in columns
-                         # Start from the end as it's typically the last column
-                        for idx in range(len(cols)-1, 5, -1):
-                            if '<PAGE_TITLE>' in cols[idx]:
-                                title = parse_v2_extras_title(cols[idx])
-                                if title:
-                                    row_data['title'] = title
-                                    break
-                    
-                    # V2Counts is at index 6
-                    if EXTRACT_CONFIG['counts'] and 6 < len(cols):
-                        counts = parse_v2_counts(cols[6])
-                        if counts:
-                            # Extract first count as example
-                            row_data['first_count_type'] = counts[0]['type']
-                            row_data['first_count_number'] = counts[0]['number']
-                        else:
-                            row_data['first_count_type'] = None
-                            row_data['first_count_number'] = None
-                    
-                    if EXTRACT_CONFIG['themes'] and 8 < len(cols):
-                        themes = parse_v2_themes(cols[8])
-                        if themes:
-                            # Raw: just join the original themes
-                            row_data['themes_raw'] = ';'.join(themes)
-                            
-                            # Clean: apply cleaning
-                            cleaned_themes = []
-                            for t in themes[:5]: # Process top 5 themes for clean version
-                                clean = clean_theme_name(t)
-                                if clean and clean not in cleaned_themes:
-                                    cleaned_themes.append(clean)
-                            row_data['themes'] = ';'.join(cleaned_themes) if cleaned_themes else None
-                        else:
-                            row_data['themes'] = None
-                            row_data['themes_raw'] = None
-                    
-                    # V2Locations has # delimiters and numeric coordinates
-                    if EXTRACT_CONFIG['locations']:
-                        # Try to identify V2Locations column
-                        # Search wide range (down to column 6) to ensure we catch it
-                        for idx in range(len(cols)-1, 5, -1):
-                            if cols[idx] and '#' in cols[idx]:
-                                # Check if it looks like location data (has coordinates)
-                                if any(part.replace('.', '').replace('-', '').isdigit() 
-                                       for part in cols[idx].split('#')[:7]):
-                                    locations = parse_v2_locations(
-                                        cols[idx],
-                                        EXTRACT_CONFIG['extract_coordinates'],
-                                        EXTRACT_CONFIG['location_limit']
-                                    )
-                                    if locations:
-                                        # Raw: original names
-                                        row_data['location_names_raw'] = ';'.join([loc['name'] for loc in locations])
-                                        
-                                        # Clean: apply cleaning
-                                        cleaned_loc_names = []
-                                        for loc in locations:
-                                            clean = clean_location_name(loc['name'])
-                                            if clean and clean not in cleaned_loc_names:
-                                                cleaned_loc_names.append(clean)
-                                        
-                                        row_data['location_names'] = ';'.join(cleaned_loc_names)
-                                        row_data['location_countries'] = ';'.join([loc['country_code'] for loc in locations])
-                                        if EXTRACT_CONFIG['extract_coordinates'] and locations[0].get('lat'):
-                                            row_data['first_location_lat'] = locations[0]['lat']
-                                            row_data['first_location_lon'] = locations[0]['lon']
-                                    break
-                                        
-                    # V2Persons, Organizations, Tone skipped based on config
-                    
-                    rows.append(row_data)
+        def parse(item):
+            chunk_index, work = item
+            with file_schema_stats(file_schema):
+                if parallel:
+                    # work is a (start, end) byte range of the temp file
+                    future = get_parse_pool().submit(_parse_byte_range, temp_path, work[0], work[1], engine)
+                    columns, schema_stats = future.result()
+                    for key, count in schema_stats.items():
+                        count_schema(key, count)
+                    df = columns_to_frame(columns)
+                else:
+                    # work is a list of raw lines from the download stream
+                    df = parse_line_chunk(work, engine)
+            print(f"  [Chunk {chunk_index + 1}: parsed {len(df)} rows]")
+            parsed_rows = len(df)
+            df = drop_seen_urls(df, seen_index)
+            METRICS.inc('pipeline_rows_total', parsed_rows - len(df), stream=stream, kind='duplicate')
+            return new_chunk(df, stream, parsed_rows)
         
-        # Create raw DataFrame (original titles, raw themes, raw locations)
-        # We need to copy relevant fields
-        rows_raw = []
-        for r in rows:
-            raw_row = r.copy()
-            # Restore raw fields to main names for the raw file
-            if 'themes_raw' in r:
-                raw_row['themes'] = r['themes_raw']
-            if 'location_names_raw' in r:
-                raw_row['location_names'] = r['location_names_raw']
-            rows_raw.append(raw_row)
+        if parallel:
+            fd, temp_path = tempfile.mkstemp(suffix='.gkg.csv')
+            os.close(fd)
             
-        df_raw = pd.DataFrame(rows_raw)
-        
-        # Translate titles if this is from translation stream (parallel translation for speed)
-        # Only for the main 'rows' list which goes to news.csv
-        if is_translation_stream and rows:
-            print(f"  [Translating {len(rows)} titles in parallel...]")
-            titles_to_translate = []
-            title_indices = []
+            def fetch_ranges():
+                download_gkg_to_file(url, temp_path, md5, size)
+                yield from line_aligned_ranges(temp_path, STREAM_CONFIG['range_bytes'])
             
-            for idx, row in enumerate(rows):
-                if row.get('title'):
-                    # Decode HTML entities
-                    decoded_title = html.unescape(row['title'])
-                    
-                    # Determine if translation is needed
-                    should_translate = is_translation_stream
-                    
-                    # Heuristic: Check for non-English characters in "Original" stream
-                    if not should_translate:
-                        # Count non-ASCII characters
-                        non_ascii_count = sum(1 for c in decoded_title if ord(c) > 127)
-                        # If more than 20% of chars are non-ASCII, assume it's foreign (e.g. Chinese, Arabic)
-                        if len(decoded_title) > 0 and (non_ascii_count / len(decoded_title)) > 0.2:
-                            should_translate = True
-                            print(f"  [Detected non-English title in English stream: {decoded_title[:40]}...]")
-
-                    if should_translate:
-                        titles_to_translate.append(decoded_title)
-                        title_indices.append(idx)
-            
-            if titles_to_translate:
-                def translate_single(title):
-                    """Translate a single title, return original on error"""
-                    try:
-                        translator = GoogleTranslator(source='auto', target='en')
-                        return translator.translate(title)
-                    except Exception:
-                        return title  # Keep original if translation fails
-                
-                try:
-                    translated_titles = []
-                    
-                    # Use ThreadPoolExecutor to translate multiple titles in parallel
-                    # 10 workers = ~10x faster than sequential
-                    with ThreadPoolExecutor(max_workers=10) as executor:
-                        # Submit all translation tasks
-                        future_to_idx = {executor.submit(translate_single, title): idx 
-                                        for idx, title in enumerate(titles_to_translate)}
-                        
-                        # Collect results as they complete
-                        results = [None] * len(titles_to_translate)
-                        completed = 0
-                        for future in as_completed(future_to_idx):
-                            idx = future_to_idx[future]
-                            results[idx] = future.result()
-                            completed += 1
-                            
-                            # Show progress every 100 titles
-                            if completed % 100 == 0 or completed == len(titles_to_translate):
-                                print(f"  [Translated {completed}/{len(titles_to_translate)} titles...]")
-                        
-                        translated_titles = results
-                    
-                    # Assign translated titles back to rows
-                    for idx, title_idx in enumerate(title_indices):
-                        if idx < len(translated_titles):
-                            rows[title_idx]['title'] = translated_titles[idx]
-                    
-                    print(f"  [Successfully translated {len(translated_titles)} titles]")
-                except Exception as e:
-                    print(f"  [Translation failed, keeping original titles: {e}]")
+            source = enumerate(fetch_ranges())
+        else:
+            source = enumerate(iter_gkg_line_chunks(url, STREAM_CONFIG['chunk_rows'], md5, size))
         
-        # Create English DataFrame (with translated titles if applicable)
-        df_english = pd.DataFrame(rows)
+        stages = [
+            # In parallel mode each parse thread just waits on one worker process
+            Stage('parse', parse, processes if parallel else PIPELINE_STAGES['parse_workers']),
+            Stage('translate', lambda chunk: translate_chunk(chunk, is_translation_stream),
+                  PIPELINE_STAGES['translate_workers']),
+            Stage('embed', lambda chunk: embed_chunk(chunk, db), PIPELINE_STAGES['embed_workers']),
+            Stage('upsert', lambda chunk: upsert_chunk(chunk, db), PIPELINE_STAGES['upsert_workers']),
+            Stage('archive', lambda chunk: (chunk['parsed'], archive_chunk(chunk)), 1, ordered=True),
+        ]
+        try:
+            results, stage_stats = run_stages(source, stages, PIPELINE_STAGES['queue_size'])
+        finally:
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
         
-        # Reorder columns: core fields first, then themes/locations
-        column_order = ['date', 'source_name', 'url', 'title', 'themes', 
-                       'location_names', 'location_countries', 
-                       'first_location_lat', 'first_location_lon']
-        # Only include columns that exist in the dataframe
-        column_order = [col for col in column_order if col in df_english.columns]
-        df_english = df_english[column_order]
-                         
-        print(f"Extracted {len(df_english)} rows.")
+        parsed_rows = sum(result[0] for result in results if result)
+        total_rows = sum(result[1] for result in results if result)
         
-        if not df_raw.empty:
-            # Apply same column order to raw dataframe
-            df_raw = df_raw[column_order]
-            header_raw = not pd.io.common.file_exists(ARCHIVE_FILE_RAW)
-            df_raw.to_csv(ARCHIVE_FILE_RAW, mode='a', header=header_raw, index=False)
+        print(f"Extracted {total_rows} rows.")
+        print(f"  [{format_stage_stats(stage_stats, time.time() - started)}]")
+        if SCHEMA_STATS['fallback']:
+            print(f"  [{SCHEMA_STATS['fallback']} malformed rows used heuristic column detection so far]")
+        stats = theme_lookup_stats()
+        print(f"  [Theme names: {stats['table_hits']} taxonomy hits, {stats['memo_hits']} memo hits, "
+              f"{stats['memo_misses']} cleaned by regex so far]")
+        print(f"  [Download cache: {DOWNLOAD_STATS['hits']} hits, {DOWNLOAD_STATS['misses']} downloads "
+              f"({DOWNLOAD_STATS['resumed']} resumed, {DOWNLOAD_STATS['retries']} retries) so far]")
+        if total_rows:
+            print(f"Success. Archived to {ARCHIVE_CONFIG['root']}")
         
-        if not df_english.empty:
-            header_english = not pd.io.common.file_exists(ARCHIVE_FILE)
-            df_english.to_csv(ARCHIVE_FILE, mode='a', header=header_english, index=False)
-            print(f"Success. Appended to {ARCHIVE_FILE} (Cleaned/Translated) and {ARCHIVE_FILE_RAW} (Raw/Original)")
-            
-            # --- Vector DB Integration ---
-            # --- Vector DB Integration ---
-            try:
-                # We need to import here to avoid circular dependencies if any, 
-                # or just to keep it isolated.
-                # Adjust path to ensure we can import supabase_client
-                import sys
-                import os
-                # current_dir is server/
-                current_dir = os.path.dirname(os.path.abspath(__file__))
-                if current_dir not in sys.path:
-                    sys.path.append(current_dir)
-                    
-                from db_handle.supabase_client import SupabaseClient
-                
-                print("  [Ingesting into Supabase...]")
-                # Initialize Supabase (needs .env loaded, which usually main.py does, 
-                # but if running news_retrieve separately, might need load_dotenv)
-                # Let's try to load .env if not set
-                if not os.getenv("SUPABASE_URL"):
-                    from dotenv import load_dotenv
-                    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-                    load_dotenv(os.path.join(root_dir, ".env"))
-                
-                db = SupabaseClient()
-                
-                # Convert DataFrame to list of dicts for ingestion
-                # We need to map df columns to what add_articles expects
-                articles_to_ingest = []
-                for _, row in df_english.iterrows():
-                    articles_to_ingest.append({
-                        'title': row.get('title', ''),
-                        'url': row.get('url', ''),
-                        'date': str(row.get('date', '')),
-                        'themes': row.get('themes', ''),
-                        'location_names': row.get('location_names', ''),
-                        'location_countries': row.get('location_countries', ''),
-                        'first_location_lat': row.get('first_location_lat'),
-                        'first_location_lon': row.get('first_location_lon')
-                    })
-                
-                # Use simplified add_articles which handles embeddings
-                db.add_articles(articles_to_ingest)
-                print(f"  [Successfully ingested {len(articles_to_ingest)} articles into Supabase]")
-                
-            except Exception as e:
-                print(f"  [Warning: Supabase Ingestion Failed: {e}]")
-                # Don't fail the whole pipeline just because DB ingest failed
-                pass
-            # -----------------------------
-            
-            return True
-        return False
+        # A chunk lost in download, parsing or archiving means the file has to be redone;
+        # an empty file, or one whose rows were all seen before, is processed
+        ok = not any(s.errors for s in stage_stats if s.name in ('fetch', 'parse', 'archive'))
+        record_file_metrics(stream, url, ok, time.time() - started, parsed_rows, total_rows,
+                            stage_stats, file_schema['fallback'])
+        return ok
         
     except Exception as e:
         print(f"Error processing file: {e}")
         import traceback
         traceback.print_exc()
+        record_file_metrics(stream, url, False, time.time() - started, 0, 0, [],
+                            file_schema['fallback'])
+        return False
+
+def record_file_metrics(stream, url, ok, wall_seconds, parsed_rows, archived_rows, stage_stats, schema_fallbacks):
+    """
+    Records one processed file in METRICS and the rolling history (metrics.py),
+    then rewrites the metrics textfile.
+    """
+    METRICS.inc('pipeline_files_total', stream=stream, result='ok' if ok else 'failed')
+    METRICS.observe('pipeline_file_seconds', wall_seconds, stream=stream)
+    METRICS.inc('pipeline_rows_total', parsed_rows, stream=stream, kind='parsed')
+    METRICS.inc('pipeline_rows_total', archived_rows, stream=stream, kind='archived')
+    if schema_fallbacks:
+        METRICS.inc('pipeline_fallbacks_total', schema_fallbacks, stream=stream, kind='schema_scan')
+    for s in stage_stats:
+        METRICS.inc('pipeline_stage_busy_seconds_total', s.busy_seconds, stream=stream, stage=s.name)
+        METRICS.inc('pipeline_stage_items_total', s.items, stream=stream, stage=s.name)
+        METRICS.inc('pipeline_stage_errors_total', s.errors, stream=stream, stage=s.name)
+        METRICS.set('pipeline_queue_depth_peak', s.queue_peak, stream=stream, stage=s.name)
+    if ok:
+        METRICS.set('pipeline_last_success_timestamp_seconds', time.time(), stream=stream)
+    
+    append_history({
+        'time': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'stream': stream,
+        'url': url,
+        'ok': ok,
+        'rows_parsed': parsed_rows,
+        'rows_archived': archived_rows,
+        'wall_seconds': round(wall_seconds, 3),
+        'rows_per_sec': round(parsed_rows / wall_seconds, 1) if wall_seconds > 0 else 0.0,
+        'stage_busy_seconds': {s.name: round(s.busy_seconds, 3) for s in stage_stats},
+        'stage_errors': {s.name: s.errors for s in stage_stats if s.errors},
+        'queue_peak': {s.name: s.queue_peak for s in stage_stats},
+    })
+    write_textfile()
+
+# Per-stream freshness of the last ingested file: {'url', 'published', 'ingested', 'lag_seconds'}
+FRESHNESS = {}
+_freshness_lock = threading.Lock()
+
+def utc_now():
+    """Naive UTC datetime (GDELT file timestamps are naive UTC)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def record_freshness(stream, url):
+    """Records publish -> ingested lag for a file that has just been fully processed."""
+    published = gkg_timestamp(url)
+    if published is None:
+        return
+    ingested = utc_now()
+    lag = (ingested - published).total_seconds()
+    with _freshness_lock:
+        current = FRESHNESS.get(stream)
+        # Catch-up files can finish out of order; keep the newest file's lag
+        if current is None or published >= current['published']:
+            FRESHNESS[stream] = {'url': url, 'published': published, 'ingested': ingested, 'lag_seconds': lag}
+            METRICS.set('pipeline_freshness_lag_seconds', lag, stream=stream)
+    print(f"  [Freshness] {stream}: {url.rsplit('/', 1)[-1]} ingested {lag / 60:.1f} min after publication")
+    write_textfile()
+
+def process_stream_update(stream, checkpoint, latest=None):
+    """
+    Processes every file of `stream` published since the checkpoint's watermark
+    (just the latest one if there is no gap). Gaps are replayed concurrently, up to
+    PIPELINE_CONFIG['catchup_workers'] files at a time, while the watermark only
+    moves forward in publish order. Returns whether the feed was reachable.
+    """
+    latest = latest or get_latest_entry(stream)
+    if not latest:
         return False
+    
+    last_url = checkpoint.last_url(stream)
+    if latest.url == last_url:
+        return True
+    
+    entries = [entry for entry in missing_entries(stream, last_url, latest)
+               if not checkpoint.is_processed(stream, entry.url)]
+    if not entries:
+        checkpoint.advance(stream, latest.url)
+        return True
+    
+    label = 'TRANSLATED' if stream == 'translation' else 'ORIGINAL'
+    print(f"\n[{datetime.now().strftime('%H:%M:%S')}] New {label} update detected!")
+    if len(entries) > 1:
+        print(f"  [Catching up on {len(entries)} {stream} files with {PIPELINE_CONFIG['catchup_workers']} workers]")
+    
+    def run(entry):
+        ok = process_file(entry.url, is_translation_stream=(stream == 'translation'),
+                          md5=entry.md5, size=entry.size)
+        if ok:
+            # Record right away, so a crash mid catch-up doesn't redo finished files
+            checkpoint.mark_processed(stream, entry.url)
+            record_freshness(stream, entry.url)
+            return True
+        attempts = checkpoint.record_failure(stream, entry.url)
+        if attempts >= PIPELINE_CONFIG['max_file_attempts']:
+            # Permanently broken (404, corrupt zip, ...): stop re-fetching it and let the watermark pass
+            print(f"  [Giving up on {entry.url} after {attempts} failed attempts; recorded as failed in the checkpoint]")
+            checkpoint.mark_failed(stream, entry.url)
+            METRICS.inc('pipeline_files_total', stream=stream, result='abandoned')
+            return True
+        return False
+    
+    with ThreadPoolExecutor(max_workers=PIPELINE_CONFIG['catchup_workers']) as executor:
+        futures = [executor.submit(run, entry) for entry in entries]
+        in_order = True
+        for entry, future in zip(entries, futures):
+            try:
+                ok = future.result()
+            except Exception as e:
+                print(f"  [Error processing {entry.url}: {e}]")
+                ok = False
+            if not ok:
+                # Everything after this stays ahead of the watermark; it is retried next poll
+                in_order = False
+            elif in_order:
+                checkpoint.advance(stream, entry.url)
+    return True
+
+def next_poll_delay(latest_published, publish_delay, now):
+    """
+    Seconds to wait before polling a stream again.
+    
+    The next file is expected UPDATE_INTERVAL after the latest one, plus the usual
+    delay between a file's timestamp and its appearance in lastupdate.txt. We sleep
+    until shortly before that, poll every fast_poll_seconds around it, and fall back
+    to slow_poll_seconds if the file is late.
+    """
+    if latest_published is None:
+        return SCHEDULE_CONFIG['slow_poll_seconds']
+    expected = latest_published + UPDATE_INTERVAL + timedelta(seconds=publish_delay)
+    until_expected = (expected - now).total_seconds()
+    if until_expected > SCHEDULE_CONFIG['early_seconds']:
+        return until_expected - SCHEDULE_CONFIG['early_seconds']
+    if until_expected > -SCHEDULE_CONFIG['fast_window_seconds']:
+        return SCHEDULE_CONFIG['fast_poll_seconds']
+    return SCHEDULE_CONFIG['slow_poll_seconds']
+
+async def run_stream(stream, checkpoint):
+    """
+    Polls and processes one stream forever, independently of the other one.
+    Blocking work (HTTP, parsing, translation, ingestion) runs in a worker thread.
+    """
+    label = 'TRANSLATED' if stream == 'translation' else 'ORIGINAL'
+    publish_delay = SCHEDULE_CONFIG['initial_publish_delay']
+    last_seen = checkpoint.last_url(stream)
+    
+    while True:
+        latest = await asyncio.to_thread(get_latest_entry, stream)
+        now = utc_now()
+        
+        if latest is None:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {label} feed unreachable, retrying...")
+            await asyncio.sleep(SCHEDULE_CONFIG['slow_poll_seconds'])
+            continue
+        
+        published = gkg_timestamp(latest.url)
+        if latest.url != last_seen and last_seen is not None and published is not None:
+            # Learn how long after its timestamp a file shows up (only from the next file
+            # in sequence, when we were polling closely)
+            sample = (now - published).total_seconds()
+            if gkg_timestamp(last_seen) == published - UPDATE_INTERVAL and 0 <= sample < UPDATE_INTERVAL.total_seconds():
+                publish_delay = 0.7 * publish_delay + 0.3 * sample
+        last_seen = latest.url
+        
+        await asyncio.to_thread(process_stream_update, stream, checkpoint, latest)
+        
+        delay = next_poll_delay(published, publish_delay, utc_now())
+        await asyncio.sleep(delay)
+
+async def run_streams(checkpoint):
+    await asyncio.gather(*(run_stream(stream, checkpoint) for stream in ('translation', 'original')))
 
 def run_pipeline():
-    last_processed_trans = None
-    last_processed_orig = None
+    checkpoint = PipelineCheckpoint(PIPELINE_CONFIG['checkpoint_file'])
     
     print("--- Starting GDELT 15-Minute Mass News Pipeline ---")
-    print(f"English Titles (Cleaned): {ARCHIVE_FILE}")
-    print(f"Raw Data (Original): {ARCHIVE_FILE_RAW}")
+    print(f"Archive (Parquet, raw + cleaned/English): {ARCHIVE_CONFIG['root']}")
+    print(f"Checkpoint: {PIPELINE_CONFIG['checkpoint_file']}")
+    print(f"Metrics: {METRICS_CONFIG['textfile']} (history: {METRICS_CONFIG['history_file']})")
+    start_http_server()
+    for stream in ('translation', 'original'):
+        print(f"  {stream}: last processed {checkpoint.last_url(stream) or '(none)'}")
     print("---------------------------------------------------")
     
-    while True:
-        # Check Translation Feed (non-English articles -> translate to English)
-        url_trans = get_latest_url(MASTER_URL_TRANSLATION)
-        if url_trans and url_trans != last_processed_trans:
-            print(f"\n[{datetime.now().strftime('%H:%M:%S')}] New TRANSLATED update detected!")
-            if process_file(url_trans, is_translation_stream=True):
-                last_processed_trans = url_trans
+    # Translation Feed (non-English articles -> translate to English) and
+    # Original Feed (English articles -> no translation needed) run concurrently,
+    # so a slow translated batch never delays the English one
+    asyncio.run(run_streams(checkpoint))
+
+# ============================================================================
+# HISTORICAL BACKFILL
+# ============================================================================
+
+def parse_date_arg(value):
+    """Parses a backfill bound: YYYYMMDDHHMMSS, YYYYMMDD or ISO format (UTC)."""
+    for fmt in ('%Y%m%d%H%M%S', '%Y%m%d'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    return datetime.fromisoformat(value)
+
+def _backfill_parse(url, engine, chunk_rows, md5=None, size=None):
+    """Process-pool worker: downloads and parses one GKG file. Returns (frames, seconds)."""
+    start = time.time()
+    frames = list(iter_gkg_frames(url, engine, chunk_rows, md5, size))
+    return frames, time.time() - start
+
+def backfill(start, end, stream='original', workers=None, engine=None):
+    """
+    Loads every GKG file of `stream` published between `start` and `end` (inclusive).
+    
+    Download + parse runs in a process pool across all cores; parsed files are handed,
+    in publish order, to a single writer in this process that translates, archives and
+    ingests them exactly like the live pipeline. Throughput is printed after every file.
+    """
+    workers = workers or os.cpu_count() or 1
+    engine = engine or STREAM_CONFIG['engine']
+    is_translation_stream = stream == 'translation'
+    
+    print(f"--- Backfill: {stream} stream, {start} -> {end} ---")
+    entries = list_gkg_entries(stream, after=start - timedelta(seconds=1), until=end)
+    if not entries:
+        print("No GKG files in that range.")
+        return
+    print(f"{len(entries)} files to load with {workers} parser processes ({engine} engine)")
+    
+    db = connect_supabase()
+    seen_index = get_seen_index(db)
+    started = time.time()
+    files_done = 0
+    rows_done = 0
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker_process) as pool:
+        # Keep a bounded window in flight so parsed files don't pile up in memory
+        pending = deque()
+        remaining = iter(entries)
+        for entry in islice(remaining, workers * 2):
+            pending.append((entry, pool.submit(_backfill_parse, entry.url, engine, STREAM_CONFIG['chunk_rows'],
+                                               entry.md5, entry.size)))
         
-        # Check Original Feed (English articles -> no translation needed)
-        url_orig = get_latest_url(MASTER_URL_ORIGINAL)
-        if url_orig and url_orig != last_processed_orig:
-            print(f"\n[{datetime.now().strftime('%H:%M:%S')}] New ORIGINAL update detected!")
-            if process_file(url_orig, is_translation_stream=False):
-                last_processed_orig = url_orig
-                
-        if not url_trans and not url_orig:
-             print(f"[{datetime.now().strftime('%H:%M:%S')}] Waiting for updates...")
+        while pending:
+            entry, future = pending.popleft()
+            next_entry = next(remaining, None)
+            if next_entry is not None:
+                pending.append((next_entry, pool.submit(_backfill_parse, next_entry.url, engine,
+                                                        STREAM_CONFIG['chunk_rows'], next_entry.md5, next_entry.size)))
+            
+            try:
+                frames, parse_seconds = future.result()
+            except Exception as e:
+                print(f"  [Error parsing {entry.url}: {e}]")
+                continue
+            
+            for df in frames:
+                rows_done += len(df)
+                process_frames(drop_seen_urls(df, seen_index), is_translation_stream, db)
+            files_done += 1
             
-        time.sleep(60)
+            elapsed = max(time.time() - started, 1e-9)
+            print(f"[{files_done}/{len(entries)}] {entry.url} (parsed in {parse_seconds:.1f}s) - "
+                  f"{files_done / elapsed:.2f} files/sec, {rows_done / elapsed:.0f} rows/sec")
+    
+    print(f"Backfill complete: {files_done} files, {rows_done} rows in {time.time() - started:.0f}s")
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="GDELT GKG news pipeline.")
+    subparsers = parser.add_subparsers(dest="command")
+    backfill_parser = subparsers.add_parser("backfill", help="Load a historical time range")
+    backfill_parser.add_argument("--start", type=parse_date_arg, required=True, help="Start (UTC), e.g. 20260201000000")
+    backfill_parser.add_argument("--end", type=parse_date_arg, required=True, help="End (UTC, inclusive)")
+    backfill_parser.add_argument("--stream", choices=["original", "translation"], default="original")
+    backfill_parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: all cores)")
+    backfill_parser.add_argument("--engine", choices=["python", "columnar"], default=None, help="Parser engine")
+    args = parser.parse_args()
+    
     try:
-        run_pipeline()
+        if args.command == "backfill":
+            backfill(args.start, args.end, args.stream, args.workers, args.engine)
+        else:
+            run_pipeline()
     except KeyboardInterrupt:
         print("\nStopping pipeline.")
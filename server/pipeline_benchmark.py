@@ -0,0 +1,478 @@
+"""
+Offline replay benchmark for the ingestion pipeline.
+
+Replays a directory of recorded (or synthetic) GKG zips through process_file
+without touching GDELT, Google Translate or Supabase:
+
+- the zips are served from a local HTTP server, so download, zip decoding and
+  parsing run exactly as in production;
+- translation goes to a local 'benchmark' backend registered in
+  translation.BACKENDS (every line comes back prefixed, after a configurable
+  latency per request);
+- connect_supabase returns BenchmarkSupabase, which builds rows shaped like
+  SupabaseClient.embed_articles with pseudo-embeddings (one per distinct
+  string, as model/embed_cache.py does) and "upserts" them in memory, with
+  configurable per-row costs;
+- the archive, URL index, translation cache, download cache and metrics
+  go to a temporary directory that is deleted afterwards.
+
+Each engine runs in a fresh subprocess, so peak RSS is per engine. The report
+has the summed busy time per stage (from run_stages), wall time, rows/sec,
+peak RSS and, with --tracemalloc, the peak of traced Python allocations (from
+a second, traced run: tracing would distort the timings).
+
+The generator writes GKG 2.1 files with the 27-column layout of
+GDELT_GKG_FIELDS.md (themes from the taxonomy, locations with coordinates,
+persons, organizations, tone, counts and a <PAGE_TITLE> in V2Extras), plus
+a share of malformed rows.
+
+Usage:
+    python pipeline_benchmark.py generate --out bench_gkg --files 4 --rows 20000
+    python pipeline_benchmark.py run --dir bench_gkg --engines python,columnar --json bench.json
+    python pipeline_benchmark.py run --dir bench_gkg --baseline bench.json   # exit 1 on regression
+"""
+import functools
+import hashlib
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zipfile
+from datetime import datetime, timedelta
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+if SERVER_DIR not in sys.path:
+    sys.path.append(SERVER_DIR)
+
+import news_retrieve
+import translation
+from gkg_download import DOWNLOAD_CONFIG
+from news_archive import ARCHIVE_CONFIG
+from news_retrieve import GKG_COL, GKG_NUM_COLUMNS
+from metrics import METRICS_CONFIG
+from model.embed_cache import embed_unique
+from theme_names import load_taxonomy_codes
+from url_index import URL_INDEX_CONFIG
+
+BENCHMARK_CONFIG = {
+    'translate_latency': 0.05,     # Seconds per request of the local translator
+    'embed_seconds_per_row': 0.0,  # Simulated model time per article (0 = pseudo-embeddings only)
+    'upsert_seconds_per_row': 0.0, # Simulated Supabase time per article
+    'embedding_dim': 384,          # Same size as all-MiniLM-L6-v2
+    'regression_tolerance': 0.2,   # --baseline: fail if rows/sec drops by more than this share
+}
+
+# ============================================================================
+# SYNTHETIC GKG FILES
+# ============================================================================
+
+LOCATIONS = [
+    # Type#FullName#CountryCode#ADM1#ADM2#Lat#Long#FeatureID
+    "1#United States#US#US##39.828175#-98.5795#US",
+    "4#Paris, Ile-De-France, France#FR#FRA8##48.8667#2.33333#-1456928",
+    "3#Austin, Texas, United States#US#USTX#TX453#30.2672#-97.7431#1384879",
+    "2#Texas, United States#US#USTX##31.106#-97.6475#TX",
+    "4#Beijing, Beijing, China#CH#CH22##39.9289#116.388#-1898541",
+    "1#India#IN#IN##20#77#IN",
+    "4#Lagos, Lagos, Nigeria#NI#NI05##6.45306#3.39583#-2014407",
+    "1#Brazil#BR#BR##-10#-55#BR",
+    "4#Moscow, Moskva, Russia#RS#RS48##55.7522#37.6156#-2960561",
+    "1#Equator#EQ#EQ##0#0#EQ",
+]
+PERSONS = ["Joe Biden", "Emmanuel Macron", "Xi Jinping", "Narendra Modi", "Olaf Scholz", "Lula da Silva"]
+ORGANIZATIONS = ["United Nations", "World Bank", "European Union", "Reuters", "World Health Organization"]
+COUNT_TYPES = ["KILL", "WOUND", "ARREST", "PROTEST", "AFFECT"]
+TITLES = {
+    'original': ["Oil prices fall after OPEC meeting", "Election results expected tonight in Texas",
+                 "Markets rally as inflation cools", "Storm leaves thousands without power",
+                 "Tom &amp; Jerry return to theaters", "Government announces new health plan"],
+    'translation': ["El presidente habla con los periodistas", "Le président français et les syndicats",
+                    "Путин заявил о новых мерах", "東京で地震", "Presiden resmikan jalan tol baru",
+                    "Die Regierung ist nicht bereit für Neuwahlen", "Oil prices fall after OPEC meeting"],
+}
+
+def _theme_codes():
+    codes = sorted(load_taxonomy_codes())
+    return codes or ["TAX_FNCACT_PRESIDENT", "WB_696_PUBLIC_SECTOR_MANAGEMENT", "ELECTION", "LEADER"]
+
+def synthetic_gkg_line(rng, i, timestamp, stream, themes):
+    """One tab-separated GKG 2.1 line (27 columns)."""
+    cols = [''] * GKG_NUM_COLUMNS
+    source = f"source{rng.randrange(200)}.com"
+    cols[GKG_COL['gkg_record_id']] = f"{timestamp}-{'T' if stream == 'translation' else ''}{i}"
+    cols[GKG_COL['date']] = timestamp
+    cols[GKG_COL['source_collection_id']] = '1'
+    cols[GKG_COL['source_name']] = source
+    cols[GKG_COL['url']] = f"https://{source}/{stream}/{timestamp}/{i}"
+
+    counts = [f"{rng.choice(COUNT_TYPES)}#{rng.randrange(1, 500)}#people#{LOCATIONS[rng.randrange(len(LOCATIONS))]}"
+              for _ in range(rng.choice((0, 0, 1, 2)))]
+    cols[GKG_COL['v1_counts']] = ';'.join(counts)
+    cols[GKG_COL['v2_counts']] = ';'.join(f"{c}#{rng.randrange(9999)}" for c in counts)
+
+    article_themes = [rng.choice(themes) for _ in range(rng.randrange(0, 25))]
+    cols[GKG_COL['v1_themes']] = ';'.join(article_themes)
+    cols[GKG_COL['v2_themes']] = ';'.join(f"{t},{rng.randrange(9999)}" for t in article_themes)
+
+    locations = [rng.choice(LOCATIONS) for _ in range(rng.randrange(0, 8))]
+    cols[GKG_COL['v1_locations']] = ';'.join(locations)
+    cols[GKG_COL['v2_locations']] = ';'.join(f"{loc}#{rng.randrange(9999)}" for loc in locations)
+
+    persons = rng.sample(PERSONS, rng.randrange(0, 3))
+    cols[GKG_COL['v1_persons']] = ';'.join(persons)
+    cols[GKG_COL['v2_persons']] = ';'.join(f"{p},{rng.randrange(9999)}" for p in persons)
+    organizations = rng.sample(ORGANIZATIONS, rng.randrange(0, 3))
+    cols[GKG_COL['v1_organizations']] = ';'.join(organizations)
+    cols[GKG_COL['v2_organizations']] = ';'.join(f"{o},{rng.randrange(9999)}" for o in organizations)
+
+    tone = rng.uniform(-10, 10)
+    cols[GKG_COL['v2_tone']] = f"{tone:.4f},{max(tone, 0) + 2:.4f},{max(-tone, 0) + 2:.4f},4.1,22.5,0.8,{rng.randrange(100, 2000)}"
+    cols[GKG_COL['v21_gcam']] = f"wc:{rng.randrange(100, 2000)},c1.1:{rng.randrange(9)},c12.1:{rng.randrange(99)}"
+    cols[GKG_COL['v21_amounts']] = f"{rng.randrange(1, 10**6)},people,{rng.randrange(9999)};"
+    if stream == 'translation':
+        cols[GKG_COL['v21_translation_info']] = "srclc:fra;eng:GT-FRA 1.0"
+
+    title = rng.choice(TITLES[stream]) if rng.random() > 0.05 else ''
+    cols[GKG_COL['v2_extras']] = (f"<PAGE_LINKS>https://{source}/related</PAGE_LINKS>"
+                                  + (f"<PAGE_TITLE>{title} {i}</PAGE_TITLE>" if title else '')
+                                  + "<PAGE_AUTHORS>Staff</PAGE_AUTHORS>")
+
+    if rng.random() < 0.01:
+        # Malformed row: truncated, like the occasional broken line in real files
+        cols = cols[:rng.randrange(8, GKG_NUM_COLUMNS)]
+    return '\t'.join(cols)
+
+def generate_gkg_files(out_dir, files=4, rows=20000, stream='original', seed=1, start=None):
+    """Writes `files` synthetic GKG zips, 15 minutes apart. Returns their paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    themes = _theme_codes()
+    start = start or datetime(2026, 2, 7, 8, 0)
+    paths = []
+    for f in range(files):
+        timestamp = (start + timedelta(minutes=15 * f)).strftime('%Y%m%d%H%M%S')
+        suffix = '.translation.gkg.csv.zip' if stream == 'translation' else '.gkg.csv.zip'
+        name = f"{timestamp}{suffix}"
+        data = '\n'.join(synthetic_gkg_line(rng, i, timestamp, stream, themes) for i in range(rows)) + '\n'
+        path = os.path.join(out_dir, name)
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+            z.writestr(name[:-len('.zip')], data.encode('utf-8'))
+        paths.append(path)
+        print(f"Wrote {path} ({rows} rows, {os.path.getsize(path) / 1e6:.1f} MB)")
+    return paths
+
+# ============================================================================
+# LOCAL STAND-INS
+# ============================================================================
+
+class BenchmarkTranslator:
+    """Translator backend: prefixes every line, after translate_latency seconds per request."""
+    def translate(self, text):
+        time.sleep(BENCHMARK_CONFIG['translate_latency'])
+        return '\n'.join(f"[en] {line}" for line in text.split('\n'))
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+class _Table:
+    """Just enough of the supabase-py query builder for url_index.fetch_article_urls."""
+    def __init__(self, db):
+        self._db = db
+        self._range = (0, 0)
+
+    def select(self, *_):
+        return self
+
+    def range(self, start, end):
+        self._range = (start, end)
+        return self
+
+    def execute(self):
+        urls = sorted(self._db.rows)
+        return _Result([{'url': url} for url in urls[self._range[0]:self._range[1] + 1]])
+
+class _Client:
+    def __init__(self, db):
+        self._db = db
+
+    def table(self, name):
+        return _Table(self._db)
+
+class BenchmarkSupabase:
+    """
+    Stand-in for SupabaseClient: embed_articles returns rows of the same shape
+    with pseudo-embeddings (picked by a hash of the text), upsert_articles only
+    remembers the URLs.
+    """
+    # Pseudo-embeddings are rows of this table
+    _TABLE_SIZE = 4096
+
+    def __init__(self):
+        self.rows = set()
+        self.supabase = _Client(self)
+        self._lock = threading.Lock()
+        rng = np.random.default_rng(0)
+        self._table = rng.standard_normal((self._TABLE_SIZE, BENCHMARK_CONFIG['embedding_dim']), dtype=np.float32)
+
+    def _embed(self, texts):
+        keys = [int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=4).digest(), 'little')
+                % self._TABLE_SIZE for text in texts]
+        time.sleep(BENCHMARK_CONFIG['embed_seconds_per_row'] * len(texts))
+        return self._table[keys]
+
+    def embed_articles(self, articles):
+        if not articles:
+            return []
+        # Deduplicated like SupabaseClient.embed_articles; no persistent cache, so runs stay comparable
+        texts = [str(row.get(key, '')) for key in ('title', 'themes', 'location_names') for row in articles]
+        embeddings, _ = embed_unique(texts, self._embed, 'benchmark')
+        count = len(articles)
+        fields = {'title': embeddings[:count], 'themes': embeddings[count:2 * count],
+                  'locations': embeddings[2 * count:]}
+        return [{
+            "url": row.get('url', ''),
+            "title": row.get('title', ''),
+            "date": str(row.get('date', '')),
+            "themes": str(row.get('themes', '')),
+            "location_names": str(row.get('location_names', '')),
+            "location_countries": str(row.get('location_countries', '')),
+            "first_location_lat": row.get('first_location_lat'),
+            "first_location_lon": row.get('first_location_lon'),
+            "title_embedding": fields['title'][i].tolist(),
+            "themes_embedding": fields['themes'][i].tolist(),
+            "locations_embedding": fields['locations'][i].tolist(),
+        } for i, row in enumerate(articles)]
+
+    def upsert_articles(self, batch_data):
+        time.sleep(BENCHMARK_CONFIG['upsert_seconds_per_row'] * len(batch_data))
+        with self._lock:
+            self.rows.update(row['url'] for row in batch_data)
+        return [row['url'] for row in batch_data]
+
+    def add_articles(self, articles):
+        return self.upsert_articles(self.embed_articles(articles))
+
+# ============================================================================
+# REPLAY
+# ============================================================================
+
+def serve_directory(directory):
+    """Serves `directory` over HTTP on a free local port. Returns (server, base URL)."""
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=directory)
+    handler.log_message = lambda *args: None
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def replay(directory, engine, processes=1, use_db=True, trace=False):
+    """
+    Runs every GKG zip in `directory` through process_file in this process.
+    Returns a dict of measurements.
+    """
+    names = sorted(name for name in os.listdir(directory) if name.endswith('.gkg.csv.zip'))
+    if not names:
+        raise ValueError(f"No .gkg.csv.zip files in {directory}")
+
+    work_dir = tempfile.mkdtemp(prefix='pipeline-benchmark-')
+    ARCHIVE_CONFIG['root'] = os.path.join(work_dir, 'archive')
+    URL_INDEX_CONFIG['index_file'] = os.path.join(work_dir, 'seen_urls.npy')
+    DOWNLOAD_CONFIG['cache_dir'] = os.path.join(work_dir, 'gkg_cache')
+    translation.TRANSLATION_CONFIG['cache_file'] = os.path.join(work_dir, 'translation_cache.db')
+    METRICS_CONFIG['textfile'] = os.path.join(work_dir, 'metrics', 'pipeline.prom')
+    METRICS_CONFIG['history_file'] = os.path.join(work_dir, 'metrics', 'history.jsonl')
+    translation.BACKENDS['benchmark'] = BenchmarkTranslator
+    translation.TRANSLATION_CONFIG['backend'] = 'benchmark'
+    news_retrieve.STREAM_CONFIG['parse_processes'] = processes
+    db = BenchmarkSupabase() if use_db else None
+    news_retrieve.connect_supabase = lambda: db
+
+    # Keep what run_stages reports for every file
+    runs = []
+    run_stages = news_retrieve.run_stages
+    def recording_run_stages(source, stages, queue_size=2):
+        results, stats = run_stages(source, stages, queue_size)
+        runs.append((results, stats))
+        return results, stats
+    news_retrieve.run_stages = recording_run_stages
+
+    server, base_url = serve_directory(directory)
+    if trace:
+        tracemalloc.start()
+    started = time.perf_counter()
+    failed = 0
+    try:
+        for name in names:
+            ok = news_retrieve.process_file(f"{base_url}/{name}", is_translation_stream='.translation.' in name,
+                                            engine=engine)
+            failed += not ok
+    finally:
+        wall = time.perf_counter() - started
+        traced_peak = tracemalloc.get_traced_memory()[1] if trace else None
+        if trace:
+            tracemalloc.stop()
+        # RUSAGE_CHILDREN only covers children that have exited and been waited for
+        news_retrieve.shutdown_parse_pool()
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    stages = {}
+    rows = 0
+    for results, stats in runs:
+        rows += sum(result[0] for result in results if result)
+        for s in stats:
+            entry = stages.setdefault(s.name, {'busy_seconds': 0.0, 'items': 0, 'errors': 0})
+            entry['busy_seconds'] += s.busy_seconds
+            entry['items'] += s.items
+            entry['errors'] += s.errors
+
+    # ru_maxrss is in KB on Linux (bytes on macOS)
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return {
+        'engine': engine,
+        'processes': processes,
+        'files': len(names),
+        'failed_files': failed,
+        'rows': rows,
+        'wall_seconds': wall,
+        'rows_per_sec': rows / wall if wall else 0.0,
+        'stages': stages,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6,
+        'peak_child_rss_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale / 1e6,
+        'traced_peak_mb': traced_peak / 1e6 if traced_peak is not None else None,
+        'upserted': len(db.rows) if db else 0,
+    }
+
+def run_isolated(directory, engine, processes, use_db, trace):
+    """Runs replay() in a fresh interpreter so peak RSS belongs to this engine alone."""
+    cmd = [sys.executable, os.path.abspath(__file__), '_replay', '--dir', directory, '--engine', engine,
+           '--processes', str(processes), '--translate-latency', str(BENCHMARK_CONFIG['translate_latency']),
+           '--embed-seconds', str(BENCHMARK_CONFIG['embed_seconds_per_row']),
+           '--upsert-seconds', str(BENCHMARK_CONFIG['upsert_seconds_per_row'])]
+    if not use_db:
+        cmd.append('--no-db')
+    if trace:
+        cmd.append('--tracemalloc')
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        print(proc.stdout[-2000:], proc.stderr[-4000:])
+        raise RuntimeError(f"Replay with engine {engine} failed")
+    # The pipeline logs freely; the result is the last line
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def format_report(result):
+    stage_names = ['fetch', 'parse', 'translate', 'embed', 'upsert', 'archive']
+    lines = [f"Engine {result['engine']} ({result['processes']} parse processes): "
+             f"{result['rows']} rows from {result['files']} files in {result['wall_seconds']:.2f}s "
+             f"= {result['rows_per_sec']:.0f} rows/sec"
+             + (f", {result['failed_files']} files FAILED" if result['failed_files'] else '')]
+    for name in stage_names:
+        stage = result['stages'].get(name)
+        if stage:
+            lines.append(f"  {name:<10} {stage['busy_seconds']:8.2f}s busy  {stage['items']:5d} chunks"
+                         + (f"  {stage['errors']} failed" if stage['errors'] else ''))
+    memory = f"  peak RSS {result['peak_rss_mb']:.0f} MB (parse workers {result['peak_child_rss_mb']:.0f} MB)"
+    if result.get('traced_peak_mb') is not None:
+        memory += f", traced allocations peak {result['traced_peak_mb']:.1f} MB"
+    lines.append(memory)
+    return '\n'.join(lines)
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Returns a list of regression messages (rows/sec down by more than `tolerance`)."""
+    previous = {(r['engine'], r['processes']): r for r in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result['engine'], result['processes']))
+        if not before or not before['rows_per_sec']:
+            continue
+        change = result['rows_per_sec'] / before['rows_per_sec'] - 1
+        print(f"  {result['engine']}: {before['rows_per_sec']:.0f} -> {result['rows_per_sec']:.0f} rows/sec "
+              f"({change:+.0%})")
+        if change < -tolerance:
+            regressions.append(f"{result['engine']} is {-change:.0%} slower than the baseline")
+    return regressions
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline replay benchmark for the GKG ingestion pipeline.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    gen = subparsers.add_parser("generate", help="Write synthetic GKG zips")
+    gen.add_argument("--out", required=True, help="Directory to write to")
+    gen.add_argument("--files", type=int, default=4)
+    gen.add_argument("--rows", type=int, default=20000, help="Rows per file")
+    gen.add_argument("--stream", choices=["original", "translation"], default="original")
+    gen.add_argument("--seed", type=int, default=1)
+
+    for name in ("run", "_replay"):
+        run = subparsers.add_parser(name, help="Replay a directory of GKG zips" if name == "run" else None)
+        run.add_argument("--dir", required=True, help="Directory of .gkg.csv.zip files")
+        run.add_argument("--processes", type=int, default=1, help="STREAM_CONFIG['parse_processes']")
+        run.add_argument("--translate-latency", type=float, default=BENCHMARK_CONFIG['translate_latency'])
+        run.add_argument("--embed-seconds", type=float, default=BENCHMARK_CONFIG['embed_seconds_per_row'],
+                         help="Simulated embedding time per article")
+        run.add_argument("--upsert-seconds", type=float, default=BENCHMARK_CONFIG['upsert_seconds_per_row'],
+                         help="Simulated upsert time per article")
+        run.add_argument("--no-db", action="store_true", help="Run without the Supabase stand-in")
+        run.add_argument("--tracemalloc", action="store_true", help="Also trace Python allocations (slower)")
+        if name == "run":
+            run.add_argument("--engines", default="python,columnar", help="Comma-separated parser engines")
+            run.add_argument("--json", help="Write the results here")
+            run.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+        else:
+            run.add_argument("--engine", required=True)
+
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        generate_gkg_files(args.out, args.files, args.rows, args.stream, args.seed)
+        return
+
+    BENCHMARK_CONFIG['translate_latency'] = args.translate_latency
+    BENCHMARK_CONFIG['embed_seconds_per_row'] = args.embed_seconds
+    BENCHMARK_CONFIG['upsert_seconds_per_row'] = args.upsert_seconds
+    directory = os.path.abspath(args.dir)
+
+    if args.command == "_replay":
+        result = replay(directory, args.engine, args.processes, not args.no_db, args.tracemalloc)
+        print(json.dumps(result))
+        return
+
+    results = []
+    for engine in args.engines.split(','):
+        result = run_isolated(directory, engine.strip(), args.processes, not args.no_db, False)
+        if args.tracemalloc:
+            # Tracing slows Python allocations down many times over: timings come from the untraced run
+            traced = run_isolated(directory, engine.strip(), args.processes, not args.no_db, True)
+            result['traced_peak_mb'] = traced['traced_peak_mb']
+        print(format_report(result))
+        results.append(result)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"Compared to {args.baseline}:")
+        regressions = compare_to_baseline(results, baseline, BENCHMARK_CONFIG['regression_tolerance'])
+        if regressions:
+            for message in regressions:
+                print(f"REGRESSION: {message}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
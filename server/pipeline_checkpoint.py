@@ -0,0 +1,95 @@
+"""
+Durable record of which GKG files the pipeline has processed.
+
+Per stream we keep a watermark (`last_url`: every file up to and including it
+is done) plus the recently processed URLs, because catch-up replays run
+concurrently and can finish out of order. Failed attempts are counted per URL;
+a file the pipeline gave up on is listed under `failed` and counts as done, so
+it doesn't hold the watermark back or get re-fetched on every poll. The file is
+rewritten atomically after every change, so a crash never leaves a half-written
+checkpoint.
+"""
+import json
+import os
+import threading
+
+# How many processed URLs to remember per stream (96 files per day)
+RECENT_URLS = 96 * 14
+
+class PipelineCheckpoint:
+    def __init__(self, path, recent_urls=RECENT_URLS):
+        self.path = path
+        self.recent_urls = recent_urls
+        self._lock = threading.Lock()
+        self._state = {}
+
+        if os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self._state = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: could not read checkpoint {path}, starting fresh: {e}")
+
+    def _stream(self, stream):
+        return self._state.setdefault(stream, {'last_url': None, 'processed': []})
+
+    def last_url(self, stream):
+        """Newest URL of `stream` with no unprocessed files before it (None if never run)."""
+        with self._lock:
+            return self._stream(stream)['last_url']
+
+    def is_processed(self, stream, url):
+        with self._lock:
+            return url in self._stream(stream)['processed']
+
+    def mark_processed(self, stream, url):
+        """Records that `url` has been fully processed (it may still be ahead of the watermark)."""
+        with self._lock:
+            self._mark_processed(self._stream(stream), url)
+            self._save()
+
+    def _mark_processed(self, state, url):
+        if url not in state['processed']:
+            state['processed'].append(url)
+            del state['processed'][:-self.recent_urls]
+        state.get('attempts', {}).pop(url, None)
+
+    def record_failure(self, stream, url):
+        """Counts a failed attempt at `url`. Returns the number of failed attempts so far."""
+        with self._lock:
+            attempts = self._stream(stream).setdefault('attempts', {})
+            attempts[url] = attempts.pop(url, 0) + 1
+            # Oldest first (insertion order); files that dropped out of the catch-up window go
+            for old_url in list(attempts)[:-self.recent_urls]:
+                del attempts[old_url]
+            self._save()
+            return attempts[url]
+
+    def mark_failed(self, stream, url):
+        """Gives up on `url`: listed under 'failed' and treated as processed from now on."""
+        with self._lock:
+            state = self._stream(stream)
+            failed = state.setdefault('failed', [])
+            if url not in failed:
+                failed.append(url)
+                del failed[:-self.recent_urls]
+            self._mark_processed(state, url)
+            self._save()
+
+    def failed_urls(self, stream):
+        """Files of `stream` the pipeline gave up on (oldest first)."""
+        with self._lock:
+            return list(self._stream(stream).get('failed', []))
+
+    def advance(self, stream, url):
+        """Moves the watermark to `url`; the caller guarantees every earlier file is done."""
+        with self._lock:
+            self._stream(stream)['last_url'] = url
+            self._save()
+
+    def _save(self):
+        # Write to a temp file and rename over the old one (atomic on POSIX and Windows)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._state, f, indent=2)
+        os.replace(tmp_path, self.path)
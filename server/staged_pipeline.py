@@ -0,0 +1,146 @@
+"""
+Small threaded producer/consumer pipeline.
+
+A source generator feeds a chain of stages connected by bounded queues. Each
+stage has its own worker threads; when a downstream stage falls behind its
+queue fills up and upstream workers block (backpressure), so memory stays
+bounded while every stage works on a different chunk at the same time. The
+total time then approaches the time of the slowest stage instead of the sum.
+
+Items carry their sequence number. A stage marked `ordered` gets a reorder
+buffer and sees items in source order (e.g. for appending to a CSV). A failed
+item is passed on as None so ordered stages never wait for it.
+"""
+import queue
+import threading
+import time
+
+# Marks the end of the stream on a queue
+_DONE = object()
+
+class Stage:
+    def __init__(self, name, func, workers=1, ordered=False):
+        if ordered and workers != 1:
+            raise ValueError(f"Ordered stage '{name}' must have exactly one worker")
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.ordered = ordered
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.queue_peak = 0      # Most items seen waiting in the stage's input queue
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok):
+        with self._lock:
+            self.items += 1
+            self.busy_seconds += seconds
+            if not ok:
+                self.errors += 1
+
+    def record_queue_depth(self, depth):
+        with self._lock:
+            self.queue_peak = max(self.queue_peak, depth)
+
+def run_stages(source, stages, queue_size=2):
+    """
+    Runs `source` (the first stage, e.g. a download) through `stages`.
+    Returns (outputs of the last stage in source order, list of StageStats: source first).
+    Each queue holds at most queue_size items per consumer worker.
+    """
+    source_stats = StageStats('fetch')
+    stats = [source_stats] + [StageStats(stage.name) for stage in stages]
+    queues = [queue.Queue(maxsize=queue_size * stage.workers) for stage in stages]
+    outputs = {}
+    outputs_lock = threading.Lock()
+
+    def produce():
+        seq = 0
+        iterator = iter(source)
+        while True:
+            start = time.time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            except Exception as e:
+                print(f"  [Stage fetch failed: {e}]")
+                source_stats.record(time.time() - start, ok=False)
+                break
+            source_stats.record(time.time() - start, ok=True)
+            queues[0].put((seq, item))
+            seq += 1
+        for _ in range(stages[0].workers):
+            queues[0].put(_DONE)
+
+    def consume(index, finished):
+        stage = stages[index]
+        stage_stats = stats[index + 1]
+        in_queue = queues[index]
+        out_queue = queues[index + 1] if index + 1 < len(stages) else None
+        # Reorder buffer (ordered stages only): seq -> item
+        pending = {}
+        next_seq = 0
+
+        def handle(seq, item):
+            result = None
+            if item is not None:
+                start = time.time()
+                try:
+                    result = stage.func(item)
+                    stage_stats.record(time.time() - start, ok=True)
+                except Exception as e:
+                    print(f"  [Stage {stage.name} failed: {e}]")
+                    stage_stats.record(time.time() - start, ok=False)
+            if out_queue is not None:
+                out_queue.put((seq, result))
+            else:
+                with outputs_lock:
+                    outputs[seq] = result
+
+        while True:
+            entry = in_queue.get()
+            if entry is _DONE:
+                break
+            # Depth including the item just taken
+            stage_stats.record_queue_depth(in_queue.qsize() + 1)
+            if not stage.ordered:
+                handle(*entry)
+                continue
+            seq, item = entry
+            pending[seq] = item
+            while next_seq in pending:
+                handle(next_seq, pending.pop(next_seq))
+                next_seq += 1
+
+        # The last worker of a stage to finish closes the next queue
+        with finished['lock']:
+            finished['count'] += 1
+            last = finished['count'] == stage.workers
+        if last and out_queue is not None:
+            for _ in range(stages[index + 1].workers):
+                out_queue.put(_DONE)
+
+    threads = [threading.Thread(target=produce, name='stage-fetch', daemon=True)]
+    for index, stage in enumerate(stages):
+        finished = {'count': 0, 'lock': threading.Lock()}
+        for worker in range(stage.workers):
+            threads.append(threading.Thread(target=consume, args=(index, finished),
+                                            name=f'stage-{stage.name}-{worker}', daemon=True))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return [outputs[seq] for seq in sorted(outputs)], stats
+
+def format_stage_stats(stats, wall_seconds):
+    """One-line summary: busy seconds per stage next to the wall time."""
+    parts = [f"{s.name} {s.busy_seconds:.1f}s/{s.items}" + (f" ({s.errors} failed)" if s.errors else "")
+             for s in stats]
+    return f"Stages (busy time/chunks): {' | '.join(parts)} | wall {wall_seconds:.1f}s"
@@ -0,0 +1,99 @@
+"""
+Precomputed GDELT theme code -> human-readable name lookup.
+
+The theme vocabulary is finite, so instead of running the prefix regexes for
+every theme of every article we clean each code in GDELT_THEME_TAXONOMY.md once
+at import time. Codes that are not in the taxonomy are cleaned on first sight
+and kept in a bounded memo, so the regex only ever runs once per distinct code.
+"""
+import os
+import re
+import threading
+from functools import lru_cache
+
+TAXONOMY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "GDELT_THEME_TAXONOMY.md")
+
+# Max number of non-taxonomy codes remembered (least recently used are dropped)
+MEMO_SIZE = 8192
+
+# Common prefixes removed from theme codes, in the order they are applied
+THEME_PREFIXES = [
+    r"TAX_FNCACT_", r"TAX_ETHNICITY_", r"TAX_WORLDLANGUAGES_", r"TAX_WORLDMAMMALS_",
+    r"TAX_POLITICAL_PARTY_", r"TAX_",
+    r"WB_\d+_", r"WB_",
+    r"CRISISLEX_C\d+_", r"CRISISLEX_T\d+_", r"CRISISLEX_O\d+_", r"CRISISLEX_",
+    r"UNGP_", r"SOC_", r"ECON_", r"ENV_", r"EPU_POLICY_", r"EPU_", r"GEN_",
+    r"USPEC_", r"LEADER", r"GENERAL_", r"GOV_"
+]
+
+# One compiled pattern for all prefixes. Each prefix is an optional group in the
+# list order above, which strips exactly what applying re.sub(f"^{prefix}", "", ...)
+# for each prefix in turn would (e.g. "TAX_ECON_PRICE" -> "ECON_PRICE" -> "PRICE").
+_PREFIX_RE = re.compile('^' + ''.join(f'(?:{prefix})?' for prefix in THEME_PREFIXES))
+
+# Theme codes as they appear (in backticks) in the taxonomy reference
+_CODE_RE = re.compile(r'`([A-Z][A-Z0-9_]*[A-Z0-9])`')
+
+def clean_theme_code(theme_code):
+    """
+    Cleans a bare GDELT theme code (no ":count" suffix) into a readable string.
+    Example: "TAX_FNCACT_PRESIDENT" -> "President"
+    """
+    cleaned = _PREFIX_RE.sub('', theme_code, count=1)
+
+    # Replace underscores with spaces and Title Case
+    return cleaned.replace('_', ' ').title().strip()
+
+def load_taxonomy_codes(path=TAXONOMY_FILE):
+    """Returns the set of theme codes listed in the taxonomy markdown file."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return set(_CODE_RE.findall(f.read()))
+    except OSError as e:
+        print(f"Warning: could not read theme taxonomy {path}: {e}")
+        return set()
+
+def build_theme_table(codes):
+    """Precomputes code -> clean name for every code."""
+    return {code: clean_theme_code(code) for code in codes}
+
+# Built once at startup
+THEME_TABLE = build_theme_table(load_taxonomy_codes())
+
+# Parse threads of the staged pipeline look themes up concurrently
+_table_hits = 0
+_table_hits_lock = threading.Lock()
+
+@lru_cache(maxsize=MEMO_SIZE)
+def _clean_unknown(theme_code):
+    return clean_theme_code(theme_code)
+
+def lookup_theme(theme_code):
+    """Returns the clean name for a bare theme code (taxonomy table first, then the memo)."""
+    global _table_hits
+    name = THEME_TABLE.get(theme_code)
+    if name is not None:
+        with _table_hits_lock:
+            _table_hits += 1
+        return name
+    return _clean_unknown(theme_code)
+
+def theme_lookup_stats():
+    """
+    Hit/miss counters for the lookup.
+    memo_misses is the number of times the prefix regex actually ran.
+    """
+    info = _clean_unknown.cache_info()
+    return {
+        'table_size': len(THEME_TABLE),
+        'table_hits': _table_hits,
+        'memo_hits': info.hits,
+        'memo_misses': info.misses,
+        'memo_size': info.currsize,
+    }
+
+if __name__ == "__main__":
+    # Print the precomputed table (handy for checking a taxonomy edit)
+    for code, name in sorted(THEME_TABLE.items()):
+        print(f"{code} -> {name}")
+    print(f"\n{len(THEME_TABLE)} theme codes loaded from {TAXONOMY_FILE}")
@@ -0,0 +1,327 @@
+"""
+Title translation layer for the pipeline.
+
+Translating one title per request with a fresh GoogleTranslator is slow and
+wasteful: wire stories are syndicated hundreds of times and the same titles
+come back in the next 15-minute batch. Here each batch is deduplicated, looked
+up in a persistent SQLite cache (source text -> English, least recently used
+entries evicted), and only the misses are sent - packed several titles per
+request - through translator objects reused per worker thread.
+
+Requests are scheduled by an AIMD limiter: concurrency grows by one while
+responses are fast and is halved on errors or slow responses, so a throttling
+translator backs us off instead of every title silently staying untranslated.
+Failed requests are retried with jittered backoff until the batch deadline.
+"""
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from deep_translator import GoogleTranslator
+
+TRANSLATION_CONFIG = {
+    'cache_file': "translation_cache.db",  # SQLite cache of source text -> English
+    'cache_max_entries': 200000,           # Least recently used entries are evicted beyond this
+    'batch_chars': 4500,                   # Max characters per request (Google's limit is 5000)
+    'backend': 'google',                   # 'google' or 'http' (LibreTranslate-style service, e.g. fake_translator.py)
+    'service_url': "http://127.0.0.1:5005/translate",  # Endpoint for the 'http' backend
+    'request_timeout': 20,                 # Seconds per request for the 'http' backend
+    'min_workers': 1,                      # Concurrency bounds for the adaptive limiter
+    'initial_workers': 4,
+    'max_workers': 16,
+    'target_latency': 3.0,                 # Seconds; slower responses count as congestion
+    'max_retries': 3,                      # Retries per request after the first attempt
+    'backoff_base': 1.0,                   # Seconds; retry n sleeps up to backoff_base * 2**n
+    'batch_deadline': 240,                 # Seconds one translate_texts call may take (the feed updates every 900)
+    'keep_untranslated': False,            # False: titles that couldn't be translated are left out of news.csv
+}
+
+# Titles of one request are joined with newlines; Google keeps line breaks, so
+# the response splits back into one line per title
+SEPARATOR = '\n'
+
+class TranslationCache:
+    """
+    Persistent source text -> English cache in SQLite.
+    Safe to share between threads; every access goes through one connection and lock.
+    """
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " source TEXT PRIMARY KEY,"
+            " english TEXT NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations(last_used)")
+        self._conn.commit()
+
+    def get_many(self, texts):
+        """Returns {source: english} for the texts that are cached, and marks them as used."""
+        found = {}
+        now = time.time()
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(texts), 500):
+                chunk = texts[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT source, english FROM translations WHERE source IN ({placeholders})", chunk
+                ).fetchall()
+                found.update(rows)
+            if found:
+                self._conn.executemany(
+                    "UPDATE translations SET last_used = ? WHERE source = ?",
+                    [(now, source) for source in found]
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, pairs):
+        """Stores (source, english) pairs, then evicts the oldest entries above max_entries."""
+        if not pairs:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations (source, english, last_used) VALUES (?, ?, ?)",
+                [(source, english, now) for source, english in pairs]
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            if count > self.max_entries:
+                # Evict down to 90% so we don't pay for an eviction on every batch
+                excess = count - int(self.max_entries * 0.9)
+                self._conn.execute(
+                    "DELETE FROM translations WHERE source IN "
+                    "(SELECT source FROM translations ORDER BY last_used LIMIT ?)", (excess,)
+                )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """Opens the shared translation cache on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TranslationCache(TRANSLATION_CONFIG['cache_file'], TRANSLATION_CONFIG['cache_max_entries'])
+        return _cache
+
+class HttpTranslator:
+    """
+    Client for a LibreTranslate-compatible endpoint: POST {"q", "source", "target"}
+    -> {"translatedText"}. Used for self-hosted translators and the local fake service.
+    """
+    def __init__(self, url, timeout):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def translate(self, text):
+        r = self.session.post(self.url, json={'q': text, 'source': 'auto', 'target': 'en', 'format': 'text'},
+                              timeout=self.timeout)
+        r.raise_for_status()
+        return r.json()['translatedText']
+
+# Backend name -> factory for a translator object with a translate(text) method
+BACKENDS = {
+    'google': lambda: GoogleTranslator(source='auto', target='en'),
+    'http': lambda: HttpTranslator(TRANSLATION_CONFIG['service_url'], TRANSLATION_CONFIG['request_timeout']),
+}
+
+# One translator per worker thread, reused across requests
+_local = threading.local()
+
+def get_translator():
+    backend = TRANSLATION_CONFIG['backend']
+    if getattr(_local, 'backend', None) != backend:
+        _local.translator = BACKENDS[backend]()
+        _local.backend = backend
+    return _local.translator
+
+def pack_batches(texts, max_chars):
+    """Groups texts into lists whose joined length stays under max_chars."""
+    batch = []
+    size = 0
+    for text in texts:
+        extra = len(text) + (len(SEPARATOR) if batch else 0)
+        if batch and size + extra > max_chars:
+            yield batch
+            batch, size = [], 0
+            extra = len(text)
+        batch.append(text)
+        size += extra
+    if batch:
+        yield batch
+
+def translate_batch(texts):
+    """
+    Translates a list of titles with one request.
+    Returns the translations, or None if the response doesn't split back into
+    one line per title.
+    """
+    translator = get_translator()
+    if len(texts) == 1:
+        return [translator.translate(texts[0])]
+
+    translated = translator.translate(SEPARATOR.join(texts))
+    lines = translated.split(SEPARATOR) if isinstance(translated, str) else []
+    if len(lines) == len(texts):
+        return [line.strip() for line in lines]
+    return None
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit: +1 per window of fast successful requests,
+    halved on an error or a response slower than target_latency.
+    """
+    def __init__(self, initial, minimum, maximum, target_latency):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, deadline):
+        """Waits for a free slot; returns False if the deadline passes first."""
+        with self._cond:
+            if time.time() >= deadline:
+                return False
+            while self.in_flight >= int(self.limit):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            self.in_flight += 1
+            return True
+
+    def release(self, latency, ok):
+        with self._cond:
+            self.in_flight -= 1
+            if ok and latency <= self.target_latency:
+                # Additive increase: about +1 once every `limit` successes
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            else:
+                # Multiplicative decrease on throttling, errors or slow responses
+                self.limit = max(self.minimum, self.limit / 2)
+            self._cond.notify_all()
+
+_limiter = None
+
+def get_limiter():
+    """The limiter is shared by every batch so the learned concurrency carries over."""
+    global _limiter
+    with _cache_lock:
+        if _limiter is None:
+            _limiter = AdaptiveLimiter(TRANSLATION_CONFIG['initial_workers'], TRANSLATION_CONFIG['min_workers'],
+                                       TRANSLATION_CONFIG['max_workers'], TRANSLATION_CONFIG['target_latency'])
+        return _limiter
+
+def translate_with_retries(batch, limiter, deadline, stats, stats_lock):
+    """
+    Runs translate_batch under the limiter, retrying with full-jitter backoff.
+    Returns the translations (None for titles that failed), or None if every
+    attempt failed or the deadline passed.
+    """
+    for attempt in range(TRANSLATION_CONFIG['max_retries'] + 1):
+        if not limiter.acquire(deadline):
+            return None
+        start = time.time()
+        try:
+            translations = translate_batch(batch)
+        except Exception as e:
+            limiter.release(time.time() - start, ok=False)
+            with stats_lock:
+                stats['requests'] += 1
+                stats['errors'] += 1
+            error = e
+        else:
+            limiter.release(time.time() - start, ok=True)
+            with stats_lock:
+                stats['requests'] += 1
+            if translations is None:
+                # Lines were merged or split: translate each title on its own, every
+                # request under the limiter and the deadline like any other
+                with stats_lock:
+                    stats['split_batches'] += 1
+                return [(translate_with_retries([text], limiter, deadline, stats, stats_lock) or [None])[0]
+                        for text in batch]
+            return translations
+
+        backoff = random.uniform(0, TRANSLATION_CONFIG['backoff_base'] * 2 ** attempt)
+        if attempt == TRANSLATION_CONFIG['max_retries'] or time.time() + backoff >= deadline:
+            print(f"  [Giving up on {len(batch)} titles after {attempt + 1} attempts: {error}]")
+            return None
+        with stats_lock:
+            stats['retries'] += 1
+        time.sleep(backoff)
+    return None
+
+def translate_texts(texts):
+    """
+    Translates texts to English through the cache.
+    Returns ({source: english} for every text that could be translated, stats dict).
+    Texts whose translation failed or ran past the batch deadline are left out of the
+    result and counted in stats['failed'].
+    """
+    deadline = time.time() + TRANSLATION_CONFIG['batch_deadline']
+    
+    # Newlines would break the batch separator; titles never need them
+    unique = list(dict.fromkeys(' '.join(text.split(SEPARATOR)) for text in texts))
+    stats = {'titles': len(texts), 'unique': len(unique), 'cache_hits': 0, 'translated': 0,
+             'requests': 0, 'retries': 0, 'errors': 0, 'failed': 0, 'split_batches': 0}
+
+    cache = None
+    results = {}
+    try:
+        cache = get_cache()
+        results = cache.get_many(unique)
+    except sqlite3.Error as e:
+        print(f"  [Warning: translation cache unavailable: {e}]")
+    stats['cache_hits'] = len(results)
+
+    misses = [text for text in unique if text not in results]
+    batches = list(pack_batches(misses, TRANSLATION_CONFIG['batch_chars']))
+    new_pairs = []
+
+    if batches:
+        limiter = get_limiter()
+        stats_lock = threading.Lock()
+        # The pool is sized for the maximum; the limiter decides how many requests actually run
+        with ThreadPoolExecutor(max_workers=TRANSLATION_CONFIG['max_workers']) as executor:
+            future_to_batch = {executor.submit(translate_with_retries, batch, limiter, deadline, stats, stats_lock): batch
+                               for batch in batches}
+            for future in as_completed(future_to_batch):
+                batch = future_to_batch[future]
+                translations = future.result() or [None] * len(batch)
+                for source, english in zip(batch, translations):
+                    if english:
+                        results[source] = english
+                        new_pairs.append((source, english))
+                        stats['translated'] += 1
+                    else:
+                        stats['failed'] += 1
+        stats['concurrency'] = int(limiter.limit)
+
+    if cache is not None and new_pairs:
+        try:
+            cache.put_many(new_pairs)
+        except sqlite3.Error as e:
+            print(f"  [Warning: could not update translation cache: {e}]")
+
+    # Map back from the newline-free keys to the texts as given
+    return {text: results[key] for text in texts
+            if (key := ' '.join(text.split(SEPARATOR))) in results}, stats
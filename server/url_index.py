@@ -0,0 +1,113 @@
+"""
+Persistent index of article URLs that are already in Supabase.
+
+GDELT republishes many URLs in consecutive 15-minute files. Checking each
+chunk against this index right after parsing means a repeat URL never costs
+translation, embedding or an upsert. URLs are stored as 64-bit hashes in a
+sorted numpy array (8 bytes per URL; a false positive needs a 64-bit
+collision, about 1 in 10^7 even at a few million URLs). The index is saved
+atomically after every update and periodically rebuilt exactly from the
+`articles` table, which also drops URLs deleted from the DB.
+"""
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+
+URL_INDEX_CONFIG = {
+    'index_file': "seen_urls.npy",   # Sorted uint64 URL hashes
+    'rebuild_hours': 24,             # Rebuild from the DB when the index is older than this
+    'page_size': 1000,               # Rows per request when reading URLs from Supabase
+}
+
+def url_hash(url):
+    """64-bit hash of a URL (stable across runs, unlike hash())."""
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def hash_urls(urls):
+    return np.fromiter((url_hash(url) for url in urls), dtype=np.uint64, count=len(urls))
+
+class SeenUrlIndex:
+    def __init__(self, path, rebuild_hours=URL_INDEX_CONFIG['rebuild_hours']):
+        self.path = path
+        self.rebuild_seconds = rebuild_hours * 3600
+        self._lock = threading.Lock()
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._built_at = 0.0
+
+        if os.path.exists(path):
+            try:
+                self._hashes = np.load(path)
+                self._built_at = float(np.load(f"{path}.meta.npy"))
+            except (OSError, ValueError) as e:
+                print(f"Warning: could not read URL index {path}, starting empty: {e}")
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def seen_mask(self, urls):
+        """Returns a boolean array: True where the URL is already in the index."""
+        hashes = hash_urls(urls)
+        with self._lock:
+            index = self._hashes
+        if not len(index):
+            return np.zeros(len(hashes), dtype=bool)
+        pos = np.searchsorted(index, hashes)
+        pos[pos == len(index)] = 0
+        return index[pos] == hashes
+
+    def mark_seen(self, urls):
+        """Adds URLs (e.g. after a successful upsert) and saves the index."""
+        if not urls:
+            return
+        hashes = hash_urls(urls)
+        with self._lock:
+            self._hashes = np.union1d(self._hashes, hashes)
+            self._save()
+
+    def needs_rebuild(self):
+        return time.time() - self._built_at > self.rebuild_seconds
+
+    def rebuild(self, urls):
+        """Replaces the index with exactly `urls` (the current contents of the DB)."""
+        hashes = np.unique(hash_urls(urls))
+        with self._lock:
+            self._hashes = hashes
+            self._built_at = time.time()
+            self._save()
+
+    def _save(self):
+        # Write to temp files and rename over the old ones (atomic on POSIX and Windows)
+        for path, value in ((self.path, self._hashes), (f"{self.path}.meta.npy", np.float64(self._built_at))):
+            tmp_path = f"{path}.tmp.npy"
+            np.save(tmp_path, value)
+            os.replace(tmp_path, path)
+
+def fetch_article_urls(db, page_size=URL_INDEX_CONFIG['page_size']):
+    """Reads every URL in the `articles` table, page by page."""
+    urls = []
+    start = 0
+    while True:
+        res = db.supabase.table("articles").select("url").range(start, start + page_size - 1).execute()
+        batch = res.data
+        if not batch:
+            break
+        urls.extend(row['url'] for row in batch if row.get('url'))
+        if len(batch) < page_size:
+            break
+        start += page_size
+    return urls
+
+def refresh_from_db(index, db):
+    """Rebuilds the index from Supabase if it is due. Keeps the current index on errors."""
+    if db is None or not index.needs_rebuild():
+        return
+    try:
+        print("  [Rebuilding seen-URL index from Supabase...]")
+        urls = fetch_article_urls(db)
+        index.rebuild(urls)
+        print(f"  [Seen-URL index rebuilt: {len(index)} URLs]")
+    except Exception as e:
+        print(f"  [Warning: could not rebuild seen-URL index: {e}]")
@@ -0,0 +1,36 @@
+"""
+Shared helpers for the tests. The server modules import each other by bare
+name (they are run from server/), so server/ goes on sys.path here. The API
+(server/main.py) imports them as server.*, so the repository root goes there too.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_DIR = os.path.join(ROOT_DIR, "server")
+for path in (ROOT_DIR, SERVER_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+def make_gkg_line(url, extras='<PAGE_TITLE>Fiji votes</PAGE_TITLE>',
+                  locations='1#Fiji#FJ#FJ##-18#178#FJ', themes='ELECTION,10', num_columns=27):
+    """One tab-separated GKG 2.1 line (cut to num_columns columns for malformed lines)."""
+    cols = [''] * 27
+    cols[0] = '20260101000000-1'
+    cols[1] = '20260101000000'
+    cols[3] = 'example.com'
+    cols[4] = url
+    cols[6] = 'KILL#2#people#1#Fiji#FJ#FJ##-18#178#FJ#10'
+    cols[8] = themes
+    cols[10] = locations
+    cols[12] = 'Jane Doe,12'
+    cols[14] = 'Acme Corp,40'
+    cols[15] = '-1.5,2.0,3.5,5.5,20.1,0,120'
+    cols[26] = extras
+    return '\t'.join(cols[:num_columns])
+
+@pytest.fixture
+def gkg_line():
+    return make_gkg_line
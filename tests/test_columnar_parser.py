@@ -0,0 +1,79 @@
+import io
+
+import pandas as pd
+
+import news_retrieve
+
+def parse_columnar(lines, chunk_rows=100):
+    data = ''.join(line + '\n' for line in lines).encode('latin-1')
+    frames = list(news_retrieve.iter_frames_columnar(io.BytesIO(data), chunk_rows))
+    return pd.concat(frames, ignore_index=True)
+
+def parse_python(lines):
+    return news_retrieve.parse_line_chunk([(line + '\n').encode('latin-1') for line in lines], 'python')
+
+def test_row_failing_sanity_check_without_coordinates(gkg_line):
+    # 27 columns, but V2Extras doesn't start with '<' and there are no locations,
+    # so the row parser fills it in with None coordinates
+    lines = [gkg_line('https://a.example/1'),
+             gkg_line('https://a.example/2', extras='junk', locations=''),
+             gkg_line('https://a.example/3')]
+    df = parse_columnar(lines)
+    assert df['url'].tolist() == ['https://a.example/1', 'https://a.example/2', 'https://a.example/3']
+    assert df['first_location_lat'].dtype == 'float64'
+    assert pd.isna(df.loc[1, 'first_location_lat'])
+    pd.testing.assert_frame_equal(df, parse_python(lines))
+
+def test_engines_match_with_malformed_lines(gkg_line):
+    lines = [
+        gkg_line('https://b.example/0', num_columns=20),    # Wrong column count, first line
+        gkg_line('https://b.example/1'),
+        gkg_line('https://b.example/2', extras='junk', locations=''),
+        gkg_line('https://b.example/3', num_columns=20),    # Two in a row
+        gkg_line('https://b.example/4', num_columns=5),
+        gkg_line('https://b.example/5', locations='4#Paris, France#FR#FR##48.85#2.35#FR;1#Fiji#FJ#FJ##-18#178#FJ'),
+        gkg_line('https://b.example/6', locations='garbage'),
+        gkg_line('https://b.example/7'),
+        gkg_line('https://b.example/8', num_columns=10),    # Last line
+    ]
+    expected = parse_python(lines)
+    # Also with chunk boundaries falling between and next to the malformed lines
+    for chunk_rows in (100, 1, 2, 3):
+        pd.testing.assert_frame_equal(parse_columnar(lines, chunk_rows), expected)
+
+
+def test_schema_stats_are_counted_per_file_across_threads(gkg_line):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from news_retrieve import SCHEMA_STATS, file_schema_stats, parse_line_chunk
+
+    good = [gkg_line(f"https://example.com/{i}").encode() + b'\n' for i in range(50)]
+    bad = [gkg_line(f"https://example.com/bad{i}", num_columns=20).encode() + b'\n' for i in range(50)]
+    files = {'good': dict.fromkeys(SCHEMA_STATS, 0), 'bad': dict.fromkeys(SCHEMA_STATS, 0)}
+    before = dict(SCHEMA_STATS)
+
+    def parse(name, lines):
+        with file_schema_stats(files[name]):
+            parse_line_chunk(lines, 'python')
+
+    with ThreadPoolExecutor(8) as pool:
+        for future in [pool.submit(parse, name, lines)
+                       for _ in range(20) for name, lines in (('good', good), ('bad', bad))]:
+            future.result()
+
+    assert files['good'] == {'fixed': 1000, 'fallback': 0}
+    assert files['bad'] == {'fixed': 0, 'fallback': 1000}
+    assert SCHEMA_STATS['fixed'] - before['fixed'] == 1000
+    assert SCHEMA_STATS['fallback'] - before['fallback'] == 1000
+
+
+def test_theme_table_hits_are_not_lost_across_threads():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from theme_names import THEME_TABLE, lookup_theme, theme_lookup_stats
+
+    code = next(iter(THEME_TABLE))
+    before = theme_lookup_stats()['table_hits']
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: [lookup_theme(code) for _ in range(20000)], range(8)))
+    assert theme_lookup_stats()['table_hits'] - before == 8 * 20000
@@ -0,0 +1,61 @@
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from model import embed
+from model.embed_cache import content_key, embed_unique
+
+
+class FakeSentenceTransformer:
+    def __init__(self, name):
+        self.name = name
+
+    def encode(self, texts, convert_to_numpy=True, **kwargs):
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+def failing_onnx_loader(*args, **kwargs):
+    raise RuntimeError("onnxruntime is not installed")
+
+
+@pytest.fixture
+def unloaded_model(monkeypatch):
+    monkeypatch.setattr(embed, '_model', None)
+    monkeypatch.setattr(embed, '_model_id', None)
+    monkeypatch.setitem(sys.modules, 'sentence_transformers',
+                        types.SimpleNamespace(SentenceTransformer=FakeSentenceTransformer))
+    onnx_module = types.SimpleNamespace(load_onnx_embedder=failing_onnx_loader)
+    monkeypatch.setitem(sys.modules, 'model.onnx_embed', onnx_module)
+    monkeypatch.setitem(sys.modules, 'server.model.onnx_embed', onnx_module)
+
+
+def test_onnx_fallback_stores_vectors_under_the_torch_namespace(unloaded_model, monkeypatch):
+    monkeypatch.setitem(embed.EMBED_CONFIG, 'backend', 'onnx')
+    monkeypatch.setitem(embed.EMBED_CONFIG, 'micro_batching', False)
+
+    # Asked before anything loaded: must name the backend that will actually produce the vectors
+    namespace = embed.model_id()
+    assert namespace == embed.MODEL_NAME
+    assert isinstance(embed.get_model(), FakeSentenceTransformer)
+
+    class RecordingCache:
+        def __init__(self):
+            self.keys = []
+
+        def get_many(self, keys):
+            return {}
+
+        def put_many(self, pairs):
+            self.keys += [key for key, _ in pairs]
+
+    cache = RecordingCache()
+    embed_unique(["Fiji votes"], embed.embed_text, embed.model_id(), cache)
+    assert cache.keys == [content_key("Fiji votes", embed.MODEL_NAME)]
+
+
+def test_torch_namespace_is_known_without_loading(unloaded_model):
+    assert embed.EMBED_CONFIG['backend'] == 'torch'
+    assert embed.model_id() == embed.MODEL_NAME
+    assert not embed.is_model_ready()
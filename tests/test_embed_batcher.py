@@ -0,0 +1,65 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from model.embed_batcher import EmbeddingBatcher
+
+
+def encode(texts):
+    """One row per text: [length, first character code]."""
+    if any(text == 'bad' for text in texts):
+        raise ValueError("cannot embed 'bad'")
+    return np.array([[len(text), ord(text[0])] for text in texts], dtype=np.float32)
+
+
+def test_every_caller_gets_its_own_vector():
+    calls = []
+
+    def recording_encode(texts):
+        calls.append(list(texts))
+        return encode(texts)
+
+    batcher = EmbeddingBatcher(recording_encode, window_ms=50, max_batch=64)
+    texts = [f"{chr(97 + i % 26)}{'x' * i}" for i in range(40)] + ['repeat'] * 8
+    with ThreadPoolExecutor(16) as pool:
+        vectors = list(pool.map(batcher.embed, texts))
+
+    for text, vector in zip(texts, vectors):
+        assert vector.tolist() == [len(text), ord(text[0])]
+    # Batched, and identical texts encoded once per batch
+    assert len(calls) < len(texts)
+    assert all(len(batch) == len(set(batch)) for batch in calls)
+
+
+def test_an_error_reaches_only_its_own_caller():
+    started = threading.Barrier(3)
+    batcher = EmbeddingBatcher(encode, window_ms=200, max_batch=8)
+
+    def embed(text):
+        started.wait()
+        return batcher.submit(text)
+
+    with ThreadPoolExecutor(3) as pool:
+        futures = list(pool.map(embed, ['good', 'bad', 'fine']))
+
+    assert futures[0].result(5).tolist() == [4, ord('g')]
+    assert futures[2].result(5).tolist() == [4, ord('f')]
+    with pytest.raises(ValueError, match="bad"):
+        futures[1].result(5)
+    # The worker keeps serving afterwards
+    assert batcher.embed('again', timeout=5).tolist() == [5, ord('a')]
+
+
+def test_max_batch_is_respected():
+    sizes = []
+
+    def recording_encode(texts):
+        sizes.append(len(texts))
+        return encode(texts)
+
+    batcher = EmbeddingBatcher(recording_encode, window_ms=100, max_batch=4)
+    futures = [batcher.submit(f"text {i}") for i in range(10)]
+    assert [f.result(5).tolist()[0] for f in futures] == [len(f"text {i}") for i in range(10)]
+    assert max(sizes) <= 4
@@ -0,0 +1,79 @@
+import time
+
+import numpy as np
+
+from model.embed_cache import EmbeddingCache, content_key, embed_unique
+
+
+class RecordingEmbed:
+    """Embeds a text as [length, first character code] and records every call."""
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(text), ord(text[0])] for text in texts], dtype=np.float32)
+
+
+def test_each_distinct_string_is_embedded_once():
+    embed = RecordingEmbed()
+    texts = ['Fiji', 'Elections', 'Fiji', 'Fiji', 'Elections', 'Suva']
+
+    vectors, stats = embed_unique(texts, embed, 'model')
+
+    assert embed.calls == [['Fiji', 'Elections', 'Suva']]
+    assert vectors.tolist() == [[len(t), ord(t[0])] for t in texts]
+    assert stats == {'texts': 6, 'unique': 3, 'cache_hits': 0, 'embedded': 3}
+
+
+def test_cache_skips_strings_from_earlier_batches(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / 'cache.db'), max_entries=100)
+    embed = RecordingEmbed()
+
+    embed_unique(['Fiji', 'Suva'], embed, 'model', cache)
+    vectors, stats = embed_unique(['Suva', 'Nadi', 'Fiji'], embed, 'model', cache)
+
+    assert embed.calls[-1] == ['Nadi']
+    assert stats['cache_hits'] == 2 and stats['embedded'] == 1
+    assert vectors.tolist() == [[4, ord('S')], [4, ord('N')], [4, ord('F')]]
+
+    # Survives reopening
+    reopened = EmbeddingCache(str(tmp_path / 'cache.db'), max_entries=100)
+    assert len(reopened) == 3
+
+
+def test_namespace_separates_models(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / 'cache.db'), max_entries=100)
+    embed = RecordingEmbed()
+
+    embed_unique(['Fiji'], embed, 'model-a', cache)
+    _, stats = embed_unique(['Fiji'], embed, 'model-b', cache)
+
+    assert content_key('Fiji', 'model-a') != content_key('Fiji', 'model-b')
+    assert stats['cache_hits'] == 0 and len(embed.calls) == 2
+
+
+def test_failed_embedding_returns_none_and_caches_nothing(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / 'cache.db'), max_entries=100)
+
+    vectors, stats = embed_unique(['Fiji', 'Fiji'], lambda texts: None, 'model', cache)
+
+    assert vectors is None
+    assert stats['unique'] == 1
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / 'cache.db'), max_entries=10)
+    old = [(content_key(f"old{i}", 'm'), np.zeros(2)) for i in range(5)]
+    cache.put_many(old)
+    time.sleep(0.01)
+    # Touch one old entry so it counts as recently used
+    cache.get_many([old[0][0]])
+    time.sleep(0.01)
+    # 13 entries: evicted down to 90% of max_entries, oldest first
+    cache.put_many([(content_key(f"new{i}", 'm'), np.ones(2)) for i in range(8)])
+
+    assert len(cache) == 9
+    remaining = cache.get_many([key for key, _ in old])
+    assert list(remaining) == [old[0][0]]
@@ -0,0 +1,99 @@
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import gdelt_feed
+from gdelt_feed import FEED_CONFIG, FeedEntry, fetch_conditional, missing_entries
+
+BASE = datetime(2026, 1, 1)
+
+
+def entry(minutes):
+    stamp = (BASE + timedelta(minutes=minutes)).strftime('%Y%m%d%H%M%S')
+    return FeedEntry('1000', f"md5-{minutes}", f"http://data.gdeltproject.org/gdeltv2/{stamp}.gkg.csv.zip")
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    body = b''
+    etag = '"v1"'
+    requests = []
+
+    def do_GET(self):
+        FeedHandler.requests.append(dict(self.headers))
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', self.etag)
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def feed_url(monkeypatch):
+    monkeypatch.setattr(FeedHandler, 'body', b"1000 abc http://data.gdeltproject.org/gdeltv2/20260101000000.gkg.csv.zip\n")
+    monkeypatch.setattr(FeedHandler, 'etag', '"v1"')
+    monkeypatch.setattr(FeedHandler, 'requests', [])
+    monkeypatch.setattr(gdelt_feed, '_validators', {})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FeedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/lastupdate.txt"
+    server.shutdown()
+    server.server_close()
+
+
+def test_unchanged_feed_costs_a_304(feed_url):
+    text, changed = fetch_conditional(feed_url)
+    assert changed and '20260101000000' in text
+    assert 'If-None-Match' not in FeedHandler.requests[0]
+
+    text_again, changed = fetch_conditional(feed_url)
+    assert not changed and text_again == text
+    assert FeedHandler.requests[1]['If-None-Match'] == '"v1"'
+
+    FeedHandler.etag = '"v2"'
+    FeedHandler.body = b"1000 def http://data.gdeltproject.org/gdeltv2/20260101001500.gkg.csv.zip\n"
+    text, changed = fetch_conditional(feed_url)
+    assert changed and '20260101001500' in text
+
+
+def test_consecutive_files_need_no_master_list(monkeypatch):
+    monkeypatch.setattr(gdelt_feed, 'list_gkg_entries', lambda *args, **kwargs: pytest.fail("master list read"))
+    assert missing_entries('original', entry(0).url, entry(15)) == [entry(15)]
+    assert missing_entries('original', None, entry(15)) == [entry(15)]
+
+
+def test_gap_is_filled_from_the_master_list(monkeypatch):
+    calls = []
+
+    def list_gkg_entries(stream, after=None, until=None):
+        calls.append((stream, after, until))
+        return [entry(15), entry(30)]
+
+    monkeypatch.setattr(gdelt_feed, 'list_gkg_entries', list_gkg_entries)
+    # The master list doesn't have the latest file yet: it is appended
+    assert missing_entries('translation', entry(0).url, entry(45)) == [entry(15), entry(30), entry(45)]
+    assert calls == [('translation', BASE, BASE + timedelta(minutes=45))]
+
+
+def test_gap_is_capped_to_the_most_recent_files(monkeypatch):
+    gap = [entry(15 * i) for i in range(1, 201)]
+    monkeypatch.setattr(gdelt_feed, 'list_gkg_entries', lambda *args, **kwargs: gap)
+    entries = missing_entries('original', entry(0).url, gap[-1])
+    assert FEED_CONFIG['max_catchup_files'] == 96
+    assert entries == gap[-96:]
+
+
+def test_master_list_error_falls_back_to_the_latest_file(monkeypatch):
+    def failing(*args, **kwargs):
+        raise OSError("connection refused")
+
+    monkeypatch.setattr(gdelt_feed, 'list_gkg_entries', failing)
+    assert missing_entries('original', entry(0).url, entry(60)) == [entry(60)]
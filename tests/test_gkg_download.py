@@ -0,0 +1,105 @@
+import hashlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import gkg_download
+from gkg_download import DOWNLOAD_CONFIG, cached_path, evict, fetch_to_cache, iter_download
+
+DATA = os.urandom(300_000)
+MD5 = hashlib.md5(DATA).hexdigest()
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves DATA with Range support; can cut responses short."""
+    cut_after = []        # Per request, in order: bytes to send before dropping the connection
+    served_length = None  # Silently serve only this many bytes (correct Content-Length, short file)
+    ranges = []
+
+    def do_GET(self):
+        body = DATA if self.served_length is None else DATA[:self.served_length]
+        start = 0
+        header = self.headers.get('Range')
+        RangeHandler.ranges.append(header)
+        if header:
+            start = int(header.split('=')[1].split('-')[0])
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(body) - start))
+        self.end_headers()
+        if RangeHandler.cut_after:
+            # Connection drops mid-transfer
+            self.wfile.write(body[start:start + RangeHandler.cut_after.pop(0)])
+            self.close_connection = True
+            return
+        self.wfile.write(body[start:])
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server_url(tmp_path, monkeypatch):
+    monkeypatch.setattr(RangeHandler, 'cut_after', [])
+    monkeypatch.setattr(RangeHandler, 'served_length', None)
+    monkeypatch.setattr(RangeHandler, 'ranges', [])
+    monkeypatch.setitem(DOWNLOAD_CONFIG, 'cache_dir', str(tmp_path / "cache"))
+    monkeypatch.setitem(DOWNLOAD_CONFIG, 'backoff_base', 0.01)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/20240101000000.gkg.csv.zip"
+    server.shutdown()
+    server.server_close()
+
+
+def test_interrupted_download_resumes_with_a_range_request(server_url):
+    RangeHandler.cut_after = [100_000, 150_000]
+    data = b''.join(iter_download(server_url, MD5, str(len(DATA))))
+
+    assert data == DATA
+    # Each retry asks only for what hasn't arrived yet
+    assert RangeHandler.ranges[0] is None
+    resumed_at = [int(header.split('=')[1].rstrip('-')) for header in RangeHandler.ranges[1:]]
+    assert len(resumed_at) == 2 and 0 < resumed_at[0] < resumed_at[1] < len(DATA)
+    with open(cached_path(server_url, MD5), 'rb') as f:
+        assert f.read() == DATA
+
+
+def test_partial_download_is_resumed_on_the_next_call(server_url, monkeypatch):
+    monkeypatch.setitem(DOWNLOAD_CONFIG, 'max_retries', 0)
+    RangeHandler.cut_after = [120_000]
+    resumed_before = gkg_download.DOWNLOAD_STATS['resumed']
+    with pytest.raises(Exception):
+        list(iter_download(server_url, MD5, str(len(DATA))))
+    assert cached_path(server_url, MD5) is None
+
+    assert b''.join(iter_download(server_url, MD5, str(len(DATA)))) == DATA
+    assert gkg_download.DOWNLOAD_STATS['resumed'] > resumed_before
+    assert RangeHandler.ranges[0] is None
+    assert 0 < int(RangeHandler.ranges[1].split('=')[1].rstrip('-')) <= 120_000
+
+
+def test_truncated_file_fails_the_size_check(server_url):
+    # The server sends a short file as if it were complete; without an md5 only the size catches it
+    RangeHandler.served_length = 200_000
+    with pytest.raises(IOError, match="does not match the file list"):
+        fetch_to_cache(server_url, size=str(len(DATA)))
+    assert cached_path(server_url) is None
+    assert os.listdir(os.path.join(DOWNLOAD_CONFIG['cache_dir'], 'partial')) == []
+
+
+def test_stale_partial_downloads_are_evicted(tmp_path):
+    partial = tmp_path / "partial"
+    partial.mkdir()
+    (partial / "old.part").write_bytes(b'x')
+    (partial / "fresh.part").write_bytes(b'x')
+    two_days_ago = time.time() - 48 * 3600
+    os.utime(partial / "old.part", (two_days_ago, two_days_ago))
+
+    assert evict(str(tmp_path)) == 1
+    assert os.listdir(partial) == ["fresh.part"]
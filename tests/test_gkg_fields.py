@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+import gkg_fields
+from gkg_fields import LazyGkgFields, decode_column, decode_field, lazy_records
+
+
+def test_decode_each_field():
+    assert decode_field('persons', "Joe Biden,234,9;Kamala Harris,567,13") == ["Joe Biden", "Kamala Harris"]
+    assert decode_field('organizations', "United Nations,134,14;") == ["United Nations"]
+    assert decode_field('tone', "-2.5,3.2,5.7,2.5,12.3,4.8") == -2.5
+    assert decode_field('counts', "KILL#50#militants#Baghdad;BAD") == [
+        {'type': 'KILL', 'number': '50', 'object': 'militants', 'location': 'Baghdad'}]
+    assert decode_field('persons', '') == []
+    assert decode_field('tone', 'not a number') is None
+    with pytest.raises(KeyError):
+        decode_field('themes', '')
+
+
+def test_full_tone_when_configured(monkeypatch):
+    monkeypatch.setitem(gkg_fields.GKG_FIELD_CONFIG, 'tone_overall_only', False)
+
+    tone = decode_field('tone', "-2.5,3.2,5.7")
+
+    assert tone['tone'] == -2.5 and tone['negative'] == 5.7 and tone['polarity'] is None
+
+
+def test_lazy_fields_decode_once(monkeypatch):
+    calls = []
+    real_decode = gkg_fields.decode_field
+    monkeypatch.setattr(gkg_fields, 'decode_field',
+                        lambda field, raw: calls.append(field) or real_decode(field, raw))
+    record = LazyGkgFields(persons="Ana,1,3", tone=float('nan'))
+
+    assert record.persons == ["Ana"]
+    assert record.persons == ["Ana"]
+    # Missing values (NaN from pandas) decode as empty
+    assert record.tone is None
+    assert record.organizations == []
+    assert calls == ['persons', 'tone', 'organizations']
+
+
+def test_frame_helpers_share_decodes():
+    df = pd.DataFrame({'persons_raw': ["Ana,1,3", None, "Ana,1,3"], 'tone_raw': ["1.5,0", "", "-3,1"]})
+
+    assert decode_column(df, 'persons') == [["Ana"], [], ["Ana"]]
+    assert decode_column(df, 'tone') == [1.5, None, -3.0]
+    records = lazy_records(df)
+    assert [r.tone for r in records] == [1.5, None, -3.0]
+    # Columns the frame doesn't have decode as empty
+    assert [r.counts for r in records] == [[], [], []]
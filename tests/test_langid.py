@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from langid import NON_LATIN, detect_language, english_mask, non_english_mask
+
+# Headlines full of English-looking endings ('-ing', '-ed', "'s") that used to be taken for English
+NOT_ENGLISH = [
+    'Verkiezing uitgesteld',
+    'Regering valt na stemming',
+    'Ny forskning om klimatet',
+    'Udvikling i sagen',
+    'Ledning i matchen',
+    'Presiden Jokowi meeting',
+    'Regjeringen går av etter valget',
+    'Pemerintah akan menaikkan harga BBM',
+    'Het kabinet wil een nieuwe belasting op vliegreizen',
+]
+
+ENGLISH = [
+    'Fiji prime minister calls snap election amid budget row',
+    'Protesters rally outside parliament over pension reform',
+    'Police say the suspect was arrested',
+    "Minister's plan is rejected by the senate",
+]
+
+
+@pytest.mark.parametrize('title', NOT_ENGLISH)
+def test_suffixes_alone_do_not_make_a_title_english(title):
+    assert detect_language(title) != 'en'
+
+
+@pytest.mark.parametrize('title', ENGLISH)
+def test_english_titles(title):
+    assert detect_language(title) == 'en'
+
+
+@pytest.mark.parametrize('title, lang', [
+    ('Ny forskning om klimatet', 'sv'),
+    ('Pemerintah akan menaikkan harga BBM', 'id'),
+    ('Het kabinet wil een nieuwe belasting op vliegreizen', 'nl'),
+    ('Elecciones en España: el partido gana por la mínima', 'es'),
+    ('中国经济增长放缓', NON_LATIN),
+])
+def test_other_languages(title, lang):
+    assert detect_language(title) == lang
+
+
+def test_undetermined_titles():
+    assert detect_language('Brexit') is None
+    assert detect_language('') is None
+    assert detect_language(None) is None
+
+
+def test_english_mask_only_flags_confident_english():
+    titles = pd.Series(ENGLISH[:2] + NOT_ENGLISH[:3] + [None, 'Brexit'])
+    expected = [True, True, False, False, False, False, False]
+    assert english_mask(titles).tolist() == expected
+    assert english_mask(np.array(titles, dtype=object)).tolist() == expected
+
+
+def test_non_english_mask_uses_script_only():
+    titles = ['Udvikling i sagen', '中国经济增长放缓', 'Café opens', None]
+    assert non_english_mask(titles).tolist() == [False, True, False, False]
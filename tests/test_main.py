@@ -0,0 +1,50 @@
+import sys
+import threading
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")   # fastapi.testclient
+main = pytest.importorskip("server.main")
+
+from fastapi.testclient import TestClient
+
+
+def test_ready_is_503_until_the_warmup_has_loaded_the_model(monkeypatch):
+    embed = sys.modules['server.model.embed']
+    monkeypatch.setattr(embed, '_model', None)
+    monkeypatch.setattr(embed, '_model_id', None)
+    monkeypatch.setitem(embed.EMBED_CONFIG, 'backend', 'torch')
+    monkeypatch.setitem(embed.EMBED_CONFIG, 'warmup_on_start', True)
+
+    release = threading.Event()
+    loaded = threading.Event()
+
+    def fake_warmup():
+        release.wait(10)
+        embed._model = object()
+        loaded.set()
+
+    monkeypatch.setattr(main, 'warmup', fake_warmup)
+
+    with TestClient(main.app) as client:   # Runs the lifespan handler
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json() == {"ready": False, "model": embed.MODEL_NAME}
+
+        release.set()
+        assert loaded.wait(10)
+        response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["ready"] is True
+
+
+def test_archive_modules_are_not_imported_at_startup():
+    import subprocess
+
+    # (pyarrow itself may still be loaded: pandas 3 imports it)
+    code = ("import sys; import server.main; "
+            "print(any(name in sys.modules for name in ('server.news_archive', 'server.gkg_fields')))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=main.BASE_DIR)
+    assert result.stdout.strip().splitlines()[-1] == "False"
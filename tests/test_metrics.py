@@ -0,0 +1,84 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+import metrics
+from metrics import MetricsRegistry, append_history, read_history, start_http_server, write_textfile
+
+
+def test_counters_and_gauges_by_label():
+    registry = MetricsRegistry()
+    registry.inc('pipeline_files_total', stream='translation', result='ok')
+    registry.inc('pipeline_files_total', 2, result='ok', stream='translation')
+    registry.set('pipeline_freshness_lag_seconds', 42.5)
+
+    assert registry.get('pipeline_files_total', stream='translation', result='ok') == 3
+    assert registry.get('pipeline_files_total', stream='original', result='ok') == 0
+    assert registry.get('pipeline_freshness_lag_seconds') == 42.5
+
+
+def test_render_prometheus_text_format():
+    registry = MetricsRegistry(buckets=(0.1, 1))
+    registry.inc('pipeline_rows_total', 7, stream='translation', kind='parsed')
+    registry.inc('custom_total', label='say "hi"\n')
+    for value in (0.05, 0.5, 5):
+        registry.observe('custom_seconds', value)
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE pipeline_rows_total counter" in lines
+    assert 'pipeline_rows_total{kind="parsed",stream="translation"} 7' in lines
+    # Undefined metrics get no HELP/TYPE, and label values are escaped
+    assert not any(line.startswith("# TYPE custom_total") for line in lines)
+    assert 'custom_total{label="say \\"hi\\"\\n"} 1' in lines
+    # Buckets are cumulative
+    assert 'custom_seconds_bucket{le="0.1"} 1' in lines
+    assert 'custom_seconds_bucket{le="1"} 2' in lines
+    assert 'custom_seconds_bucket{le="+Inf"} 3' in lines
+    assert 'custom_seconds_count 3' in lines
+    assert 'custom_seconds_sum 5.55' in lines
+
+
+def test_timer_observes_even_when_the_block_raises():
+    registry = MetricsRegistry(buckets=(1,))
+    with pytest.raises(ValueError):
+        with registry.timer('custom_seconds', op='insert'):
+            raise ValueError("boom")
+
+    assert 'custom_seconds_count{op="insert"} 1' in registry.render()
+
+
+def test_both_import_names_share_one_registry():
+    import server.metrics
+    assert server.metrics.METRICS is metrics.METRICS
+
+
+def test_textfile_and_http_export(tmp_path, monkeypatch):
+    registry = MetricsRegistry()
+    registry.inc('pipeline_files_total', result='ok')
+    path = tmp_path / 'metrics' / 'pipeline.prom'
+    write_textfile(str(path), registry=registry)
+    assert path.read_text() == registry.render()
+
+    monkeypatch.setattr(metrics._MetricsHandler, 'registry', registry)
+    server = start_http_server(port=0, host='127.0.0.1')
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{base}/metrics") as response:
+            assert response.read().decode() == registry.render()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{base}/other")
+    finally:
+        server.shutdown()
+
+
+def test_history_is_trimmed_to_the_last_lines(tmp_path, monkeypatch):
+    monkeypatch.setitem(metrics.METRICS_CONFIG, 'history_max_lines', 10)
+    path = str(tmp_path / 'history.jsonl')
+    for i in range(12):
+        append_history({'file': i}, path)
+
+    records = read_history(path)
+    assert [r['file'] for r in records] == list(range(2, 12))
+    assert [r['file'] for r in read_history(path, last=3)] == [9, 10, 11]
@@ -0,0 +1,71 @@
+import pandas as pd
+
+from news_archive import compact_partition, list_partitions, partition_files, read_archive, write_batch
+
+
+def batch(urls):
+    return pd.DataFrame({'date': '20240101120000', 'source_name': 'example.com', 'url': urls,
+                         'title': [f"Title {url}" for url in urls]})
+
+
+def test_retried_file_does_not_duplicate_archived_rows(tmp_path):
+    root = str(tmp_path)
+    write_batch(batch(['a', 'b']), 'original', root=root)
+    # The file failed after its first chunk and is processed again from the start
+    write_batch(batch(['a', 'b']), 'original', root=root)
+    write_batch(batch(['b', 'c']), 'original', root=root)
+
+    df = read_archive(stream='original', root=root)
+    assert df['url'].tolist() == ['a', 'b', 'c']
+
+
+def test_compaction_keeps_first_row_of_each_url(tmp_path, monkeypatch):
+    from news_archive import ARCHIVE_CONFIG
+
+    root = str(tmp_path)
+    monkeypatch.setitem(ARCHIVE_CONFIG, 'dedupe_urls', False)
+    write_batch(batch(['a', 'b']), 'original', root=root)
+    write_batch(batch(['b', 'c']).assign(title='later'), 'original', root=root)
+
+    (_, _, directory), = list_partitions('original', root=root)
+    assert compact_partition(directory)
+    assert len(partition_files(directory)) == 1
+    df = read_archive(stream='original', root=root)
+    assert df['url'].tolist() == ['a', 'b', 'c']
+    assert df['title'].tolist() == ['Title a', 'Title b', 'later']
+
+
+def test_partition_is_read_once_not_per_batch(tmp_path, monkeypatch):
+    import news_archive
+
+    root = str(tmp_path)
+    for i in range(3):
+        write_batch(batch([f"old{i}"]), 'original', root=root)
+    # A fresh process: the partition's URLs are not in memory yet
+    monkeypatch.setattr(news_archive, '_partition_urls', news_archive.OrderedDict())
+
+    reads = []
+    read_table = news_archive.pq.read_table
+
+    def counting_read_table(path, **kwargs):
+        reads.append(path)
+        return read_table(path, **kwargs)
+
+    monkeypatch.setattr(news_archive.pq, 'read_table', counting_read_table)
+    for i in range(20):
+        write_batch(batch([f"new{i}", 'old0']), 'original', root=root)
+
+    assert len(reads) == 3   # The three files that existed before, read once
+    df = read_archive(stream='original', root=root)
+    assert sorted(df['url']) == sorted([f"old{i}" for i in range(3)] + [f"new{i}" for i in range(20)])
+
+
+def test_concurrent_writers_do_not_duplicate_urls(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    root = str(tmp_path)
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda i: write_batch(batch(['a', 'b', f"c{i % 4}"]), 'original', root=root), range(32)))
+
+    df = read_archive(stream='original', root=root)
+    assert sorted(df['url']) == ['a', 'b', 'c0', 'c1', 'c2', 'c3']
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from model.onnx_embed import ONNX_CONFIG, SAMPLE_TEXTS, load_onnx_embedder, parity_check
+
+
+class FixedEncoder:
+    """Stand-in with SentenceTransformer's encode(): returns preset rows."""
+    def __init__(self, rows):
+        self.rows = np.asarray(rows, dtype=np.float32)
+
+    def encode(self, texts, convert_to_numpy=True):
+        return self.rows[:len(texts)]
+
+
+def test_parity_check_reports_the_worst_text():
+    texts = ["same", "close", "off"]
+    reference = FixedEncoder([[1, 0], [1, 0], [1, 0]])
+    candidate = FixedEncoder([[2, 0], [1, 0.05], [1, 1]])
+
+    passed, min_cos, mean_cos, worst = parity_check(reference, candidate, texts, 0.99)
+    assert not passed
+    assert worst == "off"
+    assert min_cos == pytest.approx(2 ** -0.5)
+    assert parity_check(reference, candidate, texts[:2], 0.99)[0]
+
+
+def test_int8_onnx_matches_pytorch(tmp_path_factory):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("torch")
+    pytest.importorskip("tokenizers")
+    sentence_transformers = pytest.importorskip("sentence_transformers")
+
+    model_name = "all-MiniLM-L6-v2"
+    reference = sentence_transformers.SentenceTransformer(model_name, device='cpu')
+    candidate = load_onnx_embedder(model_name, str(tmp_path_factory.mktemp("onnx")), quantized=True)
+
+    passed, min_cos, mean_cos, worst = parity_check(reference, candidate, SAMPLE_TEXTS,
+                                                    ONNX_CONFIG['min_cosine'])
+    assert passed, f"min cosine {min_cos:.5f} (mean {mean_cos:.5f}) on {worst[:60]!r}"
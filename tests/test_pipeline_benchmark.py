@@ -0,0 +1,21 @@
+from pipeline_benchmark import compare_to_baseline
+
+
+def result(engine, rows_per_sec, processes=1):
+    return {'engine': engine, 'processes': processes, 'rows_per_sec': rows_per_sec}
+
+
+def test_compare_to_baseline_flags_only_regressions_beyond_tolerance():
+    baseline = [result('python', 10000), result('columnar', 40000), result('columnar', 60000, processes=4)]
+    results = [
+        result('python', 9500),                   # 5% slower: within tolerance
+        result('columnar', 30000),                # 25% slower
+        result('columnar', 90000, processes=4),   # faster
+    ]
+    assert compare_to_baseline(results, baseline, tolerance=0.10) == ["columnar is 25% slower than the baseline"]
+
+
+def test_compare_to_baseline_skips_runs_without_a_baseline():
+    baseline = [result('python', 10000), result('columnar', 0)]
+    results = [result('python', 1000, processes=4), result('columnar', 100), result('polars', 1)]
+    assert compare_to_baseline(results, baseline, tolerance=0.10) == []
@@ -0,0 +1,42 @@
+from pipeline_checkpoint import PipelineCheckpoint
+
+
+def test_given_up_file_is_recorded_and_survives_restart(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    url = "http://data.gdeltproject.org/gdeltv2/20240101000000.gkg.csv.zip"
+    checkpoint = PipelineCheckpoint(path)
+
+    assert [checkpoint.record_failure('translation', url) for _ in range(3)] == [1, 2, 3]
+    assert not checkpoint.is_processed('translation', url)
+    checkpoint.mark_failed('translation', url)
+
+    reloaded = PipelineCheckpoint(path)
+    assert reloaded.is_processed('translation', url)
+    assert reloaded.failed_urls('translation') == [url]
+    assert reloaded.record_failure('translation', url) == 1   # counting starts over if it is ever retried
+
+
+def test_success_clears_failed_attempts(tmp_path):
+    checkpoint = PipelineCheckpoint(str(tmp_path / "checkpoint.json"))
+    checkpoint.record_failure('original', 'a')
+    checkpoint.mark_processed('original', 'a')
+    assert checkpoint.record_failure('original', 'a') == 1
+    assert checkpoint.failed_urls('original') == []
+
+
+def test_streams_are_kept_apart_on_disk(tmp_path):
+    import json
+
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = PipelineCheckpoint(path)
+    checkpoint.mark_processed('original', 'o1')
+    checkpoint.advance('original', 'o1')
+    checkpoint.record_failure('translation', 't1')
+    checkpoint.mark_failed('translation', 't1')
+
+    with open(path) as f:
+        state = json.load(f)
+    assert set(state) == {'original', 'translation'}
+    assert state['original'] == {'last_url': 'o1', 'processed': ['o1']}
+    assert state['translation'] == {'last_url': None, 'processed': ['t1'], 'attempts': {}, 'failed': ['t1']}
+    assert not checkpoint.is_processed('original', 't1')
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from model import query_cache
+from model.query_cache import QueryEmbeddingCache, embed_query, normalize_query
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(query_cache, '_cache', QueryEmbeddingCache(4))
+    monkeypatch.setattr(query_cache, '_shared', None)
+    monkeypatch.setitem(query_cache.QUERY_CACHE_CONFIG, 'shared_file', None)
+
+
+class RecordingEmbed:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text):
+        self.calls.append(text)
+        return np.array([len(text), ord(text[0])], dtype=np.float32)
+
+
+def test_normalize_query():
+    assert normalize_query("  Fiji   Elections\n") == "fiji elections"
+    # NFKC folds full-width letters
+    assert normalize_query("ＦＩＪＩ") == "fiji"
+
+
+def test_repeat_queries_skip_the_model():
+    embed = RecordingEmbed()
+
+    first = embed_query("Fiji Elections", embed, 'model')
+    second = embed_query("  fiji   elections ", embed, 'model')
+
+    assert embed.calls == ["fiji elections"]
+    assert second is first
+    assert not first.flags.writeable
+    stats = query_cache.query_cache_stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1 and stats['hit_rate'] == 0.5
+
+
+def test_namespace_keeps_models_apart():
+    embed = RecordingEmbed()
+
+    embed_query("fiji", embed, 'model-a')
+    embed_query("fiji", embed, 'model-b')
+
+    assert embed.calls == ["fiji", "fiji"]
+
+
+def test_failed_embedding_is_not_cached():
+    assert embed_query("fiji", lambda text: None, 'model') is None
+    assert len(query_cache._cache) == 0
+
+
+def test_least_recently_used_query_is_evicted():
+    embed = RecordingEmbed()
+    for query in ["a", "b", "c", "d"]:
+        embed_query(query, embed, 'model')
+    embed_query("a", embed, 'model')      # "b" is now the oldest
+    embed_query("e", embed, 'model')
+
+    embed.calls.clear()
+    embed_query("a", embed, 'model')
+    embed_query("b", embed, 'model')
+    assert embed.calls == ["b"]
+    assert query_cache.query_cache_stats()['evicted'] >= 1
+
+
+def test_shared_store_serves_other_processes(tmp_path, monkeypatch):
+    monkeypatch.setitem(query_cache.QUERY_CACHE_CONFIG, 'shared_file', str(tmp_path / 'queries.db'))
+    embed = RecordingEmbed()
+    embed_query("fiji", embed, 'model')
+
+    # A second process: empty memory cache, same file
+    monkeypatch.setattr(query_cache, '_cache', QueryEmbeddingCache(4))
+    monkeypatch.setattr(query_cache, '_shared', None)
+    vector = embed_query("Fiji", embed, 'model')
+
+    assert embed.calls == ["fiji"]
+    assert vector.tolist() == [4, ord('f')]
+    assert query_cache.query_cache_stats()['shared_hits'] == 1
@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+from staged_pipeline import Stage, format_stage_stats, run_stages
+
+
+def test_outputs_come_back_in_source_order():
+    def slow_when_even(item):
+        time.sleep(0.02 if item % 2 == 0 else 0)
+        return item * 10
+
+    outputs, stats = run_stages(range(10), [Stage('work', slow_when_even, workers=3)])
+
+    assert outputs == [item * 10 for item in range(10)]
+    assert [s.name for s in stats] == ['fetch', 'work']
+    assert stats[0].items == 10 and stats[1].items == 10
+
+
+def test_ordered_stage_sees_items_in_source_order():
+    seen = []
+
+    def jitter(item):
+        time.sleep(0.01 * (5 - item % 5))
+        return item
+
+    outputs, _ = run_stages(range(12), [Stage('parse', jitter, workers=4),
+                                        Stage('append', seen.append, ordered=True)])
+
+    assert seen == list(range(12))
+    assert len(outputs) == 12
+
+
+def test_failed_item_becomes_none_and_does_not_stall_ordered_stage():
+    seen = []
+
+    def parse(item):
+        if item == 3:
+            raise ValueError("bad chunk")
+        return item
+
+    outputs, stats = run_stages(range(6), [Stage('parse', parse, workers=2),
+                                           Stage('write', lambda item: seen.append(item) or item,
+                                                 ordered=True)])
+
+    assert outputs == [0, 1, 2, None, 4, 5]
+    assert seen == [0, 1, 2, 4, 5]
+    assert stats[1].errors == 1
+    assert "1 failed" in format_stage_stats(stats, 1.0)
+
+
+def test_source_error_ends_the_stream():
+    def source():
+        yield 1
+        yield 2
+        raise IOError("download dropped")
+
+    outputs, stats = run_stages(source(), [Stage('work', lambda item: item)])
+
+    assert outputs == [1, 2]
+    assert stats[0].errors == 1
+
+
+def test_queues_are_bounded():
+    release = threading.Event()
+    produced = []
+
+    def source():
+        for item in range(50):
+            produced.append(item)
+            yield item
+
+    def blocked(item):
+        release.wait()
+        return item
+
+    result = {}
+    runner = threading.Thread(target=lambda: result.update(
+        out=run_stages(source(), [Stage('slow', blocked)], queue_size=2)))
+    runner.start()
+    time.sleep(0.2)
+    # One item in the worker, two queued, one held by the blocked put
+    assert len(produced) <= 4
+    release.set()
+    runner.join(5)
+
+    outputs, stats = result['out']
+    assert outputs == list(range(50))
+    assert stats[1].queue_peak <= 2
+
+
+def test_ordered_stage_needs_one_worker():
+    with pytest.raises(ValueError):
+        Stage('write', print, workers=2, ordered=True)
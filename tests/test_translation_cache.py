@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+import translation
+from translation import SEPARATOR, TranslationCache, pack_batches
+
+
+class StubTranslator:
+    """Prefixes every line with [en] and records each request."""
+    requests = []
+    lock = threading.Lock()
+
+    def translate(self, text):
+        with self.lock:
+            self.requests.append(text)
+        return SEPARATOR.join(f"[en] {line}" for line in text.split(SEPARATOR))
+
+
+@pytest.fixture
+def stub_backend(tmp_path, monkeypatch):
+    StubTranslator.requests = []
+    monkeypatch.setitem(translation.BACKENDS, 'stub', StubTranslator)
+    config = {'backend': 'stub', 'cache_file': str(tmp_path / "cache.db"), 'batch_chars': 30,
+              'initial_workers': 2, 'min_workers': 1, 'max_workers': 2,
+              'max_retries': 2, 'backoff_base': 0.01, 'batch_deadline': 60}
+    for key, value in config.items():
+        monkeypatch.setitem(translation.TRANSLATION_CONFIG, key, value)
+    monkeypatch.setattr(translation, '_limiter', None)
+    monkeypatch.setattr(translation, '_cache', None)
+    return StubTranslator
+
+
+def test_pack_batches_stays_under_max_chars():
+    texts = ["aaaa", "bbbb", "cc", "dddddddddddd", "e"]
+
+    batches = list(pack_batches(texts, 10))
+
+    assert [t for batch in batches for t in batch] == texts
+    assert batches == [["aaaa", "bbbb"], ["cc"], ["dddddddddddd"], ["e"]]
+    assert all(len(SEPARATOR.join(b)) <= 10 for b in batches if len(b) > 1)
+
+
+def test_cache_round_trip_and_eviction(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.db"), max_entries=10)
+    cache.put_many([(f"old {i}", f"en {i}") for i in range(5)])
+    time.sleep(0.01)
+    cache.get_many(["old 0"])
+    time.sleep(0.01)
+    cache.put_many([(f"new {i}", f"en {i}") for i in range(8)])
+
+    assert len(cache) == 9
+    assert cache.get_many([f"old {i}" for i in range(5)]) == {"old 0": "en 0"}
+
+
+def test_duplicates_and_cached_titles_are_not_sent_again(stub_backend):
+    titles = ["titre un", "titre deux", "titre un", "titre trois"]
+
+    translated, stats = translation.translate_texts(titles)
+
+    assert translated == {title: f"[en] {title}" for title in titles}
+    assert stats['unique'] == 3 and stats['translated'] == 3 and stats['cache_hits'] == 0
+    sent = [line for request in stub_backend.requests for line in request.split(SEPARATOR)]
+    assert sorted(sent) == ["titre deux", "titre trois", "titre un"]
+    # Short titles share a request
+    assert stats['requests'] < 3
+
+    stub_backend.requests.clear()
+    translated, stats = translation.translate_texts(["titre deux", "titre quatre"])
+
+    assert stub_backend.requests == ["titre quatre"]
+    assert stats['cache_hits'] == 1
+    assert translated["titre deux"] == "[en] titre deux"
+
+
+def test_newlines_in_titles_do_not_break_batches(stub_backend):
+    translated, _ = translation.translate_texts(["ligne\nsuite", "autre"])
+
+    assert translated == {"ligne\nsuite": "[en] ligne suite", "autre": "[en] autre"}
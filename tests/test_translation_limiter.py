@@ -0,0 +1,124 @@
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import translation
+from fake_translator import FakeTranslatorHandler
+
+
+class RecordingLimiter(translation.AdaptiveLimiter):
+    """AdaptiveLimiter that keeps the limit after every response."""
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.history = []
+
+    def release(self, latency, ok):
+        super().release(latency, ok)
+        with self._cond:
+            self.history.append(self.limit)
+
+
+@pytest.fixture
+def fake_translator(monkeypatch):
+    monkeypatch.setattr(FakeTranslatorHandler, 'latency', 0.02)
+    monkeypatch.setattr(FakeTranslatorHandler, 'error_rate', 0.0)
+    monkeypatch.setattr(FakeTranslatorHandler, 'max_concurrent', 2)
+    monkeypatch.setattr(FakeTranslatorHandler, 'merge_lines', False)
+    monkeypatch.setattr(FakeTranslatorHandler, 'counts', {'ok': 0, 'throttled': 0, 'errors': 0})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeTranslatorHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/translate"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def limiter(fake_translator, tmp_path, monkeypatch):
+    config = {'backend': 'http', 'service_url': fake_translator, 'cache_file': str(tmp_path / "cache.db"),
+              'batch_chars': 10,   # One title per request
+              'initial_workers': 8, 'min_workers': 1, 'max_workers': 8,
+              'target_latency': 5.0,   # Only 429s and errors count as congestion here
+              'max_retries': 8, 'backoff_base': 0.01, 'batch_deadline': 60}
+    for key, value in config.items():
+        monkeypatch.setitem(translation.TRANSLATION_CONFIG, key, value)
+    limiter = RecordingLimiter(8, 1, 8, 5.0)
+    monkeypatch.setattr(translation, '_limiter', limiter)
+    monkeypatch.setattr(translation, '_cache', None)
+    return limiter
+
+
+def check_every_title_accounted_for(titles, translated, stats):
+    assert set(translated) <= set(titles)
+    assert all(translated[title] == f"[en] {title}" for title in translated)
+    # Every title is either translated or counted as dropped
+    assert len(translated) + stats['failed'] == len(titles)
+
+
+def test_limiter_backs_off_on_429_and_recovers(limiter):
+    titles = [f"titre {i}" for i in range(40)]
+    translated, stats = translation.translate_texts(titles)
+
+    check_every_title_accounted_for(titles, translated, stats)
+    assert FakeTranslatorHandler.counts['throttled'] > 0
+    assert stats['errors'] == FakeTranslatorHandler.counts['throttled']
+    # Started at 8 against a service that takes 2: halved down to around its capacity
+    assert min(limiter.history) <= 2
+    assert stats['failed'] == 0
+
+    # The service stops throttling: the limit grows back
+    FakeTranslatorHandler.max_concurrent = 100
+    throttled_limit = limiter.limit
+    more = [f"autre titre {i}" for i in range(60)]
+    translated, stats = translation.translate_texts(more)
+
+    check_every_title_accounted_for(more, translated, stats)
+    assert stats['errors'] == 0
+    assert limiter.limit > throttled_limit + 2
+
+
+def test_titles_that_keep_failing_are_dropped(limiter, monkeypatch):
+    monkeypatch.setattr(FakeTranslatorHandler, 'error_rate', 1.0)
+    monkeypatch.setitem(translation.TRANSLATION_CONFIG, 'max_retries', 1)
+    titles = [f"titre {i}" for i in range(5)]
+    translated, stats = translation.translate_texts(titles)
+
+    check_every_title_accounted_for(titles, translated, stats)
+    assert translated == {}
+    assert stats['failed'] == len(titles)
+    assert limiter.limit == 1
+
+
+def test_merged_lines_fall_back_to_one_request_per_title_under_the_limiter(limiter, monkeypatch):
+    monkeypatch.setattr(FakeTranslatorHandler, 'merge_lines', True)
+    monkeypatch.setitem(translation.TRANSLATION_CONFIG, 'batch_chars', 60)   # A few titles per request
+    titles = [f"titre {i}" for i in range(30)]
+    translated, stats = translation.translate_texts(titles)
+
+    check_every_title_accounted_for(titles, translated, stats)
+    assert stats['failed'] == 0
+    assert stats['split_batches'] > 0
+    # Every request, including the per-title ones, went through the limiter and was counted
+    counts = FakeTranslatorHandler.counts
+    assert stats['requests'] == counts['ok'] + counts['throttled']
+    assert counts['throttled'] > 0
+    assert stats['errors'] == counts['throttled']
+    assert min(limiter.history) <= 2
+
+
+def test_per_title_fallback_stops_at_the_deadline(limiter, monkeypatch):
+    import time
+
+    monkeypatch.setattr(FakeTranslatorHandler, 'merge_lines', True)
+    monkeypatch.setattr(FakeTranslatorHandler, 'max_concurrent', 100)
+    monkeypatch.setattr(FakeTranslatorHandler, 'latency', 0.1)
+    monkeypatch.setitem(translation.TRANSLATION_CONFIG, 'batch_chars', 1000)   # One request for all titles
+    monkeypatch.setitem(translation.TRANSLATION_CONFIG, 'batch_deadline', 0.6)
+    titles = [f"titre {i}" for i in range(30)]
+    started = time.time()
+    translated, stats = translation.translate_texts(titles)
+
+    assert time.time() - started < 2
+    check_every_title_accounted_for(titles, translated, stats)
+    assert stats['split_batches'] == 1
+    assert 0 < stats['failed'] < len(titles)
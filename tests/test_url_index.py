@@ -0,0 +1,73 @@
+
+
+from news_retrieve import drop_seen_urls
+from url_index import SeenUrlIndex, refresh_from_db
+
+
+def test_seen_mask_hits_and_misses(tmp_path):
+    index = SeenUrlIndex(str(tmp_path / "seen.npy"))
+    assert index.seen_mask(['https://a.example/1']).tolist() == [False]
+
+    index.mark_seen(['https://a.example/1', 'https://a.example/3'])
+    mask = index.seen_mask(['https://a.example/1', 'https://a.example/2', 'https://a.example/3'])
+    assert mask.tolist() == [True, False, True]
+    assert len(index) == 2
+
+
+def test_index_survives_a_restart(tmp_path):
+    path = str(tmp_path / "seen.npy")
+    index = SeenUrlIndex(path)
+    index.rebuild(['https://a.example/1'])
+    index.mark_seen(['https://a.example/2'])
+
+    reloaded = SeenUrlIndex(path)
+    assert reloaded.seen_mask(['https://a.example/1', 'https://a.example/2', 'x']).tolist() == [True, True, False]
+    assert not reloaded.needs_rebuild()
+
+
+def test_rebuild_replaces_the_index(tmp_path):
+    index = SeenUrlIndex(str(tmp_path / "seen.npy"), rebuild_hours=1)
+    assert index.needs_rebuild()
+    index.mark_seen(['deleted-from-db'])
+    index.rebuild(['kept', 'kept'])
+    assert index.seen_mask(['deleted-from-db', 'kept']).tolist() == [False, True]
+    assert len(index) == 1
+    assert not index.needs_rebuild()
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def select(self, columns):
+        return self
+
+    def range(self, start, end):
+        self.page = self.rows[start:end + 1]
+        return self
+
+    def execute(self):
+        return type('Result', (), {'data': self.page})()
+
+
+class FakeDb:
+    def __init__(self, urls):
+        self.supabase = type('Client', (), {'table': lambda _, name: FakeQuery([{'url': u} for u in urls])})()
+
+
+def test_refresh_from_db_pages_through_the_table(tmp_path):
+    index = SeenUrlIndex(str(tmp_path / "seen.npy"))
+    refresh_from_db(index, FakeDb([f"https://a.example/{i}" for i in range(2500)]))
+    assert len(index) == 2500
+    # Not due again until rebuild_hours have passed
+    refresh_from_db(index, FakeDb([]))
+    assert len(index) == 2500
+
+
+def test_drop_seen_urls_also_drops_repeats_within_the_chunk(tmp_path):
+    import pandas as pd
+
+    index = SeenUrlIndex(str(tmp_path / "seen.npy"))
+    index.mark_seen(['old'])
+    df = pd.DataFrame({'url': ['old', 'new', 'new', 'other'], 'title': list('abcd')})
+    assert drop_seen_urls(df, index)['title'].tolist() == ['b', 'd']
@@ -0,0 +1,87 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from news_retrieve import ZipStreamReader
+
+CONTENT = b''.join(f"20260101000000-{i}\t1\t\texample.com\thttps://example.com/{i}\n".encode()
+                   for i in range(5000)) + os.urandom(20000)
+
+
+class Unseekable(io.RawIOBase):
+    """Write-only stream without tell/seek: zipfile then writes a data descriptor."""
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        return len(data)
+
+
+def make_zip(compression=zipfile.ZIP_DEFLATED, seekable=True):
+    if seekable:
+        out = io.BytesIO()
+        with zipfile.ZipFile(out, 'w', compression=compression) as zf:
+            zf.writestr('20260101000000.gkg.csv', CONTENT)
+        return out.getvalue()
+    out = Unseekable()
+    with zipfile.ZipFile(out, 'w', compression=compression) as zf:
+        with zf.open('20260101000000.gkg.csv', 'w') as member:
+            member.write(CONTENT)
+    return bytes(out.buffer)
+
+
+def chunked(data, size):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+def read_all(data, chunk_size):
+    with io.BufferedReader(ZipStreamReader(chunked(data, chunk_size))) as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('chunk_size', [7, 4096, 1 << 20])
+def test_deflate_without_data_descriptor(chunk_size):
+    data = make_zip()
+    assert not zipfile.ZipFile(io.BytesIO(data)).infolist()[0].flag_bits & 0x08
+    assert read_all(data, chunk_size) == CONTENT
+
+
+@pytest.mark.parametrize('chunk_size', [7, 4096, 1 << 20])
+def test_deflate_with_data_descriptor(chunk_size):
+    data = make_zip(seekable=False)
+    assert zipfile.ZipFile(io.BytesIO(data)).infolist()[0].flag_bits & 0x08
+    assert read_all(data, chunk_size) == CONTENT
+
+
+def test_stored_member():
+    assert read_all(make_zip(zipfile.ZIP_STORED), 1000) == CONTENT
+
+
+def test_lines_can_be_iterated():
+    with io.BufferedReader(ZipStreamReader(chunked(make_zip(), 333))) as f:
+        lines = list(f)
+    assert b''.join(lines) == CONTENT
+    assert lines[1] == b"20260101000000-1\t1\t\texample.com\thttps://example.com/1\n"
+
+
+def test_bad_crc_is_detected():
+    data = bytearray(make_zip())
+    data[14] ^= 0xFF   # CRC-32 field of the local header
+    with pytest.raises(zipfile.BadZipFile, match="CRC"):
+        read_all(bytes(data), 4096)
+
+
+def test_truncated_stream_is_an_error():
+    data = make_zip()
+    with pytest.raises(zipfile.BadZipFile):
+        read_all(data[:len(data) // 2], 4096)
+    with pytest.raises(zipfile.BadZipFile):
+        read_all(data[:10], 4096)
+    with pytest.raises(zipfile.BadZipFile, match="Not a zip"):
+        read_all(b'x' * 100, 4096)